@@ -0,0 +1,91 @@
+"""以 real[] 分數向量取代 exam_sessions 中重複的 answers / results JSONB。
+
+scores 依模板題目順序（sections → questions）排列，與 CompiledTemplate.question_ids 一致。
+既有資料由 results（或 answers）回填後刪除 results 欄位，並清空已完成 session 的 answers。
+results 中沒有的題目回填為 NULL（未作答），不補 0。
+若有已完成的 session 無法回填（例如 exam_id 找不到模板），遷移中止並整個回滾，results 保持原狀。
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, REAL
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 依模板 JSONB 的單元與題目順序展開題號
+_TEMPLATE_QUESTIONS = """
+    SELECT t.exam_id, q.body ->> 'question_id' AS question_id, sec.si, q.qi
+    FROM exam_templates t
+    CROSS JOIN LATERAL jsonb_array_elements(t.template_data -> 'sections') WITH ORDINALITY AS sec(body, si)
+    CROSS JOIN LATERAL jsonb_array_elements(sec.body -> 'questions') WITH ORDINALITY AS q(body, qi)
+"""
+
+
+def upgrade() -> None:
+    op.add_column("exam_sessions", sa.Column("scores", ARRAY(REAL), nullable=True))
+
+    # 回填：以模板題目順序將 {question_id: score} 轉為向量，未作答為 NULL
+    op.execute(f"""
+        UPDATE exam_sessions s
+        SET scores = v.scores
+        FROM (
+            SELECT s2.id,
+                   array_agg(
+                       (COALESCE(s2.results, s2.answers) ->> tq.question_id)::real
+                       ORDER BY tq.si, tq.qi
+                   ) AS scores
+            FROM exam_sessions s2
+            JOIN ({_TEMPLATE_QUESTIONS}) tq ON tq.exam_id = s2.exam_id
+            WHERE s2.results IS NOT NULL OR s2.answers IS NOT NULL
+            GROUP BY s2.id
+        ) v
+        WHERE s.id = v.id
+    """)
+
+    unfilled = op.get_bind().execute(sa.text(
+        "SELECT exam_id, count(*) FROM exam_sessions "
+        "WHERE status = 'completed' AND scores IS NULL AND (results IS NOT NULL OR answers IS NOT NULL) "
+        "GROUP BY exam_id ORDER BY exam_id"
+    )).all()
+    if unfilled:
+        detail = "、".join(f"{exam_id}（{n} 筆）" for exam_id, n in unfilled)
+        raise RuntimeError(
+            f"已完成的測驗紀錄無法回填 scores：{detail}；請先補上對應的試卷模板或清理資料，"
+            f"遷移已中止，results 欄位保持原狀"
+        )
+
+    op.execute("UPDATE exam_sessions SET answers = NULL WHERE status = 'completed'")
+    op.drop_column("exam_sessions", "results")
+
+
+def downgrade() -> None:
+    op.add_column("exam_sessions", sa.Column("results", JSONB, nullable=True))
+
+    op.execute(f"""
+        UPDATE exam_sessions s
+        SET results = v.results, answers = COALESCE(s.answers, v.results)
+        FROM (
+            SELECT s2.id,
+                   jsonb_object_agg(tq.question_id, s2.scores[tq.pos])
+                       FILTER (WHERE s2.scores[tq.pos] IS NOT NULL) AS results
+            FROM exam_sessions s2
+            JOIN (
+                SELECT exam_id, question_id,
+                       row_number() OVER (PARTITION BY exam_id ORDER BY si, qi) AS pos
+                FROM ({_TEMPLATE_QUESTIONS}) q
+            ) tq ON tq.exam_id = s2.exam_id
+            WHERE s2.scores IS NOT NULL
+            GROUP BY s2.id
+        ) v
+        WHERE s.id = v.id
+    """)
+
+    op.drop_column("exam_sessions", "scores")
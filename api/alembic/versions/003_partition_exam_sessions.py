@@ -0,0 +1,109 @@
+"""將 exam_sessions 改為依 started_at 每月 range 分區。
+
+分區鍵必須包含在主鍵與唯一約束內，因此：
+- 主鍵改為 (id, started_at)
+- verification_code_id 的唯一約束改為一般索引，一碼一 session 改由驗證碼狀態轉換保證
+
+另建立 exam_sessions_default 預設分區，以及既有資料起至本月後三個月的月分區；
+之後的月分區由 migrate-and-seed 與封存任務（app/jobs/archive_sessions.py）持續補建。
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, REAL, UUID
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = (
+    "id, verification_code_id, student_name, exam_id, answers, scores, "
+    "assessment, ai_analysis, status, started_at, completed_at"
+)
+_MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _session_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", UUID(as_uuid=True), nullable=False),
+        sa.Column("verification_code_id", UUID(as_uuid=True), sa.ForeignKey("verification_codes.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("student_name", sa.String(100), nullable=False),
+        sa.Column("exam_id", sa.String(100), nullable=False),
+        sa.Column("answers", JSONB, nullable=True),
+        sa.Column("scores", ARRAY(REAL), nullable=True),
+        sa.Column("assessment", JSONB, nullable=True),
+        sa.Column("ai_analysis", JSONB, nullable=True),
+        sa.Column("status", sa.String(20), nullable=False, server_default="in_progress"),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    # 舊表改名，並讓出全域唯一的索引名稱
+    op.rename_table("exam_sessions", "exam_sessions_legacy")
+    op.execute("ALTER TABLE exam_sessions_legacy RENAME CONSTRAINT exam_sessions_pkey TO exam_sessions_legacy_pkey")
+    op.execute(
+        "ALTER TABLE exam_sessions_legacy "
+        "RENAME CONSTRAINT exam_sessions_verification_code_id_key TO exam_sessions_legacy_verification_code_id_key"
+    )
+
+    op.create_table(
+        "exam_sessions",
+        *_session_columns(),
+        sa.PrimaryKeyConstraint("id", "started_at", name="exam_sessions_pkey"),
+        postgresql_partition_by="RANGE (started_at)",
+    )
+    op.create_index("ix_exam_sessions_verification_code_id", "exam_sessions", ["verification_code_id"])
+    op.create_index("ix_exam_sessions_started_at", "exam_sessions", ["started_at"])
+    op.execute("CREATE TABLE exam_sessions_default PARTITION OF exam_sessions DEFAULT")
+
+    # 自既有最早資料的月份起建立月分區，直到本月後三個月
+    conn = op.get_bind()
+    oldest = conn.execute(sa.text("SELECT min(started_at) FROM exam_sessions_legacy")).scalar()
+    this_month = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest is not None else this_month
+    last = _add_months(this_month, _MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE exam_sessions_{month:%Y_%m} PARTITION OF exam_sessions "
+            f"FOR VALUES FROM ('{month}') TO ('{upper}')"
+        )
+        month = upper
+
+    op.execute(
+        f"INSERT INTO exam_sessions ({_COLUMNS}) "
+        f"SELECT {_COLUMNS.replace('started_at', 'COALESCE(started_at, now())')} FROM exam_sessions_legacy"
+    )
+    op.drop_table("exam_sessions_legacy")
+
+
+def downgrade() -> None:
+    op.rename_table("exam_sessions", "exam_sessions_partitioned")
+    op.execute("ALTER TABLE exam_sessions_partitioned RENAME CONSTRAINT exam_sessions_pkey TO exam_sessions_partitioned_pkey")
+    op.drop_index("ix_exam_sessions_verification_code_id", table_name="exam_sessions_partitioned")
+    op.drop_index("ix_exam_sessions_started_at", table_name="exam_sessions_partitioned")
+
+    op.create_table(
+        "exam_sessions",
+        *_session_columns(),
+        sa.PrimaryKeyConstraint("id", name="exam_sessions_pkey"),
+        sa.UniqueConstraint("verification_code_id", name="exam_sessions_verification_code_id_key"),
+    )
+    op.execute(f"INSERT INTO exam_sessions ({_COLUMNS}) SELECT {_COLUMNS} FROM exam_sessions_partitioned")
+
+    # 刪除父表時一併刪除所有分區
+    op.execute("DROP TABLE exam_sessions_partitioned CASCADE")
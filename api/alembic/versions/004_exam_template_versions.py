@@ -0,0 +1,50 @@
+"""試卷模板版本化：exam_templates 新增 version / compiled / updated_at，並建立 exam_template_versions。
+
+既有模板回填為第 1 版；compiled 留空，由 registry 首次載入時編譯（之後上傳的版本會預先編譯）。
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("exam_templates", sa.Column("compiled", JSONB, nullable=True))
+    op.add_column("exam_templates", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column(
+        "exam_templates",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "exam_template_versions",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("exam_template_id", UUID(as_uuid=True), sa.ForeignKey("exam_templates.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("template_data", JSONB, nullable=False),
+        sa.Column("created_by", UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("exam_template_id", "version", name="uq_exam_template_versions_version"),
+    )
+
+    op.execute("""
+        INSERT INTO exam_template_versions (id, exam_template_id, version, template_data, created_at)
+        SELECT gen_random_uuid(), id, 1, template_data, created_at FROM exam_templates
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("exam_template_versions")
+    op.drop_column("exam_templates", "updated_at")
+    op.drop_column("exam_templates", "version")
+    op.drop_column("exam_templates", "compiled")
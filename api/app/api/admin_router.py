@@ -1,15 +1,23 @@
 """管理者後台路由：教師帳號 CRUD、試卷管理、學生紀錄查看。"""
 
+import asyncio
 import uuid
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
+from app.api.json_response import rows_response
 from app.auth.dependencies import require_role
 from app.auth.security import hash_password
-from app.db.engine import get_db
+from app.auth.token_cache import token_cache
+from app.auth.user_cache import user_cache
+from app.core import metrics, profiler
+from app.db.engine import get_db, get_read_db
 from app.db.models import (
     ExamSession,
     ExamTemplateRecord,
@@ -17,9 +25,20 @@ from app.db.models import (
     User,
     VerificationCode,
 )
+from app.db.notify import USER_CHANNEL, publish
+from app.repositories.session_repo import list_session_rows
+from app.repositories.template_repo import list_template_versions
+from app.services.template_service import (
+    TemplateValidationError,
+    build_template,
+    parse_template_file,
+    save_template,
+)
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+MAX_TEMPLATE_BYTES = 1024 * 1024
+
 
 # === Schemas ===
 
@@ -47,6 +66,21 @@ class ExamTemplateOut(BaseModel):
     exam_id: str
     name: str
     is_active: bool
+    version: int
+
+
+class TemplateUploadOut(BaseModel):
+    exam_id: str
+    name: str
+    version: int
+    question_count: int
+    warnings: list[str]
+
+
+class TemplateVersionOut(BaseModel):
+    version: int
+    created_by: str | None
+    created_at: datetime
 
 
 class AssignExamRequest(BaseModel):
@@ -74,7 +108,7 @@ class DashboardStatsOut(BaseModel):
 @router.get("/stats", response_model=DashboardStatsOut)
 async def get_stats(
     _: User = Depends(require_role("admin")),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """取得管理者儀表板統計。"""
     teacher_count = (await db.execute(
@@ -101,12 +135,48 @@ async def get_stats(
     )
 
 
+@router.get("/metrics")
+async def get_metrics(_: User = Depends(require_role("admin"))):
+    """回傳本 worker 的行程內指標與快取命中率。"""
+    return {
+        "metrics": metrics.snapshot(),
+        "user_cache_hit_ratio": user_cache.hit_ratio(),
+        "token_cache_hit_ratio": token_cache.hit_ratio(),
+    }
+
+
+# --- 請求剖析（帶 X-Profile 標頭的請求，見 app.core.profiler）---
+
+@router.get("/profiles")
+async def list_profiles(limit: int = 50, _: User = Depends(require_role("admin"))):
+    """列出最近的剖析紀錄（不含 SQL 明細）。"""
+    return await asyncio.to_thread(profiler.list_profiles, min(max(limit, 1), 500))
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, _: User = Depends(require_role("admin"))):
+    """取得剖析紀錄，包含本請求執行的每個 SQL 與耗時。"""
+    record = await asyncio.to_thread(profiler.load_profile, profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return record
+
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+async def get_profile_folded(profile_id: str, _: User = Depends(require_role("admin"))):
+    """取得 folded stacks，可直接交給 flamegraph.pl 或 speedscope。"""
+    folded = await asyncio.to_thread(profiler.load_folded, profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded)
+
+
 # --- 教師管理 ---
 
 @router.get("/teachers", response_model=list[TeacherOut])
 async def list_teachers(
     _: User = Depends(require_role("admin")),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """列出所有教師帳號。"""
     result = await db.execute(select(User).where(User.role == "teacher").order_by(User.created_at))
@@ -131,7 +201,7 @@ async def create_teacher(
 
     teacher = User(
         username=body.username,
-        hashed_password=hash_password(body.password),
+        hashed_password=await hash_password(body.password),
         display_name=body.display_name,
         role="teacher",
     )
@@ -163,11 +233,13 @@ async def update_teacher(
     if body.display_name is not None:
         teacher.display_name = body.display_name
     if body.password is not None:
-        teacher.hashed_password = hash_password(body.password)
+        teacher.hashed_password = await hash_password(body.password)
     if body.is_active is not None:
         teacher.is_active = body.is_active
 
+    await publish(db, USER_CHANNEL, str(tid))
     await db.commit()
+    user_cache.invalidate(str(tid))
     await db.refresh(teacher)
 
     return TeacherOut(id=str(teacher.id), username=teacher.username, display_name=teacher.display_name, is_active=teacher.is_active)
@@ -191,7 +263,9 @@ async def delete_teacher(
         raise HTTPException(status_code=404, detail="教師不存在")
 
     teacher.is_active = False
+    await publish(db, USER_CHANNEL, str(tid))
     await db.commit()
+    user_cache.invalidate(str(tid))
     return {"detail": "教師帳號已停用"}
 
 
@@ -200,17 +274,76 @@ async def delete_teacher(
 @router.get("/exams", response_model=list[ExamTemplateOut])
 async def list_exams(
     _: User = Depends(require_role("admin")),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """列出所有試卷模板。"""
-    result = await db.execute(select(ExamTemplateRecord).order_by(ExamTemplateRecord.created_at))
+    # 只載入列表欄位，不讀取整份 template_data / compiled
+    result = await db.execute(
+        select(ExamTemplateRecord)
+        .options(load_only(
+            ExamTemplateRecord.exam_id,
+            ExamTemplateRecord.name,
+            ExamTemplateRecord.is_active,
+            ExamTemplateRecord.version,
+        ))
+        .order_by(ExamTemplateRecord.created_at)
+    )
     templates = result.scalars().all()
     return [
-        ExamTemplateOut(id=str(t.id), exam_id=t.exam_id, name=t.name, is_active=t.is_active)
+        ExamTemplateOut(id=str(t.id), exam_id=t.exam_id, name=t.name, is_active=t.is_active, version=t.version)
         for t in templates
     ]
 
 
+@router.post("/exams/upload", response_model=TemplateUploadOut)
+async def upload_exam_template(
+    request: Request,
+    file: UploadFile = File(...),
+    user: User = Depends(require_role("admin")),
+    db: AsyncSession = Depends(get_db),
+):
+    """上傳試卷模板（JSON / YAML）：驗證、預先編譯後寫入新版本；同 exam_id 視為改版。"""
+    data = await file.read(MAX_TEMPLATE_BYTES + 1)
+    if len(data) > MAX_TEMPLATE_BYTES:
+        raise HTTPException(status_code=413, detail="檔案大小超過 1 MB")
+
+    try:
+        template, compiled, warnings = build_template(parse_template_file(file.filename or "", data))
+        record = await save_template(db, template, compiled, created_by=user.id)
+    except TemplateValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+
+    # 本 worker 立即失效；其他 worker 透過 EXAM_CHANNEL 通知
+    request.app.state.registry.invalidate(template.exam_id)
+    return TemplateUploadOut(
+        exam_id=template.exam_id,
+        name=template.name,
+        version=record.version,
+        question_count=len(compiled),
+        warnings=warnings,
+    )
+
+
+@router.get("/exams/{exam_id}/versions", response_model=list[TemplateVersionOut])
+async def list_exam_versions(
+    exam_id: str,
+    _: User = Depends(require_role("admin")),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """列出試卷的歷次版本。"""
+    versions = await list_template_versions(db, exam_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail="找不到試卷")
+    return [
+        TemplateVersionOut(
+            version=v.version,
+            created_by=str(v.created_by) if v.created_by else None,
+            created_at=v.created_at,
+        )
+        for v in versions
+    ]
+
+
 @router.post("/exams/assign")
 async def assign_exam_to_teacher(
     body: AssignExamRequest,
@@ -246,28 +379,7 @@ async def assign_exam_to_teacher(
 async def list_sessions(
     exam_id: str | None = None,
     _: User = Depends(require_role("admin")),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """列出所有學生測驗紀錄。"""
-    from sqlalchemy.orm import selectinload
-
-    stmt = (
-        select(ExamSession)
-        .options(selectinload(ExamSession.verification_code))
-        .order_by(ExamSession.started_at.desc())
-    )
-    if exam_id:
-        stmt = stmt.where(ExamSession.exam_id == exam_id)
-
-    result = await db.execute(stmt)
-    sessions = result.scalars().all()
-    return [
-        SessionSummaryOut(
-            session_id=str(s.id),
-            student_name=s.student_name,
-            exam_id=s.exam_id,
-            status=s.status,
-            code=s.verification_code.code if s.verification_code else "",
-        )
-        for s in sessions
-    ]
+    """列出所有學生測驗紀錄（查詢列直接序列化）。"""
+    return rows_response(await list_session_rows(db, SessionSummaryOut.model_fields, exam_id=exam_id or None))
@@ -0,0 +1,143 @@
+"""HTTP 快取輔助：ETag / If-None-Match 304，以及預先序列化、預先壓縮的回應內容。
+
+試卷模板每個版本只序列化與 gzip 一次（依 CompiledTemplate 物件快取，模板被
+registry 汰換後自動釋放）；學生作答頁的回應以模板為固定前綴，只需壓縮少量
+session 欄位。已完成的測驗結果以 (session_id, completed_at) 為版本，快取其位元組。
+"""
+
+import hashlib
+import json
+import weakref
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+
+from app.core.compression import record_compression
+from app.domain.compiled_template import CompiledTemplate
+
+GZIP_LEVEL = 6
+
+
+def make_etag(*parts: object) -> str:
+    """以各部分內容計算強 ETag。"""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 是否包含此 ETag（弱比較，支援 * 與逗號分隔列表）。"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+def _gzip(data: bytes) -> bytes:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """一份回應內容的 JSON 位元組、gzip 位元組與 ETag。"""
+
+    body: bytes
+    gzip: bytes
+    etag: str
+
+    @classmethod
+    def from_json(cls, body: bytes, etag: str | None = None) -> "CachedBody":
+        return cls(body=body, gzip=_gzip(body), etag=etag or make_etag(hashlib.sha256(body).hexdigest()))
+
+
+def cached_response(request: Request, body: bytes, gzip_body: bytes | None, etag: str, cache_control: str) -> Response:
+    """依 If-None-Match 回傳 304，否則回傳 JSON（用戶端接受時直接送出 gzip 位元組）。"""
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if gzip_body is not None and accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        record_compression(len(body), len(gzip_body))
+        return Response(content=gzip_body, media_type="application/json", headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class _GzipPrefix:
+    """已壓縮固定前綴的 gzip 串流狀態，每次只需接著壓縮不同的結尾。"""
+
+    def __init__(self, prefix: bytes) -> None:
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        self._head = self._compressor.compress(prefix)
+        self.prefix = prefix
+
+    def render(self, suffix: bytes) -> tuple[bytes, bytes]:
+        """回傳 (完整 JSON 位元組, gzip 位元組)。"""
+        compressor = self._compressor.copy()
+        return self.prefix + suffix, self._head + compressor.compress(suffix) + compressor.flush()
+
+
+_template_bodies: "weakref.WeakKeyDictionary[CompiledTemplate, CachedBody]" = weakref.WeakKeyDictionary()
+_session_prefixes: "weakref.WeakKeyDictionary[CompiledTemplate, _GzipPrefix]" = weakref.WeakKeyDictionary()
+
+
+def template_body(compiled: CompiledTemplate) -> CachedBody:
+    """模板本身的回應內容，每個模板版本只序列化與壓縮一次；ETag 即內容雜湊。"""
+    cached = _template_bodies.get(compiled)
+    if cached is None:
+        # 省略未設定的選用欄位（IRT 參數、適性設定），一般試卷的回應內容不變
+        body = compiled.template.model_dump_json(exclude_none=True).encode("utf-8")
+        cached = _template_bodies[compiled] = CachedBody.from_json(body)
+    return cached
+
+
+def exam_content_response(
+    request: Request,
+    compiled: CompiledTemplate,
+    session_id: str,
+    student_name: str,
+) -> Response:
+    """學生作答頁（ExamContentOut）的回應：模板放在最前面作為可重複使用的壓縮前綴。"""
+    template = template_body(compiled)
+    etag = make_etag(template.etag, session_id, student_name)
+    if etag_matches(request, etag):
+        return cached_response(request, b"", None, etag, "private, no-cache")
+
+    prefix = _session_prefixes.get(compiled)
+    if prefix is None:
+        prefix = _session_prefixes[compiled] = _GzipPrefix(b'{"template":' + template.body)
+    fields = {
+        "exam_id": compiled.exam_id,
+        "name": compiled.template.name,
+        "session_id": session_id,
+        "student_name": student_name,
+    }
+    suffix = b"," + json.dumps(fields, ensure_ascii=False, separators=(",", ":"))[1:].encode("utf-8")
+    body, gzip_body = prefix.render(suffix)
+    return cached_response(request, body, gzip_body, etag, "private, no-cache")
+
+
+class BodyCache:
+    """以 ETag 為鍵的回應位元組 LRU（用於已完成、內容固定的測驗結果）。"""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedBody] = OrderedDict()
+
+    def get(self, etag: str) -> CachedBody | None:
+        cached = self._entries.get(etag)
+        if cached is not None:
+            self._entries.move_to_end(etag)
+        return cached
+
+    def put(self, cached: CachedBody) -> None:
+        self._entries[cached.etag] = cached
+        self._entries.move_to_end(cached.etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
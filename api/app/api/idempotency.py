@@ -0,0 +1,71 @@
+"""冪等請求：帶 Idempotency-Key 標頭的寫入請求，重送時原樣回放第一次的回應。
+
+網路不穩的學生會重複交卷，第二次原本得到 400（已完成）；教師評分重送則會重算並再次呼叫 LLM。
+帶鍵的請求流程：
+1. 在請求的交易中取得該鍵的 advisory lock（app.repositories.idempotency_repo.lock_key），
+   同鍵的並行請求在此排隊，等先到者 commit 後才繼續；
+2. 已有紀錄時直接回放儲存的位元組（附 Idempotent-Replayed: true），不重算、不呼叫 LLM；
+   同一個鍵帶著不同的請求內容則回 422；
+3. 否則照常處理，回應序列化後與請求本身的寫入在同一個交易中儲存，commit 失敗則兩者都不生效。
+只有成功的回應會被儲存；錯誤回應（HTTPException）會回滾，重送時重新處理。
+未帶鍵的請求行為不變。
+"""
+
+import hashlib
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import counter
+from app.repositories.idempotency_repo import add_stored_response, get_stored_response, lock_key
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+_replays = counter("idempotent_replays_total", "以儲存的回應回放的重送請求數", ("route",))
+
+
+def request_hash(body: BaseModel) -> str:
+    """請求內容的雜湊，用來辨識同一個鍵是否被用在不同的請求上。"""
+    return hashlib.sha256(body.model_dump_json().encode("utf-8")).hexdigest()
+
+
+class IdempotentRequest:
+    """單一請求的冪等狀態；replay 不為 None 時路由應直接回傳它。"""
+
+    def __init__(self, db: AsyncSession, scope: str, key: str | None, body_hash: str) -> None:
+        self.db = db
+        self.scope = scope
+        self.key = key
+        self.body_hash = body_hash
+        self.replay: Response | None = None
+
+    def respond(self, model: BaseModel, status_code: int = 200) -> BaseModel | Response:
+        """序列化回應並記錄於目前交易（須在 commit 之前呼叫）；未帶鍵時原樣回傳模型。"""
+        if self.key is None:
+            return model
+        body = model.model_dump_json().encode("utf-8")
+        add_stored_response(self.db, self.scope, self.key, self.body_hash, status_code, body)
+        return Response(body, status_code=status_code, media_type="application/json")
+
+
+async def begin_idempotent(db: AsyncSession, scope: str, key: str | None, body: BaseModel) -> IdempotentRequest:
+    """取得鍵的鎖並查詢已儲存的回應；scope 格式為「路由:身分」，路由部分作為指標標籤。"""
+    request = IdempotentRequest(db, scope, key, request_hash(body))
+    if key is None:
+        return request
+    await lock_key(db, scope, key)
+    stored = await get_stored_response(db, scope, key)
+    if stored is None:
+        return request
+    if stored.request_hash != request.body_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key 已用於不同內容的請求")
+    _replays.labels(scope.split(":", 1)[0]).inc()
+    request.replay = Response(
+        stored.response_body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+    return request
@@ -0,0 +1,33 @@
+"""JSON 回應輸出：以 orjson 序列化的預設回應類別，以及由查詢列直接轉為位元組的列表回應。
+
+有 response_model 的路由由 FastAPI 以 pydantic 直接輸出位元組；大量資料的列表
+（驗證碼、成績）則連 pydantic 模型都不建立：查詢只取輸出欄位並 label 成 API 欄位名，
+每列轉 dict 後一次 orjson.dumps，省去建立模型、回應驗證與 jsonable_encoder。
+datetime 以 OPT_UTC_Z 輸出為 "...Z"，與 pydantic 的格式一致。
+"""
+
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import Row
+
+_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(JSONResponse):
+    """以 orjson 序列化的 JSONResponse，作為 app 的 default_response_class。"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_OPTIONS)
+
+
+def json_bytes_response(items: Sequence[Mapping[str, Any]]) -> Response:
+    """將已符合輸出格式的 dict 列表直接序列化為回應（不經 response_model 驗證）。"""
+    return Response(orjson.dumps(items, option=_OPTIONS), media_type="application/json")
+
+
+def rows_response(rows: Iterable[Row]) -> Response:
+    """將欄位已 label 為輸出欄位名稱的查詢列直接序列化為 JSON 陣列。"""
+    return json_bytes_response([row._asdict() for row in rows])
@@ -0,0 +1,37 @@
+"""Prometheus 抓取端點：以文字格式輸出所有指標。
+
+必須設定 METRICS_TOKEN，抓取時帶 Authorization: Bearer <token>；未設定時端點停用（404），
+避免指標（路由、流量、錯誤率）在未設定權杖的部署上公開。設定 METRICS_DIR（多 worker）時輸出所有 worker 的加總，
+否則只有處理本次請求的 worker。
+"""
+
+import asyncio
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.metrics import render_prometheus
+from app.core.metrics_multiprocess import render_all
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request, authorization: str | None = Header(default=None)):
+    """回傳 Prometheus 文字格式的指標。"""
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.metrics_token}"
+    if authorization is None or not hmac.compare_digest(authorization, expected):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    if settings.metrics_dir:
+        exporter = getattr(request.app.state, "metrics_exporter", None)
+        own_file = exporter.path if exporter is not None else None
+        body = await asyncio.to_thread(render_all, settings.metrics_dir, own_file)
+    else:
+        body = render_prometheus()
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
@@ -8,8 +8,12 @@ from app.api.schemas import (
     ExamListOut,
     ExamSubmissionIn,
 )
+from app.api.http_cache import cached_response, template_body
+from app.core.admission import admit
+from app.domain.adaptive import adaptive_engine
+from app.domain.compiled_template import CompiledTemplate
 from app.domain.exam_registry import ExamRegistry
-from app.domain.models import ExamSubmission, ExamTemplate, QuestionResult
+from app.domain.models import AssessmentResult, ExamSubmission, ExamTemplate, QuestionResult
 from app.domain.scoring import generate_assessment
 from app.services.analysis_service import generate_ai_analysis
 from app.services.llm_client import LLMClient
@@ -27,19 +31,31 @@ def _get_llm_client(request: Request) -> LLMClient | None:
     return request.app.state.llm_client
 
 
+def _assess(compiled: CompiledTemplate, submission: ExamSubmission) -> AssessmentResult:
+    """評分；適性試卷須已施測完畢，並以能力估計補齊未抽到的題目。"""
+    if compiled.template.adaptive is not None:
+        scores = {r.question_id: r.score for r in submission.results}
+        return adaptive_engine(compiled).assess(submission.student_name, scores)[0]
+    return generate_assessment(compiled.template, submission)
+
+
 @router.get("/exams", response_model=ExamListOut)
 async def list_exams(registry: ExamRegistry = Depends(_get_registry)):
     """列出所有可用的測驗卷 ID。"""
-    return ExamListOut(exam_ids=registry.list_ids())
+    return ExamListOut(exam_ids=await registry.list_active_ids())
 
 
 @router.get("/exams/{exam_id}", response_model=ExamTemplate)
-async def get_exam(exam_id: str, registry: ExamRegistry = Depends(_get_registry)):
-    """取得指定測驗卷的完整模板，找不到時回傳 404。"""
-    template = registry.get(exam_id)
-    if template is None:
+async def get_exam(exam_id: str, request: Request, registry: ExamRegistry = Depends(_get_registry)):
+    """取得指定測驗卷的完整模板，找不到時回傳 404。
+
+    回傳預先序列化的位元組並附 ETag；If-None-Match 相符時回傳 304。
+    """
+    compiled = await registry.resolve(exam_id)
+    if compiled is None:
         raise HTTPException(status_code=404, detail=f"Exam not found: {exam_id}")
-    return template
+    cached = template_body(compiled)
+    return cached_response(request, cached.body, cached.gzip, cached.etag, "public, no-cache")
 
 
 @router.post("/exams/{exam_id}/assess", response_model=AssessmentResultOut)
@@ -52,8 +68,8 @@ async def assess(
 
     驗證 exam_id 存在且與 body 一致，無效的 question_id 回傳 422。
     """
-    template = registry.get(exam_id)
-    if template is None:
+    compiled = await registry.resolve(exam_id)
+    if compiled is None:
         raise HTTPException(status_code=404, detail=f"Exam not found: {exam_id}")
 
     if body.exam_id != exam_id:
@@ -66,7 +82,7 @@ async def assess(
     )
 
     try:
-        result = generate_assessment(template, submission)
+        result = _assess(compiled, submission)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
@@ -79,6 +95,7 @@ async def assess_with_analysis(
     body: ExamSubmissionIn,
     registry: ExamRegistry = Depends(_get_registry),
     llm_client: LLMClient | None = Depends(_get_llm_client),
+    _: None = Depends(admit("analysis"), scope="function"),
 ):
     """提交學生作答並取得評估結果與 AI 分析報告。
 
@@ -88,8 +105,8 @@ async def assess_with_analysis(
     if llm_client is None:
         raise HTTPException(status_code=503, detail="AI 分析服務未啟用（未設定 LLM 客戶端）")
 
-    template = registry.get(exam_id)
-    if template is None:
+    compiled = await registry.resolve(exam_id)
+    if compiled is None:
         raise HTTPException(status_code=404, detail=f"Exam not found: {exam_id}")
 
     if body.exam_id != exam_id:
@@ -102,7 +119,7 @@ async def assess_with_analysis(
     )
 
     try:
-        result = generate_assessment(template, submission)
+        result = _assess(compiled, submission)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
@@ -2,20 +2,29 @@
 
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.http_cache import BodyCache, CachedBody, cached_response, exam_content_response, make_etag
+from app.api.idempotency import IDEMPOTENCY_KEY_MAX_LENGTH, begin_idempotent
 from app.auth.dependencies import get_student_session_payload
-from app.db.engine import get_db
-from app.db.models import ExamSession, ExamTemplateRecord, VerificationCode
+from app.core.admission import admit
+from app.core.config import settings
+from app.db.engine import get_db, get_read_db, has_read_replica
+from app.db.models import ExamSession, VerificationCode
+from app.domain.adaptive import adaptive_engine
 from app.domain.models import ExamSubmission, ExamTemplate, QuestionResult
 from app.domain.scoring import generate_assessment
+from app.repositories.session_repo import session_key
 from app.services.analysis_service import generate_ai_analysis
 
 router = APIRouter(prefix="/api/student", tags=["student"])
 
+# 已完成測驗結果的序列化位元組（依 ETag）
+_result_bodies = BodyCache(max_entries=1000)
+
 
 # === Schemas ===
 
@@ -31,6 +40,20 @@ class SubmitAnswersRequest(BaseModel):
     results: list[dict]  # [{"question_id": str, "score": float}]
 
 
+class AutosaveOut(BaseModel):
+    results: list[dict]
+    saved_at: float | None  # 伺服器收到此份暫存的時間（epoch 秒），沒有暫存時為 None
+
+
+class NextQuestionOut(BaseModel):
+    question_id: str | None
+    section_id: str | None
+    theta: float
+    se: float
+    answered: int
+    done: bool
+
+
 class ExamResultOut(BaseModel):
     student_name: str
     exam_id: str
@@ -39,15 +62,22 @@ class ExamResultOut(BaseModel):
     ai_analysis: dict | None
 
 
+def _token_started_at(payload: dict) -> datetime | None:
+    """token 中 session 的 started_at（分區鍵）；此欄位加入前簽發的 token 沒有，回傳 None。"""
+    value = payload.get("started_at")
+    return datetime.fromisoformat(value) if value else None
+
+
 # === Endpoints ===
 
 @router.get("/exam/{session_id}", response_model=ExamContentOut)
 async def get_exam_content(
     session_id: str,
+    request: Request,
     payload: dict = Depends(get_student_session_payload),
     db: AsyncSession = Depends(get_db),
 ):
-    """取得測驗內容（題目）。"""
+    """取得測驗內容（題目），回應格式為 ExamContentOut。"""
     import uuid
 
     # 驗證 session 歸屬
@@ -58,8 +88,9 @@ async def get_exam_content(
         sid = uuid.UUID(session_id)
     except ValueError:
         raise HTTPException(status_code=422, detail="無效的 session ID")
+    key = session_key(sid, _token_started_at(payload))  # 帶分區鍵，只查該月的分區
 
-    result = await db.execute(select(ExamSession).where(ExamSession.id == sid))
+    result = await db.execute(select(ExamSession).where(key))
     session = result.scalar_one_or_none()
     if session is None:
         raise HTTPException(status_code=404, detail="找不到測驗紀錄")
@@ -67,21 +98,124 @@ async def get_exam_content(
     if session.status == "completed":
         raise HTTPException(status_code=400, detail="此測驗已完成，請查看結果")
 
-    # 取得試卷模板
-    result = await db.execute(
-        select(ExamTemplateRecord).where(ExamTemplateRecord.exam_id == session.exam_id)
-    )
-    template_record = result.scalar_one_or_none()
-    if template_record is None:
+    # 取得試卷模板（registry 快取，不再每次讀取 JSONB）
+    compiled = await request.app.state.registry.resolve(session.exam_id)
+    if compiled is None:
         raise HTTPException(status_code=404, detail="找不到試卷")
 
-    return ExamContentOut(
-        exam_id=session.exam_id,
-        name=template_record.name,
-        session_id=str(session.id),
-        student_name=session.student_name,
-        template=template_record.template_data,
-    )
+    # 模板部分已預先序列化與壓縮，只需補上 session 欄位；重新整理時以 ETag 回 304
+    return exam_content_response(request, compiled, str(session.id), session.student_name)
+
+
+@router.post("/exam/{session_id}/next", response_model=NextQuestionOut)
+async def next_question(
+    session_id: str,
+    body: SubmitAnswersRequest,
+    request: Request,
+    payload: dict = Depends(get_student_session_payload),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """適性測驗：依目前作答選出下一題。無狀態，作答紀錄由前端每次帶入，不寫入資料庫。"""
+    import uuid
+
+    if payload.get("session_id") != session_id:
+        raise HTTPException(status_code=403, detail="無權存取此測驗")
+
+    # 新簽發的 token 已帶 exam_id，不需查詢 session
+    exam_id = payload.get("exam_id")
+    if exam_id is None:
+        try:
+            sid = uuid.UUID(session_id)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="無效的 session ID")
+        key = session_key(sid, _token_started_at(payload))
+        result = await db.execute(select(ExamSession.exam_id).where(key))
+        exam_id = result.scalar_one_or_none()
+        if exam_id is None:
+            raise HTTPException(status_code=404, detail="找不到測驗紀錄")
+
+    compiled = await request.app.state.registry.resolve(exam_id)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail="找不到試卷")
+    if compiled.template.adaptive is None:
+        raise HTTPException(status_code=400, detail="此試卷不是適性測驗")
+
+    try:
+        # 與交卷相同，以 QuestionResult 驗證得分率在 0～1 之間
+        results = [QuestionResult(question_id=r["question_id"], score=r["score"]) for r in body.results]
+        nxt = adaptive_engine(compiled).next_question({r.question_id: r.score for r in results})
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return NextQuestionOut(**nxt.__dict__)
+
+
+@router.put("/exam/{session_id}/autosave", response_model=AutosaveOut, status_code=202)
+async def autosave_answers(
+    session_id: str,
+    body: SubmitAnswersRequest,
+    request: Request,
+    payload: dict = Depends(get_student_session_payload),
+    db: AsyncSession = Depends(get_db),
+):
+    """暫存作答中的答案（覆蓋前一份）。先放在記憶體，數秒內批次寫入資料庫（見 app.services.autosave_buffer）。
+
+    同一個 session 只有第一次儲存會查詢 started_at 與狀態，之後的儲存不碰資料庫。
+    """
+    import uuid
+
+    if payload.get("session_id") != session_id:
+        raise HTTPException(status_code=403, detail="無權存取此測驗")
+
+    try:
+        sid = uuid.UUID(session_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="無效的 session ID")
+    key = session_key(sid, _token_started_at(payload))
+
+    autosave = request.app.state.autosave
+    started_at = autosave.started_at(sid)
+    if started_at is None:
+        result = await db.execute(select(ExamSession.started_at, ExamSession.status).where(key))
+        row = result.first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="找不到測驗紀錄")
+        if row.status == "completed":
+            raise HTTPException(status_code=400, detail="此測驗已完成，不可再儲存")
+        started_at = row.started_at
+        autosave.remember(sid, started_at)
+
+    return AutosaveOut(**autosave.put(sid, started_at, body.results))
+
+
+@router.get("/exam/{session_id}/autosave", response_model=AutosaveOut)
+async def get_autosaved_answers(
+    session_id: str,
+    request: Request,
+    payload: dict = Depends(get_student_session_payload),
+    db: AsyncSession = Depends(get_db),
+):
+    """取得最近一次暫存的作答（重新開啟頁面時還原）。
+
+    本 worker 尚未寫入的暫存優先；多 worker 時可能取得最多一個寫入週期前的版本。
+    """
+    import uuid
+
+    if payload.get("session_id") != session_id:
+        raise HTTPException(status_code=403, detail="無權存取此測驗")
+
+    try:
+        sid = uuid.UUID(session_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="無效的 session ID")
+    key = session_key(sid, _token_started_at(payload))
+
+    answers = request.app.state.autosave.get(sid)
+    if answers is None:
+        result = await db.execute(select(ExamSession.answers).where(key))
+        answers = result.scalar_one_or_none()
+    if not answers:
+        return AutosaveOut(results=[], saved_at=None)
+    return AutosaveOut(results=answers.get("results", []), saved_at=answers.get("saved_at"))
 
 
 @router.post("/exam/{session_id}/submit", response_model=ExamResultOut)
@@ -90,9 +224,11 @@ async def submit_answers(
     body: SubmitAnswersRequest,
     request: Request,
     payload: dict = Depends(get_student_session_payload),
+    _: None = Depends(admit("submit"), scope="function"),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(default=None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH),
 ):
-    """提交學生作答，計算評分。"""
+    """提交學生作答，計算評分。帶 Idempotency-Key 的重送回放第一次的結果（見 app.api.idempotency）。"""
     import uuid
 
     if payload.get("session_id") != session_id:
@@ -102,8 +238,13 @@ async def submit_answers(
         sid = uuid.UUID(session_id)
     except ValueError:
         raise HTTPException(status_code=422, detail="無效的 session ID")
+    key = session_key(sid, _token_started_at(payload))
+
+    idem = await begin_idempotent(db, f"submit:{sid}", idempotency_key, body)
+    if idem.replay is not None:
+        return idem.replay
 
-    result = await db.execute(select(ExamSession).where(ExamSession.id == sid))
+    result = await db.execute(select(ExamSession).where(key))
     session = result.scalar_one_or_none()
     if session is None:
         raise HTTPException(status_code=404, detail="找不到測驗紀錄")
@@ -113,9 +254,10 @@ async def submit_answers(
 
     # 取得 ExamTemplate（從 registry）
     registry = request.app.state.registry
-    template = registry.get(session.exam_id)
-    if template is None:
+    compiled = await registry.resolve(session.exam_id)
+    if compiled is None:
         raise HTTPException(status_code=404, detail="找不到試卷")
+    template = compiled.template
 
     # 評分
     submission = ExamSubmission(
@@ -125,7 +267,14 @@ async def submit_answers(
     )
 
     try:
-        assessment = generate_assessment(template, submission)
+        if template.adaptive is not None:
+            # 適性測驗：須已施測完畢（否則 422）；未抽到的題目以能力估計的期望得分補齊，儲存向量只記錄實際作答
+            assessment, scores = adaptive_engine(compiled).assess(
+                session.student_name, {r.question_id: r.score for r in submission.results}
+            )
+        else:
+            assessment = generate_assessment(template, submission)
+            scores = compiled.to_vector({r.question_id: r.score for r in submission.results})
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
@@ -139,9 +288,10 @@ async def submit_answers(
         except Exception:
             pass
 
-    # 更新 session
-    session.answers = {r["question_id"]: r["score"] for r in body.results}
-    session.results = {r["question_id"]: r["score"] for r in body.results}
+    # 更新 session：各題得分以向量儲存，作答暫存隨之清空（記憶體中尚未寫入的暫存也一併丟棄）
+    request.app.state.autosave.discard(sid)
+    session.scores = scores
+    session.answers = None
     session.assessment = assessment.model_dump()
     session.ai_analysis = ai_analysis_data
     session.status = "completed"
@@ -155,24 +305,28 @@ async def submit_answers(
     if vc:
         vc.status = "completed"
 
-    await db.commit()
-
-    return ExamResultOut(
-        student_name=session.student_name,
-        exam_id=session.exam_id,
-        status=session.status,
-        assessment=session.assessment,
-        ai_analysis=session.ai_analysis,
+    response = idem.respond(
+        ExamResultOut(
+            student_name=session.student_name,
+            exam_id=session.exam_id,
+            status=session.status,
+            assessment=session.assessment,
+            ai_analysis=session.ai_analysis,
+        )
     )
+    await db.commit()
+    return response
 
 
 @router.get("/result/{session_id}", response_model=ExamResultOut)
 async def get_exam_result(
     session_id: str,
+    request: Request,
     payload: dict = Depends(get_student_session_payload),
+    read_db: AsyncSession = Depends(get_read_db),
     db: AsyncSession = Depends(get_db),
 ):
-    """取得測驗結果。"""
+    """取得測驗結果（優先讀取唯讀副本）。已完成的結果附 ETag，可回 304。"""
     import uuid
 
     if payload.get("session_id") != session_id:
@@ -182,16 +336,33 @@ async def get_exam_result(
         sid = uuid.UUID(session_id)
     except ValueError:
         raise HTTPException(status_code=422, detail="無效的 session ID")
+    key = session_key(sid, _token_started_at(payload))
 
-    result = await db.execute(select(ExamSession).where(ExamSession.id == sid))
+    result = await read_db.execute(select(ExamSession).where(key))
     session = result.scalar_one_or_none()
+
+    # read-your-writes：剛提交後副本可能尚未同步，未見完成結果時改讀主庫
+    if settings.read_your_writes and has_read_replica() and (session is None or session.status != "completed"):
+        result = await db.execute(select(ExamSession).where(key))
+        session = result.scalar_one_or_none()
+
     if session is None:
         raise HTTPException(status_code=404, detail="找不到測驗紀錄")
 
-    return ExamResultOut(
+    out = ExamResultOut(
         student_name=session.student_name,
         exam_id=session.exam_id,
         status=session.status,
         assessment=session.assessment,
         ai_analysis=session.ai_analysis,
     )
+    if session.status != "completed":
+        return out
+
+    # 已完成的結果只會因重新評分而改變（completed_at 隨之更新），以此作為版本
+    etag = make_etag("result", session.id, session.completed_at)
+    cached = _result_bodies.get(etag)
+    if cached is None:
+        cached = CachedBody.from_json(out.model_dump_json().encode("utf-8"), etag)
+        _result_bodies.put(cached)
+    return cached_response(request, cached.body, cached.gzip, cached.etag, "private, no-cache")
@@ -1,14 +1,20 @@
 """教師後台路由：驗證碼管理、成績查看、手動評分。"""
 
 from datetime import datetime, timezone
+from typing import Literal
+from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.idempotency import IDEMPOTENCY_KEY_MAX_LENGTH, begin_idempotent
+from app.api.json_response import json_bytes_response, rows_response
 from app.auth.dependencies import require_role
-from app.db.engine import get_db
+from app.core.admission import admit
+from app.db.engine import get_db, get_read_db, read_session_factory
 from app.db.models import (
     ExamSession,
     ExamTemplateRecord,
@@ -18,13 +24,22 @@ from app.db.models import (
 )
 from app.domain.models import ExamSubmission, ExamTemplate, QuestionResult
 from app.domain.scoring import generate_assessment
-from app.repositories.session_repo import get_session_by_id, get_sessions_by_teacher
-from app.repositories.verification_repo import create_codes, get_codes_by_teacher
+from app.repositories.session_repo import (
+    get_question_score_stats,
+    get_session_by_id,
+    list_session_rows,
+    stream_sessions_for_export,
+)
+from app.repositories.verification_repo import create_codes, list_code_rows
 from app.services.analysis_service import generate_ai_analysis
+from app.services.bulk_import_service import BulkImportFileError, BulkImportReport, import_scores, read_table
+from app.services.export_service import iter_csv, iter_parquet, parquet_available
 from app.services.verification_service import generate_verification_codes
 
 router = APIRouter(prefix="/api/teacher", tags=["teacher"])
 
+MAX_IMPORT_BYTES = 5 * 1024 * 1024
+
 
 # === Schemas ===
 
@@ -64,6 +79,12 @@ class SessionDetailOut(SessionOut):
     ai_analysis: dict | None
 
 
+class QuestionStatOut(BaseModel):
+    question_id: str
+    average_score: float
+    answered_count: int
+
+
 class TeacherScoringRequest(BaseModel):
     verification_code: str
     student_name: str
@@ -76,7 +97,7 @@ class TeacherScoringRequest(BaseModel):
 @router.get("/exams", response_model=list[ExamAccessOut])
 async def list_teacher_exams(
     user: User = Depends(require_role("teacher", "admin")),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """取得教師可用的試卷列表。Admin 可看到所有試卷。"""
     if user.role == "admin":
@@ -125,69 +146,101 @@ async def generate_codes(
         raise HTTPException(status_code=422, detail=str(e))
 
     created = await create_codes(db, codes)
-    return [
-        CodeOut(
-            code=c.code,
-            prefix=c.prefix,
-            student_number=c.student_number,
-            status=c.status,
-            exam_id=body.exam_id,
-            created_at=c.created_at,
-        )
+    return json_bytes_response([
+        {
+            "code": c.code,
+            "prefix": c.prefix,
+            "student_number": c.student_number,
+            "status": c.status,
+            "exam_id": body.exam_id,
+            "created_at": c.created_at,
+        }
         for c in created
-    ]
+    ])
 
 
 @router.get("/codes", response_model=list[CodeOut])
 async def list_codes(
     exam_id: str | None = None,
     user: User = Depends(require_role("teacher", "admin")),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """取得教師的驗證碼列表。"""
-    codes = await get_codes_by_teacher(db, user.id, exam_id)
-    return [
-        CodeOut(
-            code=c.code,
-            prefix=c.prefix,
-            student_number=c.student_number,
-            status=c.status,
-            exam_id=c.exam_template.exam_id if c.exam_template else "",
-            created_at=c.created_at,
-        )
-        for c in codes
-    ]
+    # 最多數千筆：查詢列直接序列化，不建立 CodeOut 也不做回應驗證
+    return rows_response(await list_code_rows(db, user.id, exam_id))
 
 
 @router.get("/results", response_model=list[SessionOut])
 async def list_results(
     exam_id: str | None = None,
     user: User = Depends(require_role("teacher", "admin")),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """取得學生成績列表。"""
-    sessions = await get_sessions_by_teacher(db, user.id, exam_id)
+    return rows_response(await list_session_rows(db, SessionOut.model_fields, user.id, exam_id))
+
+
+@router.get("/exams/{exam_id}/question-stats", response_model=list[QuestionStatOut])
+async def get_question_stats(
+    exam_id: str,
+    request: Request,
+    user: User = Depends(require_role("teacher", "admin")),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """取得試卷各題的平均得分率（由資料庫直接彙總分數向量）。Admin 可看到所有學生。"""
+    compiled = await request.app.state.registry.resolve(exam_id)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail="找不到試卷")
+
+    teacher_id = None if user.role == "admin" else user.id
+    stats = await get_question_score_stats(db, exam_id, teacher_id)
     return [
-        SessionOut(
-            session_id=str(s.id),
-            student_name=s.student_name,
-            exam_id=s.exam_id,
-            code=s.verification_code.code if s.verification_code else "",
-            status=s.status,
-            started_at=s.started_at,
-            completed_at=s.completed_at,
-        )
-        for s in sessions
+        QuestionStatOut(question_id=compiled.question_ids[i], average_score=round(avg, 4), answered_count=n)
+        for i, avg, n in stats
+        if i < len(compiled)
     ]
 
 
+@router.get("/results/export")
+async def export_results(
+    exam_id: str | None = None,
+    format: Literal["csv", "parquet"] = "csv",
+    user: User = Depends(require_role("teacher", "admin")),
+):
+    """串流匯出學生成績（CSV 或 Parquet），知識點與素養分數攤平為欄位。"""
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="伺服器未安裝 pyarrow，無法匯出 Parquet")
+
+    async def _batches():
+        # 串流期間自行持有 session，回應送完才釋放連線
+        async with read_session_factory() as db:
+            async for rows in stream_sessions_for_export(db, user.id, exam_id):
+                yield rows
+
+    if format == "parquet":
+        body, media_type = iter_parquet(_batches()), "application/vnd.apache.parquet"
+    else:
+        body, media_type = iter_csv(_batches()), "text/csv; charset=utf-8"
+
+    filename = f"results_{exam_id or 'all'}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"},
+    )
+
+
 @router.get("/results/{session_id}", response_model=SessionDetailOut)
 async def get_result_detail(
     session_id: str,
+    started_at: datetime | None = None,
     user: User = Depends(require_role("teacher", "admin")),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """取得個別學生的詳細報告。"""
+    """取得個別學生的詳細報告。
+
+    started_at 為列表回傳的開始時間（分區鍵），帶上時只查詢該月的分區。
+    """
     import uuid as uuid_mod
 
     try:
@@ -195,7 +248,7 @@ async def get_result_detail(
     except ValueError:
         raise HTTPException(status_code=422, detail="無效的 session ID")
 
-    session = await get_session_by_id(db, sid)
+    session = await get_session_by_id(db, sid, started_at)
     if session is None:
         raise HTTPException(status_code=404, detail="找不到該測驗紀錄")
 
@@ -221,12 +274,21 @@ async def teacher_scoring(
     body: TeacherScoringRequest,
     request: Request,
     user: User = Depends(require_role("teacher", "admin")),
+    _: None = Depends(admit("submit"), scope="function"),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(default=None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH),
 ):
-    """教師手動評分：輸入驗證碼的每題得分，系統計算評估結果。"""
-    # 查詢驗證碼
+    """教師手動評分：輸入驗證碼的每題得分，系統計算評估結果。
+
+    帶 Idempotency-Key 的重送回放第一次的結果，不重算也不再呼叫 LLM（見 app.api.idempotency）。
+    """
+    idem = await begin_idempotent(db, f"scoring:{user.id}", idempotency_key, body)
+    if idem.replay is not None:
+        return idem.replay
+
+    # 查詢驗證碼（鎖定該列，避免重複送出時建立多筆 session）
     result = await db.execute(
-        select(VerificationCode).where(VerificationCode.code == body.verification_code)
+        select(VerificationCode).where(VerificationCode.code == body.verification_code).with_for_update()
     )
     vc = result.scalar_one_or_none()
     if vc is None:
@@ -237,9 +299,13 @@ async def teacher_scoring(
 
     # 取得 ExamTemplate（從 registry）
     registry = request.app.state.registry
-    template = registry.get(body.exam_id)
-    if template is None:
+    compiled = await registry.resolve(body.exam_id)
+    if compiled is None:
         raise HTTPException(status_code=404, detail="找不到試卷")
+    template = compiled.template
+    if template.adaptive is not None:
+        # 適性試卷的題目依學生即時作答選出，紙本逐題輸入的分數無法對應
+        raise HTTPException(status_code=422, detail="適性試卷需由學生線上作答，不支援手動評分")
 
     # 建立 submission 並評分
     submission = ExamSubmission(
@@ -263,6 +329,8 @@ async def teacher_scoring(
         except Exception:
             pass  # AI 失敗不阻擋評分
 
+    scores = compiled.to_vector({r["question_id"]: r["score"] for r in body.results})
+
     # 建立或更新 session
     result = await db.execute(
         select(ExamSession).where(ExamSession.verification_code_id == vc.id)
@@ -275,7 +343,7 @@ async def teacher_scoring(
             verification_code_id=vc.id,
             student_name=body.student_name,
             exam_id=body.exam_id,
-            results={r["question_id"]: r["score"] for r in body.results},
+            scores=scores,
             assessment=assessment.model_dump(),
             ai_analysis=ai_analysis_data,
             status="completed",
@@ -283,24 +351,53 @@ async def teacher_scoring(
         )
         db.add(session)
     else:
-        session.results = {r["question_id"]: r["score"] for r in body.results}
+        session.scores = scores
+        session.answers = None
         session.assessment = assessment.model_dump()
         session.ai_analysis = ai_analysis_data
         session.status = "completed"
         session.completed_at = datetime.now(timezone.utc)
         vc.status = "completed"
 
-    await db.commit()
+    # 先 flush 取得 started_at 等資料庫預設值，回應才能與寫入在同一個交易中儲存
+    await db.flush()
     await db.refresh(session)
-
-    return SessionDetailOut(
-        session_id=str(session.id),
-        student_name=session.student_name,
-        exam_id=session.exam_id,
-        code=vc.code,
-        status=session.status,
-        started_at=session.started_at,
-        completed_at=session.completed_at,
-        assessment=session.assessment,
-        ai_analysis=session.ai_analysis,
+    response = idem.respond(
+        SessionDetailOut(
+            session_id=str(session.id),
+            student_name=session.student_name,
+            exam_id=session.exam_id,
+            code=vc.code,
+            status=session.status,
+            started_at=session.started_at,
+            completed_at=session.completed_at,
+            assessment=session.assessment,
+            ai_analysis=session.ai_analysis,
+        )
     )
+    await db.commit()
+    return response
+
+
+@router.post("/scoring/import", response_model=BulkImportReport)
+async def import_scoring(
+    request: Request,
+    exam_id: str = Form(...),
+    file: UploadFile = File(...),
+    user: User = Depends(require_role("teacher", "admin")),
+    db: AsyncSession = Depends(get_db),
+):
+    """批次匯入紙本成績（CSV / XLSX）：整份驗證後批次評分寫入，錯誤列逐列回報。"""
+    compiled = await request.app.state.registry.resolve(exam_id)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail="找不到試卷")
+
+    data = await file.read(MAX_IMPORT_BYTES + 1)
+    if len(data) > MAX_IMPORT_BYTES:
+        raise HTTPException(status_code=413, detail="檔案大小超過 5 MB")
+
+    try:
+        table = read_table(file.filename or "", data)
+        return await import_scores(db, user, compiled, table)
+    except BulkImportFileError as e:
+        raise HTTPException(status_code=422, detail=str(e))
@@ -6,6 +6,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.security import decode_access_token
+from app.auth.user_cache import user_cache
 from app.db.engine import get_db
 from app.db.models import User
 
@@ -16,7 +17,12 @@ async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    """從 Bearer token 解析當前使用者，驗證失敗時拋出 401。"""
+    """從 Bearer token 解析當前使用者，驗證失敗時拋出 401。
+
+    啟用中的使用者會快取在 user_cache，命中時不查詢資料庫。
+    未命中時查詢後立即結束交易歸還連線：之後的准入控制（admit）可能排隊，
+    排隊期間不應佔住連線池（session 為 expire_on_commit=False，user 仍可使用）。
+    """
     payload = decode_access_token(credentials.credentials)
     if payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="無效的認證 token")
@@ -25,11 +31,17 @@ async def get_current_user(
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token 缺少使用者資訊")
 
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
     result = await db.execute(select(User).where(User.id == user_id, User.is_active.is_(True)))
     user = result.scalar_one_or_none()
+    await db.commit()
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="使用者不存在或已停用")
 
+    user_cache.put(user_id, user)
     return user
 
 
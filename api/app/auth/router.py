@@ -1,17 +1,29 @@
 """認證路由：登入與驗證碼驗證端點。"""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+import uuid
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import insert, literal, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.security import create_access_token, verify_password
+from app.auth.security import create_access_token, verify_and_rehash
 from app.core.config import settings
+from app.core.metrics import counter
+from app.core.rate_limit import SlidingWindowLimiter
 from app.db.engine import get_db
-from app.db.models import User, VerificationCode
+from app.db.models import ExamSession, ExamTemplateRecord, User, VerificationCode
+from app.services.code_index import code_index, split_code
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+# 驗證碼查無資料的次數限制：分別以來源 IP 與前綴計數，超過即暫時拒絕
+_ip_misses = SlidingWindowLimiter(settings.verify_code_ip_miss_limit, settings.verify_code_window_seconds)
+_prefix_misses = SlidingWindowLimiter(settings.verify_code_prefix_miss_limit, settings.verify_code_window_seconds)
+_rate_limited = counter("verify_code_rate_limited_total", "因查無次數過多而拒絕的驗證碼請求")
+
 
 class LoginRequest(BaseModel):
     username: str
@@ -35,7 +47,7 @@ class VerifyCodeResponse(BaseModel):
     token_type: str = "bearer"
     exam_id: str
     session_id: str
-    status: str  # "new" or "completed"
+    status: str  # "new", "in_progress" or "completed"
 
 
 @router.post("/login", response_model=LoginResponse)
@@ -45,93 +57,149 @@ async def login(body: LoginRequest, db: AsyncSession = Depends(get_db)):
         select(User).where(User.username == body.username, User.is_active.is_(True))
     )
     user = result.scalar_one_or_none()
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="帳號或密碼錯誤")
 
-    if user is None or not verify_password(body.password, user.hashed_password):
+    valid, new_hash = await verify_and_rehash(body.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="帳號或密碼錯誤")
+    if new_hash is not None:
+        # bcrypt cost 已調整：以新 cost 寫回雜湊值
+        user.hashed_password = new_hash
+        await db.commit()
 
     token = create_access_token({"sub": str(user.id), "role": user.role})
     return LoginResponse(access_token=token, role=user.role, display_name=user.display_name)
 
 
 @router.post("/verify-code", response_model=VerifyCodeResponse)
-async def verify_code(body: VerifyCodeRequest, db: AsyncSession = Depends(get_db)):
-    """學生輸入驗證碼，建立或取得測驗 session。"""
-    from app.db.models import ExamSession, ExamTemplateRecord
+async def verify_code(request: Request, body: VerifyCodeRequest, db: AsyncSession = Depends(get_db)):
+    """學生輸入驗證碼，建立或取得測驗 session。
 
-    result = await db.execute(
-        select(VerificationCode).where(VerificationCode.code == body.code)
-    )
-    vc = result.scalar_one_or_none()
+    一次 join 查出驗證碼、試卷與既有 session；新驗證碼則以單一語句完成
+    「unused → in_progress 狀態轉換 + 建立 session」，同一驗證碼同時送出時
+    只有一個請求能轉換成功，其餘請求取回同一筆 session。
 
-    if vc is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="驗證碼不存在")
+    驗證碼索引確定不存在的驗證碼不查詢資料庫，直接判定查無。同一 IP 或同一前綴近期查無次數
+    過多時，查無改回 429；兩者都只在查無時檢查，存在的驗證碼不會因同一 NAT 出口的其他學生
+    打錯，或同前綴被他人猜測而被擋下。
 
-    # 取得對應的 exam_id
-    template_result = await db.execute(
-        select(ExamTemplateRecord).where(ExamTemplateRecord.id == vc.exam_template_id)
-    )
-    template_record = template_result.scalar_one_or_none()
-    if template_record is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="對應的試卷不存在")
+    來源 IP 取自 request.client：部署於反向代理之後時，由 uvicorn 依 gunicorn.conf.py 的
+    forwarded_allow_ips 信任代理的 X-Forwarded-For，還原為真實的學生 IP。
+    """
+    ip_key = request.client.host if request.client else "unknown"
+    parts = split_code(body.code)
+    prefix_key = parts[0] if parts else body.code
 
-    if vc.status == "completed":
-        # 已完成的驗證碼 → 回傳結果 (唯讀)
-        session_result = await db.execute(
-            select(ExamSession).where(ExamSession.verification_code_id == vc.id)
-        )
-        session = session_result.scalar_one_or_none()
-        if session is None:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="資料異常")
+    if not code_index.might_exist(body.code):
+        raise _miss(ip_key, prefix_key)
 
-        token = create_access_token(
-            {"type": "student_session", "session_id": str(session.id), "code_id": str(vc.id)},
-            expires_minutes=settings.jwt_student_token_expire_minutes,
-        )
-        return VerifyCodeResponse(
-            access_token=token,
-            exam_id=template_record.exam_id,
-            session_id=str(session.id),
-            status="completed",
+    result = await db.execute(
+        select(
+            VerificationCode.id,
+            VerificationCode.status,
+            ExamTemplateRecord.exam_id,
+            ExamSession.id.label("session_id"),
+            ExamSession.started_at,
         )
+        .outerjoin(ExamTemplateRecord, ExamTemplateRecord.id == VerificationCode.exam_template_id)
+        .outerjoin(ExamSession, ExamSession.verification_code_id == VerificationCode.id)
+        .where(VerificationCode.code == body.code)
+    )
+    row = result.first()
 
-    if vc.status == "in_progress":
-        # 已開始但未完成 → 回傳現有 session
-        session_result = await db.execute(
-            select(ExamSession).where(ExamSession.verification_code_id == vc.id)
-        )
-        session = session_result.scalar_one_or_none()
-        if session is None:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="資料異常")
+    if row is None:
+        raise _miss(ip_key, prefix_key)
+    if row.exam_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="對應的試卷不存在")
 
-        token = create_access_token(
-            {"type": "student_session", "session_id": str(session.id), "code_id": str(vc.id)},
-            expires_minutes=settings.jwt_student_token_expire_minutes,
-        )
-        return VerifyCodeResponse(
-            access_token=token,
-            exam_id=template_record.exam_id,
-            session_id=str(session.id),
-            status="in_progress",
+    if row.session_id is not None:
+        # 已開始（in_progress）或已完成（completed，唯讀）→ 回傳現有 session
+        return _session_response(row.id, row.session_id, row.started_at, row.exam_id, row.status)
+
+    if row.status != "unused":
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="此測驗紀錄已封存")
+
+    # unused → 原子地轉換狀態並建立 session
+    claimed = (
+        update(VerificationCode)
+        .where(VerificationCode.id == row.id, VerificationCode.status == "unused")
+        .values(status="in_progress")
+        .returning(VerificationCode.id)
+        .cte("claimed")
+    )
+    session_id = uuid.uuid4()
+    inserted = await db.execute(
+        insert(ExamSession)
+        .from_select(
+            ["id", "verification_code_id", "student_name", "exam_id", "status"],
+            select(
+                literal(session_id, ExamSession.id.type),
+                claimed.c.id,
+                literal(body.student_name, ExamSession.student_name.type),
+                literal(row.exam_id, ExamSession.exam_id.type),
+                literal("in_progress", ExamSession.status.type),
+            ),
         )
+        .returning(ExamSession.started_at)
+    )
+    started_at = inserted.scalar_one_or_none()
+    if started_at is not None:
+        await db.commit()
+        return _session_response(row.id, session_id, started_at, row.exam_id, "new")
 
-    # unused → 建立新 session
-    vc.status = "in_progress"
-    session = ExamSession(
-        verification_code_id=vc.id,
-        student_name=body.student_name,
-        exam_id=template_record.exam_id,
+    # 同時有其他請求搶先轉換了狀態：該交易已提交，直接取回它建立的 session
+    await db.rollback()
+    result = await db.execute(
+        select(ExamSession.id, ExamSession.started_at, VerificationCode.status)
+        .join(VerificationCode, VerificationCode.id == ExamSession.verification_code_id)
+        .where(ExamSession.verification_code_id == row.id)
+    )
+    existing = result.first()
+    if existing is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="驗證碼狀態已變更，請重新輸入")
+    return _session_response(row.id, existing.id, existing.started_at, row.exam_id, existing.status)
+
+
+def _miss(ip_key: str, prefix_key: str) -> HTTPException:
+    """記錄一次查無驗證碼並回傳要拋出的錯誤：該 IP 或前綴查無次數已達上限時為 429，否則為 404。"""
+    waits = [w for w in (_ip_misses.retry_after(ip_key), _prefix_misses.retry_after(prefix_key)) if w is not None]
+    _ip_misses.hit(ip_key)
+    _prefix_misses.hit(prefix_key)
+    if waits:
+        return _too_many_attempts(max(waits))
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="驗證碼不存在")
+
+
+def _too_many_attempts(retry_after: float) -> HTTPException:
+    _rate_limited.inc()
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="嘗試次數過多，請稍後再試",
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
     )
-    db.add(session)
-    await db.commit()
-    await db.refresh(session)
 
+
+def _session_response(
+    code_id: uuid.UUID, session_id: uuid.UUID, started_at: datetime, exam_id: str, status_: str
+) -> VerifyCodeResponse:
+    """簽發學生 session token 並組成回應。
+
+    token 帶 started_at（exam_sessions 的分區鍵），之後的查詢只需掃描該月的分區。
+    """
     token = create_access_token(
-        {"type": "student_session", "session_id": str(session.id), "code_id": str(vc.id)},
+        {
+            "type": "student_session",
+            "session_id": str(session_id),
+            "started_at": started_at.isoformat(),
+            "code_id": str(code_id),
+            "exam_id": exam_id,
+        },
         expires_minutes=settings.jwt_student_token_expire_minutes,
     )
     return VerifyCodeResponse(
         access_token=token,
-        exam_id=template_record.exam_id,
-        session_id=str(session.id),
-        status="new",
+        exam_id=exam_id,
+        session_id=str(session_id),
+        status=status_,
     )
@@ -1,23 +1,91 @@
-"""安全工具：JWT token 編解碼與密碼雜湊。"""
+"""安全工具：JWT token 編解碼與密碼雜湊。
 
+bcrypt 每次運算約 100～300 ms，會卡住 event loop，因此雜湊與驗證都交給
+專用的有界執行緒池（bcrypt 運算期間會釋放 GIL）。
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import TypeVar
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.auth.token_cache import token_cache
 from app.core.config import settings
+from app.core.metrics import counter, gauge
+
+T = TypeVar("T")
+
+# min_rounds = max_rounds = 設定值：cost 變更後舊雜湊會被視為需要更新，登入時自動重新雜湊
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
+
+_executor: ThreadPoolExecutor | None = None
+
+_hash_ops = counter("password_hash_ops_total", "bcrypt 雜湊與驗證次數")
+_hash_seconds = counter("password_hash_seconds_total", "bcrypt 運算累計秒數")
+_hash_waiting = gauge("password_hash_waiting", "等待 bcrypt 執行緒的工作數")
+_hash_running = gauge("password_hash_running", "執行中的 bcrypt 工作數")
+_rehashes = counter("password_rehash_total", "登入時因 cost 變更而重新雜湊的次數")
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+    return _executor
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def shutdown_password_executor() -> None:
+    """關閉 bcrypt 執行緒池（應用程式關閉時呼叫）。"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
 
 
-def hash_password(password: str) -> str:
-    """將明文密碼轉為 bcrypt 雜湊值。"""
-    return pwd_context.hash(password)
+async def _run_in_pool(fn: Callable[..., T], *args) -> T:
+    """在 bcrypt 執行緒池中執行，同時最多 password_hash_workers 個，其餘排隊。"""
+    def job() -> T:
+        _hash_waiting.dec()
+        _hash_running.inc()
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            _hash_running.dec()
+            _hash_seconds.inc(time.perf_counter() - start)
+            _hash_ops.inc()
 
+    _hash_waiting.inc()
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), job)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """驗證明文密碼是否與雜湊值匹配。"""
-    return pwd_context.verify(plain_password, hashed_password)
+
+async def hash_password(password: str) -> str:
+    """將明文密碼轉為 bcrypt 雜湊值（於執行緒池中運算）。"""
+    return await _run_in_pool(pwd_context.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """驗證明文密碼是否與雜湊值匹配（於執行緒池中運算）。"""
+    return await _run_in_pool(pwd_context.verify, plain_password, hashed_password)
+
+
+async def verify_and_rehash(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """驗證密碼，若雜湊的 cost 與目前設定不同，一併回傳新的雜湊值供呼叫端寫回。"""
+    valid, new_hash = await _run_in_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+    if new_hash is not None:
+        _rehashes.inc()
+    return valid, new_hash
 
 
 def create_access_token(data: dict, expires_minutes: int | None = None) -> str:
@@ -36,8 +104,16 @@ def create_access_token(data: dict, expires_minutes: int | None = None) -> str:
 
 
 def decode_access_token(token: str) -> dict | None:
-    """解碼 JWT token，失敗時回傳 None。"""
+    """解碼 JWT token，失敗時回傳 None。
+
+    驗證成功的 token 會快取至 exp 為止，同一個 token 之後的請求不再重新驗證簽章。
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
-        return jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
     except JWTError:
         return None
+    token_cache.put(token, payload)
+    return payload
@@ -0,0 +1,61 @@
+"""已驗證 JWT 的行程內快取：token 字串 → payload。
+
+學生作答期間會以同一個 token 反覆輪詢與自動儲存，快取後每個 worker
+對同一個 token 只做一次 HMAC 驗證與 JSON 解析。項目在 token 的 exp
+到期時失效，因此快取不會延長 token 的有效期。驗證失敗的 token 不快取。
+"""
+
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core.metrics import counter, gauge, hit_ratio
+
+_hits = counter("token_cache_hits_total", "JWT 快取命中次數")
+_misses = counter("token_cache_misses_total", "JWT 快取未命中次數")
+_size = gauge("token_cache_entries", "JWT 快取目前筆數")
+
+
+class TokenCache:
+    """依 exp 到期的 LRU 快取。max_entries <= 0 時停用。"""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, token: str) -> dict | None:
+        """取得快取的 payload 副本，不存在或 token 已過期時回傳 None。"""
+        entry = self._entries.get(token)
+        if entry is None:
+            _misses.inc()
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            _size.set(len(self._entries))
+            _misses.inc()
+            return None
+        self._entries.move_to_end(token)
+        _hits.inc()
+        return dict(payload)
+
+    def put(self, token: str, payload: dict) -> None:
+        """寫入已驗證的 payload；沒有 exp 的 token 不快取。"""
+        exp = payload.get("exp")
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+            return
+        self._entries[token] = (float(exp), dict(payload))
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        _size.set(len(self._entries))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        _size.set(0)
+
+    def hit_ratio(self) -> float | None:
+        return hit_ratio(_hits, _misses)
+
+
+token_cache = TokenCache(settings.token_cache_max_entries)
@@ -0,0 +1,76 @@
+"""已驗證使用者的行程內快取：以 token 的 sub 為鍵，省去每個請求查詢 users 表。
+
+只快取啟用中的使用者，並只保存欄位快照（不含密碼雜湊）；
+命中時回傳新的 transient User 物件，不與任何 DB session 綁定。
+教師帳號異動時由 admin 路由呼叫 invalidate()，並經 LISTEN/NOTIFY
+通知其他 worker；TTL 則是漏收通知時的上限。
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.core.config import settings
+from app.core.metrics import counter, gauge, hit_ratio
+from app.db.models import User
+
+_SNAPSHOT_FIELDS = ("id", "username", "display_name", "role", "is_active", "created_at", "updated_at")
+
+_hits = counter("user_cache_hits_total", "使用者快取命中次數")
+_misses = counter("user_cache_misses_total", "使用者快取未命中次數")
+_invalidations = counter("user_cache_invalidations_total", "使用者快取失效次數")
+_size = gauge("user_cache_entries", "使用者快取目前筆數")
+
+
+class UserCache:
+    """有 TTL 與筆數上限的 LRU 快取。ttl_seconds <= 0 時停用。"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def get(self, user_id: str) -> User | None:
+        """取得快取中的使用者，不存在或已過期時回傳 None。"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+                _size.set(len(self._entries))
+            _misses.inc()
+            return None
+        self._entries.move_to_end(user_id)
+        _hits.inc()
+        return User(**entry[1])
+
+    def put(self, user_id: str, user: User) -> None:
+        """寫入啟用中的使用者快照。"""
+        if not self.enabled or not user.is_active:
+            return
+        snapshot = {field: getattr(user, field) for field in _SNAPSHOT_FIELDS}
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        _size.set(len(self._entries))
+
+    def invalidate(self, user_id: str | None = None) -> None:
+        """移除指定使用者；user_id 為 None 時清空全部（例如 LISTEN 重新連線後）。"""
+        _invalidations.inc()
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+        _size.set(len(self._entries))
+
+    def hit_ratio(self) -> float | None:
+        return hit_ratio(_hits, _misses)
+
+
+user_cache = UserCache(settings.user_cache_ttl_seconds, settings.user_cache_max_entries)
@@ -0,0 +1,155 @@
+"""准入控制：依路由類別限制同時處理的請求數，超出時排隊，佇列滿或等待逾時即回 503。
+
+考試結束時數百個交卷請求在幾秒內湧入，每個都會佔用資料庫連線並可能呼叫 LLM；
+不加限制時連線池耗盡，所有請求一起逾時。每個路由類別（submit、analysis）有：
+- limit：同時執行的上限，應小於連線池大小，留給讀取路由使用；
+- queue_size：等待中的請求上限，超過即立即拒絕（不排隊）；
+- queue_timeout：排隊的最長時間，逾時拒絕，避免請求在佇列中等到客戶端早已放棄。
+拒絕時回 503 並帶 Retry-After（依近期處理時間與佇列長度估算），前端據此加上隨機抖動後重試。
+
+狀態只存在於單一 worker 的記憶體中；多 worker 時總上限為設定值 × worker 數。
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, Callable
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import counter, gauge, histogram
+
+_in_flight = gauge("admission_in_flight", "正在執行的請求數", ("route_class",))
+_queued = gauge("admission_queued", "排隊等待中的請求數", ("route_class",))
+_rejected = counter("admission_rejected_total", "被拒絕的請求數（queue_full / timeout）", ("route_class", "reason"))
+_wait = histogram(
+    "admission_wait_seconds",
+    "取得執行名額前的排隊時間（秒）",
+    ("route_class",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class AdmissionRejected(Exception):
+    """無法取得執行名額；retry_after 為建議客戶端等待的秒數。"""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """單一路由類別的並行上限與先進先出等待佇列。"""
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._service_time = 1.0  # 近期每個請求的處理秒數（指數移動平均）
+        self._in_flight = _in_flight.labels(name)
+        self._queued = _queued.labels(name)
+        self._wait = _wait.labels(name)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """估計佇列消化完所需的秒數，至少 1 秒。"""
+        return max(1, math.ceil(self._service_time * (self.queued + 1) / self.limit))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        _rejected.labels(self.name, reason).inc()
+        return AdmissionRejected(reason, self.retry_after())
+
+    async def acquire(self) -> None:
+        """取得一個執行名額；佇列已滿或等待逾時時拋出 AdmissionRejected。"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._in_flight.set(self.active)
+            self._wait.observe(0.0)
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._queued.set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # 名額已移交給本請求，但本請求不再需要：轉交下一位
+                self.release()
+            else:
+                future.cancel()
+                self._waiters.remove(future)
+            self._queued.set(len(self._waiters))
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("timeout") from None
+        self._wait.observe(time.perf_counter() - start)
+
+    def release(self, service_time: float | None = None) -> None:
+        """歸還名額：有人排隊時直接移交（active 不變），否則減少 active。"""
+        if service_time is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * service_time
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                self._queued.set(len(self._waiters))
+                return
+        self.active -= 1
+        self._in_flight.set(self.active)
+        self._queued.set(0)
+
+
+_controllers: dict[str, AdmissionController] = {}
+
+
+def get_controller(route_class: str) -> AdmissionController:
+    """取得路由類別的控制器（每個 worker 一份，首次使用時依設定建立）。"""
+    controller = _controllers.get(route_class)
+    if controller is None:
+        controller = _controllers[route_class] = AdmissionController(
+            route_class,
+            limit=getattr(settings, f"{route_class}_concurrency"),
+            queue_size=getattr(settings, f"{route_class}_queue_size"),
+            queue_timeout=getattr(settings, f"{route_class}_queue_timeout_seconds"),
+        )
+    return controller
+
+
+def admit(route_class: str) -> Callable[[], AsyncGenerator[None]]:
+    """FastAPI 依賴：在路由函式執行期間佔用 route_class 的一個名額。
+
+    應以 Depends(admit(...), scope="function") 宣告，名額在路由函式結束時即歸還，
+    不必等回應送出；放在身分驗證之後、get_db 之前，未授權的請求不會佔用佇列。
+    身分驗證若需查詢資料庫（get_current_user 快取未命中），須在排隊前歸還連線。
+    """
+
+    async def dependency() -> AsyncGenerator[None]:
+        controller = get_controller(route_class)
+        try:
+            await controller.acquire()
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=503,
+                detail="伺服器忙碌中，請稍後再試",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            controller.release(time.perf_counter() - start)
+
+    return dependency
@@ -0,0 +1,174 @@
+"""回應壓縮中介層：依 Accept-Encoding 協商 brotli / gzip，小於門檻的回應不壓縮。
+
+- 已帶 Content-Encoding 的回應（http_cache 預先壓縮的試卷模板、結果）直接放行，
+  不會重複壓縮；靜態內容因此每個版本只壓縮一次。
+- 串流回應（CSV 匯出）逐塊壓縮並 flush，用戶端可邊收邊解。
+- 只壓縮文字類內容；Parquet 等本身已壓縮的格式略過。
+- brotli 為選用套件（pip install -e ".[brotli]"），未安裝時只提供 gzip。
+
+節省的位元組數記錄在 http_compression_* 指標，由 /api/admin/metrics 與 /metrics 輸出。
+"""
+
+import functools
+import zlib
+from types import ModuleType
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import counter
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # 動態內容取壓縮率與 CPU 的折衷；預先壓縮的靜態內容不經過此處
+
+_COMPRESSIBLE_PREFIXES = ("text/", "application/json", "application/javascript", "application/xml")
+
+_responses = counter("http_compression_responses_total", "經壓縮（含預先壓縮）送出的回應數")
+_bytes_in = counter("http_compression_bytes_in_total", "壓縮前的回應位元組數")
+_bytes_out = counter("http_compression_bytes_out_total", "壓縮後實際送出的位元組數")
+_bytes_saved = counter("http_compression_bytes_saved_total", "壓縮節省的位元組數")
+
+
+def record_compression(raw_bytes: int, sent_bytes: int) -> None:
+    """記錄一次壓縮回應的前後大小（預先壓縮的快取內容也以此記錄）。"""
+    _responses.inc()
+    _bytes_in.inc(raw_bytes)
+    _bytes_out.inc(sent_bytes)
+    _bytes_saved.inc(raw_bytes - sent_bytes)
+
+
+@functools.cache
+def _brotli() -> ModuleType | None:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """從 Accept-Encoding 選出 "br"、"gzip" 或 None（不壓縮）；q 值相同時優先 brotli。"""
+    supported = ("br", "gzip") if _brotli() is not None else ("gzip",)
+    best: tuple[float, int, str] | None = None
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        names = supported if coding == "*" else (coding,)
+        for name in names:
+            if name in supported and q > 0:
+                candidate = (q, -supported.index(name), name)
+                if best is None or candidate > best:
+                    best = candidate
+    return best[2] if best else None
+
+
+class _Encoder:
+    """單一回應的增量壓縮器。"""
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = _brotli().Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._gzip = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        """壓縮一段串流內容並 flush，讓已產生的資料立即送出。"""
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.finish()
+        return self._gzip.compress(data) + self._gzip.flush()
+
+
+class CompressionMiddleware:
+    """純 ASGI 壓縮中介層（不經 BaseHTTPMiddleware，串流回應不會被整段緩衝）。"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send | None = None
+        self.start: Message | None = None
+        self.encoder: _Encoder | None = None
+        self.passthrough = False
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self._send)
+
+    async def _send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # 等第一段內容出現才決定是否壓縮
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(scope=start)
+            if not self._should_compress(start["status"], headers, body, more_body):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.encoder = _Encoder(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                data = self.encoder.chunk(body)
+            else:
+                data = self.encoder.finish(body)
+                headers["Content-Length"] = str(len(data))
+            await self.send(start)
+        else:
+            data = self.encoder.chunk(body) if more_body else self.encoder.finish(body)
+
+        self.raw_bytes += len(body)
+        self.sent_bytes += len(data)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+        if not more_body:
+            record_compression(self.raw_bytes, self.sent_bytes)
+
+    def _should_compress(self, status: int, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        if not (content_type.startswith(_COMPRESSIBLE_PREFIXES) or "+json" in content_type):
+            return False
+        # 非串流回應已知完整大小；串流回應（匯出）一律壓縮
+        return more_body or len(body) >= self.minimum_size
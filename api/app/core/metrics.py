@@ -0,0 +1,292 @@
+"""行程內指標：計數器、量測值與直方圖的簡易登錄表。
+
+各模組以 counter() / gauge() / histogram() 取得（或建立）具名指標後直接累加；
+需要標籤（例如路由、狀態碼）時以 labelnames 建立指標族，再以 .labels(...) 取得子指標。
+snapshot() 供管理端點輸出 JSON，render_prometheus() 輸出 Prometheus 文字格式。
+指標僅屬於單一 worker，多 worker 時由收集端彙總。
+"""
+
+import bisect
+import math
+import threading
+from collections.abc import Callable, Iterable, Iterator, Sequence
+
+_lock = threading.Lock()
+
+
+class Counter:
+    """只增不減的計數器（可在執行緒池中安全累加）。"""
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with _lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """可增可減的即時量測值，例如快取筆數、進行中的工作數。"""
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        with _lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with _lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with _lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+# 延遲類直方圖的預設上界（秒）
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """固定上界的直方圖；observe() 只做一次二分搜尋與三個累加。"""
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # 最後一格為 +Inf
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """回傳 [(上界, 累計筆數)]，最後一筆上界為 +Inf。"""
+        total = 0
+        result = []
+        for bound, n in zip((*self.buckets, math.inf), self._counts):
+            total += n
+            result.append((bound, total))
+        return result
+
+
+class MetricFamily:
+    """帶標籤的指標族：每組標籤值對應一個子指標（Counter / Gauge / Histogram）。"""
+
+    def __init__(self, kind: type, name: str, description: str, labelnames: Sequence[str], **kwargs) -> None:
+        self.kind = kind
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._kwargs = kwargs
+        self._children: dict[tuple[str, ...], Counter | Gauge | Histogram] = {}
+
+    def labels(self, *values: str):
+        """取得標籤值對應的子指標；標籤值組合應為有限集合（例如路由樣板，而非實際路徑）。"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with _lock:
+                child = self._children.setdefault(values, self.kind(self.name, self.description, **self._kwargs))
+        return child
+
+    def children(self) -> list[tuple[tuple[str, ...], Counter | Gauge | Histogram]]:
+        return sorted(self._children.items())
+
+
+_registry: dict[str, Counter | Gauge | Histogram | MetricFamily] = {}
+_collectors: list[Callable[[], None]] = []
+
+
+def _get_or_create(cls: type, name: str, description: str, labelnames: Sequence[str] = (), **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            if labelnames:
+                metric = MetricFamily(cls, name, description, labelnames, **kwargs)
+            else:
+                metric = cls(name, description, **kwargs)
+            _registry[name] = metric
+    kind = metric.kind if isinstance(metric, MetricFamily) else type(metric)
+    if kind is not cls:
+        raise TypeError(f"Metric {name} already registered as {kind.__name__}")
+    return metric
+
+
+def counter(name: str, description: str = "", labelnames: Sequence[str] = ()) -> Counter:
+    """取得（或建立）具名計數器；指定 labelnames 時回傳指標族，以 .labels(...) 取得子計數器。"""
+    return _get_or_create(Counter, name, description, labelnames)
+
+
+def gauge(name: str, description: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+    """取得（或建立）具名量測值。"""
+    return _get_or_create(Gauge, name, description, labelnames)
+
+
+def histogram(
+    name: str,
+    description: str = "",
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """取得（或建立）具名直方圖。"""
+    return _get_or_create(Histogram, name, description, labelnames, buckets=buckets)
+
+
+def add_collector(collect: Callable[[], None]) -> None:
+    """註冊輸出前執行的回呼，用來更新只在抓取時才需要計算的量測值（例如連線池狀態）。"""
+    _collectors.append(collect)
+
+
+def hit_ratio(hits: Counter, misses: Counter) -> float | None:
+    """快取命中率，尚無任何查詢時回傳 None。"""
+    total = hits.value + misses.value
+    return hits.value / total if total else None
+
+
+def _collect() -> None:
+    for collect in list(_collectors):
+        collect()
+
+
+def snapshot() -> dict[str, float]:
+    """回傳目前所有無標籤計數器與量測值的值（依名稱排序）；直方圖與指標族見 render_prometheus()。"""
+    _collect()
+    return {
+        name: metric.value
+        for name, metric in sorted(_registry.items())
+        if isinstance(metric, (Counter, Gauge))
+    }
+
+
+_TYPES = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}
+
+
+def _sample_value(metric: Counter | Gauge | Histogram):
+    if isinstance(metric, Histogram):
+        return {"counts": list(metric._counts), "sum": metric.sum}
+    return metric.value
+
+
+def export_state() -> dict[str, dict]:
+    """目前所有指標的可序列化狀態（JSON 相容），供多 worker 彙總（見 app.core.metrics_multiprocess）。
+
+    每個指標為 {"type", "help", "labels", "buckets"（僅直方圖）, "samples": [[標籤值, 值], ...]}；
+    直方圖的值為 {"counts": 各區間筆數（非累計，最後一格為 +Inf）, "sum": 總和}。
+    """
+    _collect()
+    state: dict[str, dict] = {}
+    for name, metric in sorted(_registry.items()):
+        family = metric if isinstance(metric, MetricFamily) else None
+        kind = family.kind if family else type(metric)
+        entry = {"type": _TYPES[kind], "help": metric.description, "labels": list(family.labelnames if family else ())}
+        if kind is Histogram:
+            entry["buckets"] = list(family._kwargs["buckets"] if family else metric.buckets)
+        if family:
+            entry["samples"] = [[list(values), _sample_value(child)] for values, child in family.children()]
+        else:
+            entry["samples"] = [[[], _sample_value(metric)]]
+        state[name] = entry
+    return state
+
+
+def merge_states(states: Iterable[dict[str, dict]]) -> dict[str, dict]:
+    """加總多個 export_state() 的結果：計數器、量測值與直方圖皆以相同標籤值逐項相加。"""
+    merged: dict[str, dict] = {}
+    values: dict[str, dict[tuple[str, ...], object]] = {}
+    for state in states:
+        for name, entry in state.items():
+            if name not in merged:
+                merged[name] = {k: v for k, v in entry.items() if k != "samples"}
+                values[name] = {}
+            elif merged[name]["type"] != entry["type"]:
+                continue
+            target = values[name]
+            for labelvalues, value in entry["samples"]:
+                key = tuple(labelvalues)
+                current = target.get(key)
+                if current is None:
+                    target[key] = {"counts": list(value["counts"]), "sum": value["sum"]} if isinstance(value, dict) else value
+                elif isinstance(value, dict):
+                    current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                    current["sum"] += value["sum"]
+                else:
+                    target[key] = current + value
+    for name, entry in merged.items():
+        entry["samples"] = [[list(key), value] for key, value in sorted(values[name].items())]
+    return dict(sorted(merged.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _samples(name: str, entry: dict, labelvalues: Sequence[str], value) -> Iterator[str]:
+    labelnames = entry["labels"]
+    if entry["type"] == "histogram":
+        total = 0
+        for bound, n in zip((*entry["buckets"], math.inf), value["counts"]):
+            total += n
+            le = f'le="{_number(bound)}"'
+            yield f"{name}_bucket{_labels(labelnames, labelvalues, le)} {total}"
+        yield f"{name}_sum{_labels(labelnames, labelvalues)} {_number(value['sum'])}"
+        yield f"{name}_count{_labels(labelnames, labelvalues)} {total}"
+    else:
+        yield f"{name}{_labels(labelnames, labelvalues)} {_number(value)}"
+
+
+def render_state(state: dict[str, dict]) -> str:
+    """將 export_state() / merge_states() 的結果轉為 Prometheus 文字格式（0.0.4）。"""
+    lines: list[str] = []
+    for name, entry in state.items():
+        if entry["help"]:
+            lines.append(f"# HELP {name} {_escape(entry['help'])}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        for labelvalues, value in entry["samples"]:
+            lines.extend(_samples(name, entry, labelvalues, value))
+    return "\n".join(lines) + "\n"
+
+
+def render_prometheus() -> str:
+    """以 Prometheus 文字格式輸出本 worker 的所有指標。"""
+    return render_state(export_state())
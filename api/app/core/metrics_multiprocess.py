@@ -0,0 +1,99 @@
+"""多 worker 指標彙總：每個 worker 定期把指標狀態寫入共用目錄，/metrics 讀取全部加總後輸出。
+
+Prometheus 每次抓取只會打到其中一個 worker，若只輸出該 worker 的指標，計數會隨機跳動。
+設定 METRICS_DIR（gunicorn.conf.py 會自動設定）後：
+- 每個 worker 每隔 interval 秒以原子替換寫入 worker-<pid>.json；
+- 抓取時，處理請求的 worker 以自己的即時狀態加上其他 worker 的檔案加總；
+- worker 結束時，計數器與直方圖併入 dead.json（以檔案鎖序列化），量測值捨棄，
+  計數器因此不會因為 worker 重啟而倒退；啟動時由 master 清空整個目錄。
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+from pathlib import Path
+
+from app.core.metrics import export_state, merge_states, render_state
+
+_DEAD_FILE = "dead.json"
+_LOCK_FILE = "dead.lock"
+
+
+def _read(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_atomic(path: Path, state: dict) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _without_gauges(state: dict) -> dict:
+    return {name: entry for name, entry in state.items() if entry["type"] != "gauge"}
+
+
+def clear_directory(directory: str | Path) -> None:
+    """清空指標目錄（master 啟動時呼叫，避免沿用上一次執行的檔案）。"""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for child in path.iterdir():
+        if child.is_file():
+            child.unlink()
+
+
+def render_all(directory: str | Path, own_file: Path | None = None) -> str:
+    """本 worker 的即時狀態加上目錄中其他 worker 與已結束 worker 的指標，輸出 Prometheus 文字格式。"""
+    states = [export_state()]
+    for path in sorted(Path(directory).glob("*.json")):
+        if path == own_file:
+            continue
+        state = _read(path)
+        if state is not None:
+            states.append(state)
+    return render_state(merge_states(states))
+
+
+class MetricsFileExporter:
+    """單一 worker 的指標檔寫入器；於 lifespan 啟動與停止。"""
+
+    def __init__(self, directory: str | Path, interval: float = 5.0) -> None:
+        self.directory = Path(directory)
+        self.interval = interval
+        self.path = self.directory / f"worker-{os.getpid()}.json"
+        self._task: asyncio.Task | None = None
+
+    def write(self) -> None:
+        _write_atomic(self.path, export_state())
+
+    async def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(self.write)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.write)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await asyncio.to_thread(self.retire)
+
+    def retire(self) -> None:
+        """把本 worker 的計數器與直方圖併入 dead.json，並刪除自己的檔案。"""
+        with open(self.directory / _LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead_path = self.directory / _DEAD_FILE
+            dead = _read(dead_path) or {}
+            _write_atomic(dead_path, merge_states([dead, _without_gauges(export_state())]))
+        self.path.unlink(missing_ok=True)
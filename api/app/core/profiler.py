@@ -0,0 +1,228 @@
+"""單一請求的隨選剖析：管理者帶 X-Profile 標頭時，以取樣剖析器執行該請求。
+
+- 只有帶 X-Profile 標頭、且 Bearer token 角色為 admin 的請求會被剖析；其他請求只多一次
+  標頭掃描，不啟動任何執行緒，也不記錄 SQL。
+- 取樣執行緒每隔 interval 讀取一次事件迴圈執行緒的堆疊：
+  本請求的 task 正在執行時記錄實際堆疊（從 task 的根協程起算）；
+  task 暫停時記錄其 await 鏈並在末端加上 "(await)"，等待資料庫或 LLM 的時間因此也看得到。
+  同一迴圈上其他請求正在執行的程式碼不會算進本請求；執行緒池中的同步程式碼顯示為 await。
+- 輸出為 folded stacks（"根;…;葉 次數"），可直接交給 flamegraph.pl 或 speedscope；
+  另存一份 JSON，包含本請求執行的每個 SQL 與耗時（不含參數）。
+- 檔案寫入 settings.profile_dir，同一台機器上的所有 worker 共用，
+  回應標頭 X-Profile-Id 帶回編號，由 /api/admin/profiles 讀取。
+"""
+
+import asyncio
+import collections
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth.security import decode_access_token
+from app.core.config import settings
+from app.core.request_metrics import current_request_stats, route_label
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+AWAIT_MARKER = "(await)"
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    location = "/".join(path.parts[-2:])
+    # folded 格式以 ";" 分隔堆疊層（次數以最後一個空白分隔，名稱中的空白不影響）
+    return f"{code.co_qualname} ({location}:{frame.f_lineno})".replace(";", ":")
+
+
+def _thread_stack(frame: FrameType | None, root_code) -> list[str]:
+    """執行緒堆疊（根在前），只保留 root_code 以下的部分；找不到 root_code 時回傳空串列。"""
+    frames: list[FrameType] = []
+    while frame is not None:
+        frames.append(frame)
+        if frame.f_code is root_code:
+            return [_frame_label(f) for f in reversed(frames)]
+        frame = frame.f_back
+    return []
+
+
+def _await_stack(coro, root_code) -> list[str]:
+    """暫停中的協程 await 鏈（根在前），從 root_code 開始；找不到 root_code 時保留整條鏈。"""
+    frames: list[FrameType] = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    for i, frame in enumerate(frames):
+        if frame.f_code is root_code:
+            frames = frames[i:]
+            break
+    return [_frame_label(f) for f in frames] + [AWAIT_MARKER]
+
+
+class SamplingProfiler:
+    """對單一 asyncio task 取樣的剖析器；stop() 回傳 folded stack → 次數。
+
+    堆疊從 root_code（預設為 task 的根協程）開始記錄，略過伺服器與外層中介層的框架。
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float, root_code=None) -> None:
+        self.task = task
+        self.interval = interval
+        self.samples: collections.Counter[str] = collections.Counter()
+        self._loop = task.get_loop()
+        self._loop_thread = threading.get_ident()
+        self._root_code = root_code or task.get_coro().cr_code
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> collections.Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        if asyncio.current_task(self._loop) is self.task:
+            stack = _thread_stack(sys._current_frames().get(self._loop_thread), self._root_code)
+        else:
+            stack = _await_stack(self.task.get_coro(), self._root_code)
+        if stack:
+            self.samples[";".join(stack)] += 1
+
+
+def fold(samples: collections.Counter[str]) -> str:
+    """轉為 folded stacks 文字（每行 "堆疊 次數"）。"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(samples.items()))
+
+
+def _profile_dir() -> Path:
+    return Path(settings.profile_dir)
+
+
+def _write_profile(profile_id: str, record: dict, folded: str) -> None:
+    directory = _profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{profile_id}.folded").write_text(folded, encoding="utf-8")
+    (directory / f"{profile_id}.json").write_text(json.dumps(record, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+def list_profiles(limit: int = 50) -> list[dict]:
+    """最近的剖析紀錄摘要（新到舊，不含 SQL 明細）。"""
+    directory = _profile_dir()
+    if not directory.is_dir():
+        return []
+    paths = sorted(directory.glob("*.json"), reverse=True)[:limit]
+    summaries = []
+    for path in paths:
+        record = json.loads(path.read_text(encoding="utf-8"))
+        record.pop("queries", None)
+        summaries.append(record)
+    return summaries
+
+
+def load_profile(profile_id: str) -> dict | None:
+    """讀取單筆剖析紀錄；編號格式不符或不存在時回傳 None。"""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = _profile_dir() / f"{profile_id}.json"
+    return json.loads(path.read_text(encoding="utf-8")) if path.is_file() else None
+
+
+def load_folded(profile_id: str) -> str | None:
+    """讀取 folded stacks；編號格式不符或不存在時回傳 None。"""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = _profile_dir() / f"{profile_id}.folded"
+    return path.read_text(encoding="utf-8") if path.is_file() else None
+
+
+def _is_admin_request(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            payload = decode_access_token(token.strip())
+            return payload is not None and payload.get("role") == "admin"
+    return False
+
+
+class ProfilingMiddleware:
+    """純 ASGI 中介層；應放在 RequestMetricsMiddleware 內側，才能取得本請求的 SQL 紀錄。"""
+
+    def __init__(self, app: ASGIApp, interval: float = 0.005) -> None:
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        if not _is_admin_request(scope):
+            # 非管理者的 X-Profile 標頭直接忽略，照常處理請求
+            await self.app(scope, receive, send)
+            return
+        await self._profile(scope, receive, send)
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile_id
+            await send(message)
+
+        stats = current_request_stats()
+        if stats is not None:
+            stats.statements = []
+        profiler = SamplingProfiler(asyncio.current_task(), self.interval, root_code=sys._getframe().f_code)
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            samples = profiler.stop()
+            duration = time.perf_counter() - start
+            statements = stats.statements if stats is not None else []
+            record = {
+                "profile_id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_label(scope),
+                "status": status,
+                "started_at": started_at.isoformat(),
+                "duration_ms": round(duration * 1000, 3),
+                "interval_ms": self.interval * 1000,
+                "samples": sum(samples.values()),
+                "query_count": len(statements),
+                "query_ms": round(sum(elapsed for _, elapsed in statements) * 1000, 3),
+                "queries": [
+                    {"statement": statement, "duration_ms": round(elapsed * 1000, 3)}
+                    for statement, elapsed in statements
+                ],
+            }
+            await asyncio.to_thread(_write_profile, profile_id, record, fold(samples))
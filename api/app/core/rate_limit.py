@@ -0,0 +1,49 @@
+"""滑動視窗限流：記錄每個鍵在最近 window_seconds 內的事件數。
+
+狀態只存在於單一 worker 的記憶體中；多 worker 時每個 worker 各自計數，
+實際上限約為設定值 × worker 數。
+"""
+
+import time
+from collections import OrderedDict, deque
+
+
+class SlidingWindowLimiter:
+    """以時間戳佇列實作的滑動視窗計數器，最多追蹤 max_keys 個鍵（LRU 淘汰）。"""
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = 10_000) -> None:
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._events: OrderedDict[str, deque[float]] = OrderedDict()
+
+    def _prune(self, key: str, now: float) -> deque[float] | None:
+        events = self._events.get(key)
+        if events is None:
+            return None
+        cutoff = now - self.window_seconds
+        while events and events[0] <= cutoff:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def retry_after(self, key: str) -> float | None:
+        """已達上限時回傳需等待的秒數，否則回傳 None。"""
+        now = time.monotonic()
+        events = self._prune(key, now)
+        if events is None or len(events) < self.limit:
+            return None
+        return max(events[-self.limit] + self.window_seconds - now, 0.0)
+
+    def hit(self, key: str) -> None:
+        """記錄一次事件。"""
+        now = time.monotonic()
+        events = self._prune(key, now)
+        if events is None:
+            events = self._events[key] = deque()
+        events.append(now)
+        self._events.move_to_end(key)
+        while len(self._events) > self.max_keys:
+            self._events.popitem(last=False)
@@ -0,0 +1,92 @@
+"""請求層級指標：每個路由的請求數、狀態碼、延遲分布與資料庫查詢耗時。
+
+- 路由標籤取 Starlette 比對後的路徑樣板（例如 /api/student/exam/{session_id}/next），
+  未比對到任何路由的請求一律記為 "unmatched"，標籤數量不會隨網址爆增。
+- 查詢統計由 app.db.query_metrics 的 cursor 事件寫入本請求的 RequestStats（contextvar），
+  請求結束時一次累加到路由指標；請求外的查詢（背景任務、LISTEN）只進全域直方圖。
+- 熱路徑上每個請求只多兩次 perf_counter、一次 contextvar 設定與三次指標累加。
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import counter, histogram
+
+UNMATCHED_ROUTE = "unmatched"
+
+_requests = counter("http_requests_total", "依路由、方法與狀態碼統計的請求數", ("method", "route", "status"))
+_duration = histogram("http_request_duration_seconds", "請求處理時間（秒）", ("method", "route"))
+_exceptions = counter("http_request_exceptions_total", "處理中拋出未捕捉例外的請求數", ("method", "route"))
+_route_queries = counter("db_route_queries_total", "各路由執行的 SQL 查詢數", ("route",))
+_route_query_seconds = counter("db_route_query_seconds_total", "各路由花在 SQL 查詢的總秒數", ("route",))
+_queries_per_request = histogram(
+    "db_queries_per_request", "單一請求執行的 SQL 查詢數", ("route",), buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50)
+)
+
+
+@dataclass(slots=True)
+class RequestStats:
+    """單一請求期間累計的資料庫查詢數與耗時。
+
+    statements 平常為 None；剖析中的請求（見 app.core.profiler）設為串列，逐筆記錄 SQL 與耗時。
+    """
+
+    queries: int = 0
+    query_seconds: float = 0.0
+    statements: list[tuple[str, float]] | None = None
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    """目前請求的統計物件；不在請求內（背景任務）時回傳 None。"""
+    return _current.get()
+
+
+def route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class RequestMetricsMiddleware:
+    """純 ASGI 中介層；應放在最外層，延遲才包含壓縮與 CORS 處理。"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            _exceptions.labels(method, route_label(scope)).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            route = route_label(scope)
+            _requests.labels(method, route, str(status)).inc()
+            _duration.labels(method, route).observe(elapsed)
+            _queries_per_request.labels(route).observe(stats.queries)
+            if stats.queries:
+                _route_queries.labels(route).inc(stats.queries)
+                _route_query_seconds.labels(route).inc(stats.query_seconds)
@@ -5,12 +5,43 @@ from collections.abc import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.db.query_metrics import instrument_engine
 
 engine = create_async_engine(settings.async_database_url, echo=False)
 async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
 
+# 唯讀副本：未設定 DATABASE_READ_URL 時直接沿用主庫 engine
+if settings.async_read_database_url:
+    read_engine = create_async_engine(settings.async_read_database_url, echo=False)
+else:
+    read_engine = engine
+read_session_factory = async_sessionmaker(read_engine, expire_on_commit=False)
+
+# 查詢計時與連線池量測（見 /metrics）
+instrument_engine(engine, "primary")
+if read_engine is not engine:
+    instrument_engine(read_engine, "replica")
+
+
+def has_read_replica() -> bool:
+    """是否設定了獨立的唯讀副本。"""
+    return read_engine is not engine
+
 
 async def get_db() -> AsyncGenerator[AsyncSession]:
     """FastAPI 依賴注入用：提供一個 async DB session，請求結束後自動關閉。"""
     async with async_session_factory() as session:
         yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession]:
+    """FastAPI 依賴注入用：提供唯讀副本的 DB session，僅供不寫入的查詢使用。"""
+    async with read_session_factory() as session:
+        yield session
+
+
+async def dispose_engines() -> None:
+    """關閉主庫與唯讀副本的連線池。"""
+    await engine.dispose()
+    if has_read_replica():
+        await read_engine.dispose()
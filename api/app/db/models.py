@@ -3,8 +3,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, ForeignKey, String, Text, func
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy import DDL, DateTime, Enum, ForeignKey, Index, Integer, LargeBinary, String, Text, UniqueConstraint, event, func
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, REAL, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -40,7 +40,11 @@ class User(Base):
 
 
 class ExamTemplateRecord(Base):
-    """試卷模板表：template_data 以 JSONB 存放完整 ExamTemplate。"""
+    """試卷模板表：template_data 以 JSONB 存放目前版本的完整 ExamTemplate。
+
+    compiled 為上傳時預先計算的評分表示（CompiledTemplate.to_dict()），
+    歷次版本保存在 exam_template_versions。
+    """
 
     __tablename__ = "exam_templates"
 
@@ -48,12 +52,37 @@ class ExamTemplateRecord(Base):
     exam_id: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
     name: Mapped[str] = mapped_column(String(200), nullable=False)
     template_data: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    compiled: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
     is_active: Mapped[bool] = mapped_column(default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
 
     # 關聯
     teacher_access: Mapped[list["TeacherExamAccess"]] = relationship(back_populates="exam_template")
     verification_codes: Mapped[list["VerificationCode"]] = relationship(back_populates="exam_template")
+    versions: Mapped[list["ExamTemplateVersion"]] = relationship(
+        back_populates="exam_template", cascade="all, delete-orphan", order_by="ExamTemplateVersion.version"
+    )
+
+
+class ExamTemplateVersion(Base):
+    """試卷模板的歷次版本（只增不改）。"""
+
+    __tablename__ = "exam_template_versions"
+    __table_args__ = (UniqueConstraint("exam_template_id", "version", name="uq_exam_template_versions_version"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    exam_template_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("exam_templates.id", ondelete="CASCADE"), nullable=False)
+    version: Mapped[int] = mapped_column(nullable=False)
+    template_data: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    # 關聯
+    exam_template: Mapped["ExamTemplateRecord"] = relationship(back_populates="versions")
 
 
 class TeacherExamAccess(Base):
@@ -92,23 +121,61 @@ class VerificationCode(Base):
 
 
 class ExamSession(Base):
-    """學生測驗紀錄表：儲存作答過程與評分結果。"""
+    """學生測驗紀錄表：儲存作答過程與評分結果。
+
+    依 started_at 做每月 range 分區（見 app/db/partitions.py），
+    分區鍵必須包含在主鍵內，因此主鍵為 (id, started_at)，
+    「一個驗證碼只對應一筆 session」改由驗證碼狀態轉換保證。
+    """
 
     __tablename__ = "exam_sessions"
+    __table_args__ = (
+        Index("ix_exam_sessions_verification_code_id", "verification_code_id"),
+        Index("ix_exam_sessions_started_at", "started_at"),
+        {"postgresql_partition_by": "RANGE (started_at)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     verification_code_id: Mapped[uuid.UUID] = mapped_column(
-        ForeignKey("verification_codes.id", ondelete="CASCADE"), unique=True, nullable=False
+        ForeignKey("verification_codes.id", ondelete="CASCADE"), nullable=False
     )
     student_name: Mapped[str] = mapped_column(String(100), nullable=False)
     exam_id: Mapped[str] = mapped_column(String(100), nullable=False)
-    answers: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # 學生作答資料
-    results: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # 評分結果 (question_id -> score)
+    answers: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # 作答中的暫存資料，完成後清空
+    scores: Mapped[list[float | None] | None] = mapped_column(ARRAY(REAL), nullable=True)  # 各題得分率，依 CompiledTemplate 題目索引排列；適性測驗未施測為 NULL
     assessment: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # 完整 AssessmentResult
     ai_analysis: Mapped[dict | None] = mapped_column(JSONB, nullable=True)  # AI 分析結果
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="in_progress")  # in_progress / completed
-    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )  # 分區鍵
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     # 關聯
     verification_code: Mapped["VerificationCode"] = relationship(back_populates="exam_session")
+
+
+class IdempotencyKey(Base):
+    """冪等鍵表：記錄帶 Idempotency-Key 的寫入請求及其回應位元組，重送時原樣回放。
+
+    scope 區分路由與身分（例如 submit:<session_id>、scoring:<user_id>），不同使用者的同名鍵互不影響；
+    request_hash 為請求內容雜湊，同一個鍵帶著不同內容重送時拒絕。
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_created_at", "created_at"),)
+
+    scope: Mapped[str] = mapped_column(String(100), primary_key=True)
+    key: Mapped[str] = mapped_column(String(128), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    response_body: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+# create_all（開發模式）只會建立分區父表，補上預設分區讓寫入可以落地
+event.listen(
+    ExamSession.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS exam_sessions_default PARTITION OF exam_sessions DEFAULT"),
+)
@@ -0,0 +1,110 @@
+"""跨 worker 的快取失效通道：以 PostgreSQL LISTEN/NOTIFY 廣播變更。
+
+寫入端在同一個交易中呼叫 publish()，通知會在 commit 後才送出，
+交易回滾則不會送出。每個 worker 啟動一個 NotifyListener，以獨立的
+asyncpg 連線 LISTEN，收到通知後呼叫已訂閱的處理函式。
+
+開始 LISTEN 之前與連線中斷期間都可能漏收通知，因此每次 LISTEN 建立後
+（包含第一次）都會以 payload=None 呼叫所有處理函式，代表「狀態未知，請整體重新同步」。
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+USER_CHANNEL = "apexmath_user_changed"
+CODE_CHANNEL = "apexmath_codes_created"
+EXAM_CHANNEL = "apexmath_exam_changed"
+
+Handler = Callable[[str | None], None]
+
+_notifications_received = counter("notify_received_total", "收到的 LISTEN/NOTIFY 通知數")
+_reconnects = counter("notify_reconnects_total", "LISTEN 連線重新建立次數")
+
+
+async def publish(db: AsyncSession, channel: str, payload: str) -> None:
+    """在目前交易中送出通知（commit 後生效）。非 PostgreSQL 資料庫時略過。"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+
+def _to_asyncpg_dsn(url: str) -> str:
+    """SQLAlchemy URL（postgresql+asyncpg://）轉為 asyncpg 可用的 DSN。"""
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+class NotifyListener:
+    """以獨立連線 LISTEN 各通道，斷線時自動重連。"""
+
+    def __init__(self, database_url: str, retry_seconds: float = 5.0) -> None:
+        self._dsn = _to_asyncpg_dsn(database_url)
+        self._retry_seconds = retry_seconds
+        self._handlers: dict[str, list[Handler]] = {}
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        """註冊通道處理函式，須在 start() 之前呼叫。"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def dispatch(self, channel: str, payload: str | None) -> None:
+        """將通知交給該通道的所有處理函式；單一處理函式出錯不影響其他。"""
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("處理 %s 通知失敗", channel)
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        _notifications_received.inc()
+        self.dispatch(channel, payload)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        first = True
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self._dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                for channel in self._handlers:
+                    await connection.add_listener(channel, self._on_notification)
+                if not first:
+                    _reconnects.inc()
+                first = False
+                # LISTEN 生效前的通知已遺失，要求各訂閱者整體重新同步
+                for channel in self._handlers:
+                    self.dispatch(channel, None)
+                await closed.wait()
+                logger.warning("LISTEN 連線中斷，%s 秒後重新連線", self._retry_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                first = False
+                logger.exception("LISTEN 連線失敗，%s 秒後重試", self._retry_seconds)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self._retry_seconds)
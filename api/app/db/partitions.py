@@ -0,0 +1,100 @@
+"""exam_sessions 月分區管理：建立未來月份的分區、找出可封存的舊分區。
+
+分區命名為 exam_sessions_YYYY_MM，範圍為 [當月 1 日, 次月 1 日)。
+另有 exam_sessions_default 預設分區承接尚未建立月分區的資料。
+"""
+
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+PARENT_TABLE = "exam_sessions"
+DEFAULT_PARTITION = "exam_sessions_default"
+
+_MONTHLY_PARTITION_RE = re.compile(r"^exam_sessions_(\d{4})_(\d{2})$")
+
+
+def month_start(d: date) -> date:
+    """回傳 d 所在月份的 1 日。"""
+    return d.replace(day=1)
+
+
+def add_months(d: date, months: int) -> date:
+    """回傳 d 所在月份往後（或往前）months 個月的 1 日。"""
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """回傳指定月份的分區表名稱。"""
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+
+def partition_month(name: str) -> date | None:
+    """由分區表名稱解析月份，非月分區時回傳 None。"""
+    m = _MONTHLY_PARTITION_RE.match(name)
+    if m is None:
+        return None
+    return date(int(m.group(1)), int(m.group(2)), 1)
+
+
+async def create_month_partition(conn: AsyncConnection, month: date) -> bool:
+    """建立指定月份的分區，已存在時回傳 False。
+
+    預設分區中若已有落在該月份的資料，會先搬入新表再掛載，
+    否則 ATTACH PARTITION 會因預設分區違反新範圍而失敗。
+    """
+    name = partition_name(month)
+    exists = (await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})).scalar()
+    if exists is not None:
+        return False
+
+    lo, hi = month, add_months(month, 1)
+    await conn.execute(text(f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)'))
+    await conn.execute(
+        text(
+            f"WITH moved AS ("
+            f"  DELETE FROM {DEFAULT_PARTITION} WHERE started_at >= :lo AND started_at < :hi RETURNING *"
+            f') INSERT INTO "{name}" SELECT * FROM moved'
+        ),
+        {"lo": lo, "hi": hi},
+    )
+    await conn.execute(
+        text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION \"{name}\" FOR VALUES FROM ('{lo}') TO ('{hi}')")
+    )
+    return True
+
+
+async def ensure_session_partitions(
+    conn: AsyncConnection,
+    months_ahead: int = 3,
+    today: date | None = None,
+) -> list[str]:
+    """確保本月起往後 months_ahead 個月的分區皆已建立，回傳本次新建的分區名稱。"""
+    start = month_start(today or date.today())
+    created = []
+    for i in range(months_ahead + 1):
+        month = add_months(start, i)
+        if await create_month_partition(conn, month):
+            created.append(partition_name(month))
+    return created
+
+
+async def list_month_partitions(conn: AsyncConnection) -> list[tuple[str, date]]:
+    """列出目前掛載在 exam_sessions 下的月分區（依月份排序）。"""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    partitions = []
+    for (name,) in result.all():
+        month = partition_month(name)
+        if month is not None:
+            partitions.append((name, month))
+    return sorted(partitions, key=lambda p: p[1])
@@ -0,0 +1,72 @@
+"""資料庫指標：以 cursor 事件計時每個 SQL 查詢，並在抓取時輸出連線池狀態。
+
+instrument_engine() 對 async engine 底層的 sync engine 註冊 before/after_cursor_execute；
+開始時間存在連線的 info 堆疊上（同一連線不會並行執行），結束時寫入全域直方圖
+與目前請求的 RequestStats（見 app.core.request_metrics）。
+"""
+
+import time
+
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.metrics import add_collector, counter, gauge, histogram
+from app.core.request_metrics import current_request_stats
+
+_START_KEY = "query_start_time"
+
+_query_duration = histogram(
+    "db_query_duration_seconds",
+    "單一 SQL 查詢的執行時間（秒）",
+    ("engine",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+_query_errors = counter("db_query_errors_total", "執行失敗的 SQL 查詢數", ("engine",))
+_pool_size = gauge("db_pool_size", "連線池設定的常駐連線數", ("engine",))
+_pool_checked_out = gauge("db_pool_checked_out", "目前借出使用中的連線數", ("engine",))
+_pool_checked_in = gauge("db_pool_checked_in", "目前閒置於池中的連線數", ("engine",))
+_pool_overflow = gauge("db_pool_overflow", "超出常駐數的溢出連線數（負值表示尚未建滿）", ("engine",))
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """為 engine 註冊查詢計時事件與連線池量測；name 作為指標的 engine 標籤（primary / replica）。"""
+    instrument_sync_engine(engine.sync_engine, name)
+
+
+def instrument_sync_engine(sync_engine: Engine, name: str) -> None:
+    """同 instrument_engine()，作用於同步 engine（async engine 底層即為同步 engine）。"""
+    duration = _query_duration.labels(name)
+    errors = _query_errors.labels(name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info[_START_KEY].pop()
+        duration.observe(elapsed)
+        stats = current_request_stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+            if stats.statements is not None:
+                stats.statements.append((statement, elapsed))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get(_START_KEY) if conn is not None else None
+        if starts:
+            starts.pop()
+        errors.inc()
+
+    if all(hasattr(sync_engine.pool, attr) for attr in ("size", "checkedout", "checkedin", "overflow")):
+        def _collect_pool() -> None:
+            pool = sync_engine.pool  # dispose() 會換成新的連線池，每次抓取時重新取得
+            _pool_size.labels(name).set(pool.size())
+            _pool_checked_out.labels(name).set(pool.checkedout())
+            _pool_checked_in.labels(name).set(pool.checkedin())
+            _pool_overflow.labels(name).set(pool.overflow())
+
+        add_collector(_collect_pool)
@@ -7,6 +7,8 @@ from app.auth.security import hash_password
 from app.core.config import settings
 from app.data.grade5_entrance import grade5_entrance_template
 from app.db.models import ExamTemplateRecord, User
+from app.domain.compiled_template import CompiledTemplate
+from app.services.template_service import save_template
 
 
 async def seed_admin(db: AsyncSession) -> None:
@@ -17,7 +19,7 @@ async def seed_admin(db: AsyncSession) -> None:
 
     admin = User(
         username=settings.admin_username,
-        hashed_password=hash_password(settings.admin_password),
+        hashed_password=await hash_password(settings.admin_password),
         display_name="系統管理員",
         role="admin",
     )
@@ -34,13 +36,8 @@ async def seed_exam_templates(db: AsyncSession) -> None:
     if result.scalar_one_or_none() is not None:
         return
 
-    record = ExamTemplateRecord(
-        exam_id=template.exam_id,
-        name=template.name,
-        template_data=template.model_dump(),
-    )
-    db.add(record)
-    await db.commit()
+    # 與管理者上傳走同一路徑：預先編譯並建立第 1 版紀錄
+    await save_template(db, template, CompiledTemplate(template), created_by=None)
 
 
 async def run_seed(db: AsyncSession) -> None:
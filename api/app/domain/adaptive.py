@@ -0,0 +1,227 @@
+"""適性測驗（CAT）引擎：2PL 試題反應模型、EAP 能力估計與預先排序的試題資訊量索引。
+
+- 每個單元（對應一個知識點）各自估計能力 θ，單元內依序施測，直到達到
+  items_per_section、題庫用盡或標準誤低於 target_se。
+- θ 以 EAP 在固定格點上估計（先驗為標準常態），全對或全錯時仍有有限的估計值；
+  得分率 s ∈ [0, 1] 以 P^s (1-P)^(1-s) 視為部分得分的概似。
+- 選題索引：每個格點預先將題庫依 Fisher 資訊量 a²P(1-P) 由大到小排序。選題時以二分搜尋
+  找到最接近 θ 的格點（O(log g)），再略過已作答的題目，最多檢查「已答題數 + 1」個位置。
+- 評分前須已施測完畢（next_question 回報 done），否則拋出 ValueError。已施測單元中
+  未抽到的題目以 θ 下的期望得分率 P(θ) 補齊；沒有任何作答的單元不補齊，以 0 計。
+  再套用原本的知識點與素養加權公式，結果仍為 KnowledgePointScore / MathLiteracyScore。
+
+引擎無狀態：作答紀錄由呼叫端每次帶入，不需在每題之後寫入資料庫。
+"""
+
+import bisect
+import math
+import weakref
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from app.domain.compiled_template import CompiledTemplate
+from app.domain.models import AdaptiveSettings, AssessmentResult
+
+THETA_MIN = -4.0
+THETA_MAX = 4.0
+THETA_STEP = 0.1
+THETA_GRID: list[float] = [
+    round(THETA_MIN + i * THETA_STEP, 10) for i in range(round((THETA_MAX - THETA_MIN) / THETA_STEP) + 1)
+]
+# 標準常態先驗的對數權重（省略常數項）
+_LOG_PRIOR: list[float] = [-0.5 * t * t for t in THETA_GRID]
+
+
+def probability(a: float, b: float, theta: float) -> float:
+    """2PL 模型下答對的機率。"""
+    return 1.0 / (1.0 + math.exp(-a * (theta - b)))
+
+
+def information(a: float, b: float, theta: float) -> float:
+    """2PL 試題在 θ 的 Fisher 資訊量。"""
+    p = probability(a, b, theta)
+    return a * a * p * (1.0 - p)
+
+
+@dataclass(frozen=True)
+class AbilityEstimate:
+    theta: float
+    se: float
+
+
+@dataclass(frozen=True)
+class NextQuestion:
+    """下一題；question_id 為 None 表示所有單元都已結束，可以提交。"""
+
+    question_id: str | None
+    section_id: str | None
+    theta: float
+    se: float
+    answered: int
+    done: bool
+
+
+class _SectionIndex:
+    """單一單元的題庫參數、各格點的對數機率表與資訊量排序。"""
+
+    def __init__(self, section_id: str, items: list[tuple[str, int, float, float]]) -> None:
+        self.section_id = section_id
+        self.question_ids = [qid for qid, _, _, _ in items]
+        self.vector_index = [i for _, i, _, _ in items]  # 在 CompiledTemplate 分數向量中的位置
+        self.params = [(a, b) for _, _, a, b in items]
+        self.position = {qid: pos for pos, qid in enumerate(self.question_ids)}
+
+        # log P 與 log(1-P)，估計 θ 時只需查表加總
+        self.log_p: list[list[float]] = []
+        self.log_q: list[list[float]] = []
+        for a, b in self.params:
+            ps = [probability(a, b, t) for t in THETA_GRID]
+            self.log_p.append([math.log(max(p, 1e-12)) for p in ps])
+            self.log_q.append([math.log(max(1.0 - p, 1e-12)) for p in ps])
+
+        # ranking[g]：格點 g 上依資訊量由大到小的題目位置
+        self.ranking: list[list[int]] = [
+            sorted(range(len(items)), key=lambda pos: -information(*self.params[pos], t))
+            for t in THETA_GRID
+        ]
+
+    def estimate(self, responses: list[tuple[int, float]]) -> AbilityEstimate:
+        """以 EAP 估計 θ；responses 為 (題目位置, 得分率)。"""
+        log_post = list(_LOG_PRIOR)
+        for pos, score in responses:
+            lp, lq = self.log_p[pos], self.log_q[pos]
+            for g in range(len(THETA_GRID)):
+                log_post[g] += score * lp[g] + (1.0 - score) * lq[g]
+        peak = max(log_post)
+        weights = [math.exp(v - peak) for v in log_post]
+        total = sum(weights)
+        mean = sum(w * t for w, t in zip(weights, THETA_GRID)) / total
+        var = sum(w * (t - mean) ** 2 for w, t in zip(weights, THETA_GRID)) / total
+        return AbilityEstimate(theta=mean, se=math.sqrt(var))
+
+    def select(self, theta: float, answered: set[int]) -> int | None:
+        """回傳 θ 附近資訊量最大且尚未作答的題目位置。"""
+        g = _nearest_grid_point(theta)
+        for pos in self.ranking[g]:
+            if pos not in answered:
+                return pos
+        return None
+
+
+def _nearest_grid_point(theta: float) -> int:
+    g = bisect.bisect_left(THETA_GRID, theta)
+    if g == 0:
+        return 0
+    if g == len(THETA_GRID):
+        return g - 1
+    return g if THETA_GRID[g] - theta < theta - THETA_GRID[g - 1] else g - 1
+
+
+class AdaptiveEngine:
+    """依編譯後模板建立的適性施測引擎；同一模板版本共用一份（見 adaptive_engine()）。"""
+
+    def __init__(self, compiled: CompiledTemplate) -> None:
+        template = compiled.template
+        if template.adaptive is None:
+            raise ValueError(f"Exam {template.exam_id} is not adaptive")
+        self.compiled = compiled
+        self.settings: AdaptiveSettings = template.adaptive
+        self.sections: list[_SectionIndex] = []
+        self._section_of: dict[str, _SectionIndex] = {}
+        for section in template.sections:
+            items = [
+                (
+                    q.question_id,
+                    compiled.index[q.question_id],
+                    q.irt_a if q.irt_a is not None else 1.0,
+                    q.irt_b if q.irt_b is not None else math.log(q.difficulty_weight),
+                )
+                for q in section.questions
+            ]
+            index = _SectionIndex(section.section_id, items)
+            self.sections.append(index)
+            for qid in index.question_ids:
+                self._section_of[qid] = index
+
+    def _group(self, responses: Mapping[str, float]) -> dict[str, list[tuple[int, float]]]:
+        grouped: dict[str, list[tuple[int, float]]] = {s.section_id: [] for s in self.sections}
+        for qid, score in responses.items():
+            section = self._section_of.get(qid)
+            if section is None:
+                raise ValueError(f"Invalid question_id: {qid}")
+            grouped[section.section_id].append((section.position[qid], score))
+        return grouped
+
+    def _finished(self, section: _SectionIndex, answered: int, estimate: AbilityEstimate) -> bool:
+        if answered >= min(self.settings.items_per_section, len(section.question_ids)):
+            return True
+        target = self.settings.target_se
+        return target is not None and answered > 0 and estimate.se <= target
+
+    def estimate(self, responses: Mapping[str, float]) -> dict[str, AbilityEstimate]:
+        """各單元的能力估計。"""
+        grouped = self._group(responses)
+        return {s.section_id: s.estimate(grouped[s.section_id]) for s in self.sections}
+
+    def next_question(self, responses: Mapping[str, float]) -> NextQuestion:
+        """依目前作答選出下一題：第一個尚未結束的單元中，資訊量最大的未作答題目。"""
+        grouped = self._group(responses)
+        estimate = AbilityEstimate(theta=0.0, se=1.0)
+        for section in self.sections:
+            answered = grouped[section.section_id]
+            estimate = section.estimate(answered)
+            if self._finished(section, len(answered), estimate):
+                continue
+            pos = section.select(estimate.theta, {p for p, _ in answered})
+            if pos is None:
+                continue
+            return NextQuestion(
+                question_id=section.question_ids[pos],
+                section_id=section.section_id,
+                theta=round(estimate.theta, 4),
+                se=round(estimate.se, 4),
+                answered=len(responses),
+                done=False,
+            )
+        return NextQuestion(
+            question_id=None,
+            section_id=None,
+            theta=round(estimate.theta, 4),
+            se=round(estimate.se, 4),
+            answered=len(responses),
+            done=True,
+        )
+
+    def assess(self, student_name: str, responses: Mapping[str, float]) -> tuple[AssessmentResult, list[float | None]]:
+        """評分並回傳 (評估結果, 儲存用分數向量)。
+
+        尚未施測完畢時拋出 ValueError（空白或中途的作答不能以先驗能力補齊成及格分數）。
+        評分向量中，已施測單元未抽到的題目以期望得分率 P(θ) 補齊，沒有任何作答的單元以 0 計；
+        儲存向量只保留實際作答，未施測為 None，題目統計不會把補齊值當成作答。
+        """
+        if not self.next_question(responses).done:
+            raise ValueError("Adaptive exam is not finished: request the next question until done")
+        grouped = self._group(responses)
+        filled = [0.0] * len(self.compiled)
+        stored: list[float | None] = [None] * len(self.compiled)
+        for section in self.sections:
+            answered = grouped[section.section_id]
+            if answered:
+                theta = section.estimate(answered).theta
+                for pos, (a, b) in enumerate(section.params):
+                    filled[section.vector_index[pos]] = probability(a, b, theta)
+            for pos, score in answered:
+                filled[section.vector_index[pos]] = score
+                stored[section.vector_index[pos]] = score
+        return self.compiled.assess_vector(student_name, filled), stored
+
+
+_engines: "weakref.WeakKeyDictionary[CompiledTemplate, AdaptiveEngine]" = weakref.WeakKeyDictionary()
+
+
+def adaptive_engine(compiled: CompiledTemplate) -> AdaptiveEngine:
+    """取得模板版本對應的引擎（索引只在第一次使用時建立）；非適性模板拋出 ValueError。"""
+    engine = _engines.get(compiled)
+    if engine is None:
+        engine = _engines[compiled] = AdaptiveEngine(compiled)
+    return engine
@@ -0,0 +1,121 @@
+"""編譯後的測驗卷模板：固定題目順序，提供分數向量轉換與批次評分。"""
+
+from collections.abc import Sequence
+
+from app.domain.models import (
+    AssessmentResult,
+    ExamTemplate,
+    KnowledgePointCategory,
+    KnowledgePointScore,
+    MathLiteracyDimension,
+    MathLiteracyScore,
+)
+
+
+class CompiledTemplate:
+    """測驗卷的編譯表示，題目依單元順序攤平，每題對應一個固定索引。
+
+    ExamSession.scores 以此索引順序儲存各題得分率（real[]），
+    因此同一份模板的題目順序一經使用即不可再更動。
+    """
+
+    def __init__(self, template: ExamTemplate, compiled: dict | None = None) -> None:
+        """編譯模板；傳入 to_dict() 的結果時直接還原，不重新計算權重分組。"""
+        self.template = template
+        if compiled is not None:
+            self._restore(compiled)
+            return
+
+        questions = template.get_all_questions()
+        self.question_ids: list[str] = [q.question_id for q in questions]
+        self.index: dict[str, int] = {qid: i for i, qid in enumerate(self.question_ids)}
+
+        # 預先依類別分組 (題目索引, 權重)，評分時只需對分數向量做加權加總
+        self._kp_terms: list[tuple[KnowledgePointCategory, list[tuple[int, float]], float]] = []
+        for cat in KnowledgePointCategory:
+            terms = [(i, q.difficulty_weight) for i, q in enumerate(questions) if q.knowledge_point == cat]
+            self._kp_terms.append((cat, terms, sum(w for _, w in terms)))
+        self._literacy_terms: list[tuple[MathLiteracyDimension, list[tuple[int, float]], float]] = []
+        for dim in MathLiteracyDimension:
+            terms = [(i, q.literacy_weights[dim]) for i, q in enumerate(questions) if dim in q.literacy_weights]
+            self._literacy_terms.append((dim, terms, sum(w for _, w in terms)))
+
+    def to_dict(self) -> dict:
+        """編譯結果的 JSON 表示，上傳模板時預先計算並存入資料庫。"""
+        return {
+            "question_ids": self.question_ids,
+            "knowledge_points": [[cat.value, terms, den] for cat, terms, den in self._kp_terms],
+            "literacy": [[dim.value, terms, den] for dim, terms, den in self._literacy_terms],
+        }
+
+    def _restore(self, compiled: dict) -> None:
+        self.question_ids = list(compiled["question_ids"])
+        self.index = {qid: i for i, qid in enumerate(self.question_ids)}
+        self._kp_terms = [
+            (KnowledgePointCategory(cat), [(i, w) for i, w in terms], den)
+            for cat, terms, den in compiled["knowledge_points"]
+        ]
+        self._literacy_terms = [
+            (MathLiteracyDimension(dim), [(i, w) for i, w in terms], den)
+            for dim, terms, den in compiled["literacy"]
+        ]
+
+    @property
+    def exam_id(self) -> str:
+        return self.template.exam_id
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def to_vector(self, score_map: dict[str, float]) -> list[float]:
+        """將 question_id → 得分率 映射轉為分數向量，未作答的題目為 0。
+
+        遇到模板中不存在的 question_id 時拋出 ValueError。
+        """
+        vector = [0.0] * len(self.question_ids)
+        for qid, score in score_map.items():
+            i = self.index.get(qid)
+            if i is None:
+                raise ValueError(f"Invalid question_id: {qid}")
+            vector[i] = score
+        return vector
+
+    def to_score_map(self, vector: Sequence[float]) -> dict[str, float]:
+        """將分數向量還原為 question_id → 得分率 映射。"""
+        if len(vector) != len(self.question_ids):
+            raise ValueError(
+                f"Score vector length {len(vector)} does not match exam {self.exam_id} ({len(self.question_ids)} questions)"
+            )
+        return dict(zip(self.question_ids, vector))
+
+    def assess_vector(self, student_name: str, vector: Sequence[float]) -> AssessmentResult:
+        """以分數向量計算評估結果，公式與 scoring.generate_assessment 相同。"""
+        kp_scores = []
+        for cat, terms, den in self._kp_terms:
+            num = 0.0
+            for i, w in terms:
+                num += vector[i] * w
+            score = (num / den * 5.0) if den > 0 else 0.0
+            kp_scores.append(KnowledgePointScore(category=cat, score=round(score, 4)))
+
+        literacy_scores = []
+        for dim, terms, den in self._literacy_terms:
+            num = 0.0
+            for i, w in terms:
+                num += vector[i] * w
+            score = (num / den * 5.0) if den > 0 else 0.0
+            literacy_scores.append(MathLiteracyScore(dimension=dim, score=round(score, 4)))
+
+        return AssessmentResult(
+            student_name=student_name,
+            exam_id=self.exam_id,
+            knowledge_point_scores=kp_scores,
+            math_literacy_scores=literacy_scores,
+        )
+
+    def assess_batch(self, entries: Sequence[tuple[str, Sequence[float]]]) -> list[AssessmentResult]:
+        """批次評分：entries 為 (學生姓名, 分數向量)，不需逐筆重建 submission 與驗證題號。
+
+        逐筆呼叫 assess_vector（純 Python 迴圈，未向量化）；省下的是 submission 建構與題號查找。
+        """
+        return [self.assess_vector(name, vector) for name, vector in entries]
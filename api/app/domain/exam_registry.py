@@ -1,5 +1,6 @@
 """測驗卷註冊表：提供記憶體內的測驗卷模板管理功能。"""
 
+from app.domain.compiled_template import CompiledTemplate
 from app.domain.models import ExamTemplate
 
 
@@ -8,6 +9,7 @@ class ExamRegistry:
 
     def __init__(self) -> None:
         self._templates: dict[str, ExamTemplate] = {}
+        self._compiled: dict[str, CompiledTemplate] = {}
 
     def register(self, template: ExamTemplate) -> None:
         """註冊一份測驗卷模板，若 exam_id 已存在則拋出 ValueError。"""
@@ -19,6 +21,27 @@ class ExamRegistry:
         """依 exam_id 取得測驗卷模板，找不到時回傳 None。"""
         return self._templates.get(exam_id)
 
+    def get_compiled(self, exam_id: str) -> CompiledTemplate | None:
+        """依 exam_id 取得編譯後的模板（首次存取時編譯並快取），找不到時回傳 None。"""
+        compiled = self._compiled.get(exam_id)
+        if compiled is None:
+            template = self._templates.get(exam_id)
+            if template is None:
+                return None
+            compiled = self._compiled[exam_id] = CompiledTemplate(template)
+        return compiled
+
     def list_ids(self) -> list[str]:
         """列出所有已註冊的測驗卷 ID。"""
         return list(self._templates.keys())
+
+    def invalidate(self, exam_id: str | None = None) -> None:
+        """移除快取的模板；記憶體版的模板即為唯一來源，無需處理。"""
+
+    async def resolve(self, exam_id: str) -> CompiledTemplate | None:
+        """路由使用的非同步查詢介面；記憶體版直接回傳 get_compiled()，DB 版會按需載入。"""
+        return self.get_compiled(exam_id)
+
+    async def list_active_ids(self) -> list[str]:
+        """列出可作答的測驗卷 ID。"""
+        return self.list_ids()
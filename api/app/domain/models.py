@@ -36,6 +36,9 @@ class QuestionDefinition(BaseModel):
     knowledge_point: KnowledgePointCategory
     difficulty_weight: float = Field(gt=0)  # 難度權重，值越大代表越難
     literacy_weights: dict[MathLiteracyDimension, float] = Field(min_length=1)  # 各素養維度的權重分配
+    # 2PL 試題參數（僅適性測驗使用）：鑑別度 a 與難度 b；b 未設定時以 ln(difficulty_weight) 估計
+    irt_a: float | None = Field(default=None, gt=0)
+    irt_b: float | None = None
 
 
 class SectionDefinition(BaseModel):
@@ -47,12 +50,20 @@ class SectionDefinition(BaseModel):
     questions: list[QuestionDefinition]
 
 
+class AdaptiveSettings(BaseModel):
+    """適性測驗設定：每個單元的題庫只施測部分題目，依能力估計選出資訊量最大的下一題。"""
+
+    items_per_section: int = Field(ge=1)  # 每單元最多施測題數
+    target_se: float | None = Field(default=None, gt=0)  # 能力估計標準誤低於此值即提前結束該單元
+
+
 class ExamTemplate(BaseModel):
     """測驗卷模板，包含多個單元，定義一份完整測驗的結構。"""
 
     exam_id: str
     name: str
     sections: list[SectionDefinition]
+    adaptive: AdaptiveSettings | None = None  # 設定時以適性模式施測，各單元題目視為題庫
 
     def get_all_questions(self) -> list[QuestionDefinition]:
         """取得測驗卷中所有單元的全部題目，攤平為一維清單。"""
@@ -0,0 +1,75 @@
+"""測驗卷模板的結構檢查：補足 pydantic 欄位驗證之外的跨欄位規則。
+
+錯誤（errors）代表模板不可使用；警告（warnings）只提示可能的問題，不阻擋上傳。
+"""
+
+import math
+import re
+
+from app.domain.models import ExamTemplate, MathLiteracyDimension
+
+EXAM_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,99}$")
+MAX_DIFFICULTY_WEIGHT = 10.0
+MAX_LITERACY_WEIGHT = 1.0
+
+
+def check_template(template: ExamTemplate) -> tuple[list[str], list[str]]:
+    """回傳 (errors, warnings)。"""
+    errors: list[str] = []
+    warnings: list[str] = []
+
+    if not EXAM_ID_PATTERN.match(template.exam_id):
+        errors.append(f"exam_id 只能包含小寫英數字、- 與 _：{template.exam_id}")
+    if not template.sections:
+        errors.append("至少需要一個單元")
+
+    section_ids: set[str] = set()
+    question_ids: set[str] = set()
+    covered_dims: set[MathLiteracyDimension] = set()
+    for section in template.sections:
+        if section.section_id in section_ids:
+            errors.append(f"單元 ID 重複：{section.section_id}")
+        section_ids.add(section.section_id)
+        if not section.questions:
+            errors.append(f"單元 {section.section_id} 沒有題目")
+
+        for q in section.questions:
+            if q.question_id in question_ids:
+                errors.append(f"題號重複：{q.question_id}")
+            question_ids.add(q.question_id)
+
+            if q.knowledge_point != section.knowledge_point:
+                errors.append(
+                    f"題目 {q.question_id} 的知識點（{q.knowledge_point.value}）"
+                    f"與所屬單元 {section.section_id}（{section.knowledge_point.value}）不一致"
+                )
+            if not math.isfinite(q.difficulty_weight) or q.difficulty_weight > MAX_DIFFICULTY_WEIGHT:
+                errors.append(f"題目 {q.question_id} 的難度權重須介於 0～{MAX_DIFFICULTY_WEIGHT:g}")
+            for name, value in (("鑑別度 irt_a", q.irt_a), ("難度 irt_b", q.irt_b)):
+                if value is not None and not math.isfinite(value):
+                    errors.append(f"題目 {q.question_id} 的{name}須為有限數值")
+            for dim, weight in q.literacy_weights.items():
+                if not math.isfinite(weight) or not 0 < weight <= MAX_LITERACY_WEIGHT:
+                    errors.append(f"題目 {q.question_id} 的素養權重（{dim.value}）須介於 0～{MAX_LITERACY_WEIGHT:g}")
+                else:
+                    covered_dims.add(dim)
+
+    if template.adaptive is not None and template.sections:
+        largest = max(len(section.questions) for section in template.sections)
+        if template.adaptive.items_per_section >= largest:
+            warnings.append("每單元施測題數不少於題庫題數，適性模式不會減少題目")
+
+    for dim in MathLiteracyDimension:
+        if dim not in covered_dims:
+            warnings.append(f"沒有任何題目評量「{dim.value}」，該維度分數將恆為 0")
+
+    return errors, warnings
+
+
+def check_compatible(previous: ExamTemplate, template: ExamTemplate) -> list[str]:
+    """已有作答紀錄的試卷改版時，題號與順序必須不變（scores 向量依題目順序儲存）。"""
+    old_ids = [q.question_id for q in previous.get_all_questions()]
+    new_ids = [q.question_id for q in template.get_all_questions()]
+    if old_ids == new_ids:
+        return []
+    return ["此試卷已有作答紀錄，新版本的題號與順序必須與目前版本相同"]
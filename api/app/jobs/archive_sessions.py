@@ -0,0 +1,45 @@
+"""封存排程任務：將超過保留期限的測驗紀錄匯出為壓縮檔並移出 exam_sessions。
+
+用法: python -m app.jobs.archive_sessions [--retention-days 730] [--output-dir archive]
+建議以 cron 每日或每週執行一次，同時會預先建立未來月份的分區，並清除過期的冪等鍵。
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.core.config import settings
+from app.db.engine import async_session_factory, engine
+from app.repositories.idempotency_repo import purge_expired_keys
+from app.services.archive_service import archive_sessions
+
+
+async def _run(retention_days: int, output_dir: Path, batch_size: int) -> None:
+    try:
+        report = await archive_sessions(engine, retention_days, output_dir, batch_size)
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.idempotency_key_retention_hours)
+        async with async_session_factory() as db:
+            purged = await purge_expired_keys(db, cutoff)
+            await db.commit()
+    finally:
+        await engine.dispose()
+
+    total = sum(report.values())
+    for name, count in report.items():
+        print(f"{name}: {count} 筆")
+    print(f"共封存 {total} 筆測驗紀錄至 {output_dir}")
+    print(f"清除過期冪等鍵 {purged} 筆")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="封存超過保留期限的測驗紀錄")
+    parser.add_argument("--retention-days", type=int, default=settings.session_retention_days)
+    parser.add_argument("--output-dir", type=Path, default=Path(settings.archive_dir))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(_run(args.retention_days, args.output_dir, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""一次性部署任務：執行 Alembic 遷移、補建分區並寫入種子資料。
+
+用法: python -m app.jobs.migrate_and_seed
+應在 API 程序啟動前執行（docker compose 的 migrate 服務），API 程序本身以 DB_STARTUP_MODE=verify
+啟動，只檢查版本，不再建表或 seed。尚未納入 Alembic 管理的既有資料庫（以 create_all 建表）會先 stamp 再升級。
+
+不支援部署前任務的環境（Render free 方案）改以 DB_STARTUP_MODE=migrate 啟動 gunicorn：
+master 在 fork worker 之前呼叫 migrate_on_start()，不另外啟動一個 Python 程序。
+"""
+
+import asyncio
+
+from app.auth.security import shutdown_password_executor
+from app.db.engine import async_session_factory, engine
+from app.db.migrations import current_revision, head_revision, upgrade_to_head
+from app.db.partitions import ensure_session_partitions
+from app.db.seed import run_seed
+
+
+async def _current_revision() -> str | None:
+    try:
+        return await current_revision(engine)
+    finally:
+        await engine.dispose()
+
+
+async def _seed() -> None:
+    try:
+        async with engine.begin() as conn:
+            created = await ensure_session_partitions(conn)
+        for name in created:
+            print(f"已建立分區 {name}")
+
+        async with async_session_factory() as session:
+            await run_seed(session)
+    finally:
+        await engine.dispose()
+
+
+def _migrate() -> None:
+    adopted = upgrade_to_head()
+    if adopted is not None:
+        print(f"既有 schema 判定為版本 {adopted}，已納入 Alembic 管理")
+    print(f"資料庫已遷移至 {head_revision()}")
+
+
+def main() -> None:
+    _migrate()
+    asyncio.run(_seed())
+    print("種子資料已就緒")
+
+
+def migrate_on_start() -> None:
+    """gunicorn master 啟動時呼叫（DB_STARTUP_MODE=migrate，見 gunicorn.conf.py）。
+
+    資料庫已在 head 時只查詢一次版本，不執行 alembic upgrade；補建分區與 seed 本來就只是檢查。
+    結束時連線池與 bcrypt 執行緒池都已關閉，fork 出的 worker 不會繼承。
+    """
+    current = asyncio.run(_current_revision())
+    if current == head_revision():
+        print(f"資料庫已在 {current}，略過遷移")
+    else:
+        _migrate()
+    try:
+        asyncio.run(_seed())
+    finally:
+        shutdown_password_executor()
+
+
+if __name__ == "__main__":
+    main()
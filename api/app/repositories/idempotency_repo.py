@@ -0,0 +1,49 @@
+"""冪等鍵資料存取層。"""
+
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import IdempotencyKey
+
+
+def _lock_id(scope: str, key: str) -> int:
+    """(scope, key) 對應的 64 位元 advisory lock 編號。"""
+    digest = hashlib.sha256(f"{scope}\x1f{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+async def lock_key(db: AsyncSession, scope: str, key: str) -> None:
+    """在目前交易中取得此鍵的 advisory lock，commit / rollback 時釋放。非 PostgreSQL 資料庫時略過。
+
+    同一個鍵的並行請求在此排隊：後到者等先到者的交易結束，再讀到已儲存的回應。
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    await db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": _lock_id(scope, key)})
+
+
+async def get_stored_response(db: AsyncSession, scope: str, key: str) -> IdempotencyKey | None:
+    result = await db.execute(
+        select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+    )
+    return result.scalar_one_or_none()
+
+
+def add_stored_response(
+    db: AsyncSession, scope: str, key: str, request_hash: str, status_code: int, body: bytes
+) -> None:
+    """記錄回應（不提交，與請求本身的寫入在同一個交易中生效）。"""
+    db.add(
+        IdempotencyKey(
+            scope=scope, key=key, request_hash=request_hash, status_code=status_code, response_body=body
+        )
+    )
+
+
+async def purge_expired_keys(db: AsyncSession, before: datetime) -> int:
+    """刪除 before 之前建立的冪等鍵（不提交），回傳刪除筆數。"""
+    result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < before))
+    return result.rowcount
@@ -1,39 +1,148 @@
 """測驗 Session 資料存取層。"""
 
 import uuid
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import datetime
+from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, Row, and_, func, insert, select, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.db.models import ExamSession, VerificationCode
 
+# 列表查詢可輸出的欄位（鍵為 API 欄位名稱）；只取摘要欄位，不拖出 assessment / ai_analysis 等 JSONB
+SESSION_LIST_COLUMNS = {
+    "session_id": ExamSession.id,
+    "student_name": ExamSession.student_name,
+    "exam_id": ExamSession.exam_id,
+    "code": func.coalesce(VerificationCode.code, ""),
+    "status": ExamSession.status,
+    "started_at": ExamSession.started_at,
+    "completed_at": ExamSession.completed_at,
+}
 
-async def get_sessions_by_teacher(
+
+async def list_session_rows(
+    db: AsyncSession,
+    fields: Iterable[str],
+    teacher_id: uuid.UUID | None = None,
+    exam_id: str | None = None,
+) -> Sequence[Row]:
+    """查詢測驗 session 列表，只取 fields 指定的欄位（通常為輸出模型的 model_fields）。
+
+    teacher_id 為 None 時列出全部（管理者）。
+    """
+    stmt = (
+        select(*(SESSION_LIST_COLUMNS[f].label(f) for f in fields))
+        .select_from(ExamSession)
+        .outerjoin(VerificationCode, VerificationCode.id == ExamSession.verification_code_id)
+        .order_by(ExamSession.started_at.desc())
+    )
+    if teacher_id is not None:
+        stmt = stmt.where(VerificationCode.teacher_id == teacher_id)
+    if exam_id is not None:
+        stmt = stmt.where(ExamSession.exam_id == exam_id)
+
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def stream_sessions_for_export(
     db: AsyncSession,
     teacher_id: uuid.UUID,
     exam_id: str | None = None,
-) -> list[ExamSession]:
-    """取得教師所轄驗證碼對應的測驗 session 列表。"""
+    batch_size: int = 500,
+) -> AsyncIterator[Sequence[Row]]:
+    """以 server-side cursor 分批讀取教師所轄的測驗紀錄，供匯出使用。
+
+    只選取匯出需要的欄位，每批最多 batch_size 筆，記憶體用量與總筆數無關。
+    """
     stmt = (
-        select(ExamSession)
+        select(
+            ExamSession.id.label("session_id"),
+            VerificationCode.code,
+            ExamSession.student_name,
+            ExamSession.exam_id,
+            ExamSession.status,
+            ExamSession.started_at,
+            ExamSession.completed_at,
+            ExamSession.assessment,
+        )
         .join(VerificationCode)
         .where(VerificationCode.teacher_id == teacher_id)
-        .options(selectinload(ExamSession.verification_code))
-        .order_by(ExamSession.started_at.desc())
+        .order_by(ExamSession.started_at)
+        .execution_options(yield_per=batch_size)
     )
     if exam_id is not None:
         stmt = stmt.where(ExamSession.exam_id == exam_id)
 
-    result = await db.execute(stmt)
-    return list(result.scalars().all())
+    result = await db.stream(stmt)
+    async for rows in result.partitions(batch_size):
+        yield rows
+
+
+def session_key(session_id: uuid.UUID, started_at: datetime | None) -> ColumnElement[bool]:
+    """依主鍵查詢單一 session 的條件。
+
+    帶 started_at（分區鍵）時只掃描該月的分區；為 None（舊的 token 或呼叫端未提供）時
+    只能以 id 逐一探測每個分區，成本隨分區數成長。
+    """
+    if started_at is None:
+        return ExamSession.id == session_id
+    return and_(ExamSession.id == session_id, ExamSession.started_at == started_at)
 
 
-async def get_session_by_id(db: AsyncSession, session_id: uuid.UUID) -> ExamSession | None:
-    """依 ID 取得測驗 session。"""
+async def get_session_by_id(
+    db: AsyncSession, session_id: uuid.UUID, started_at: datetime | None = None
+) -> ExamSession | None:
+    """依 ID（及分區鍵 started_at）取得測驗 session。"""
     result = await db.execute(
         select(ExamSession)
-        .where(ExamSession.id == session_id)
+        .where(session_key(session_id, started_at))
         .options(selectinload(ExamSession.verification_code))
     )
     return result.scalar_one_or_none()
+
+
+async def get_question_score_stats(
+    db: AsyncSession,
+    exam_id: str,
+    teacher_id: uuid.UUID | None = None,
+) -> list[tuple[int, float, int]]:
+    """以 SQL 彙總各題的平均得分率。
+
+    Returns:
+        (題目索引, 平均得分率, 作答人數) 列表，索引從 0 起算，對應 CompiledTemplate.question_ids；
+        沒有任何人作答的題目（適性題庫中從未被選中）不列出
+    """
+    item = func.unnest(ExamSession.scores).table_valued("score", with_ordinality="ord").render_derived()
+    # 適性測驗未施測的題目存為 NULL：avg 與 count(score) 都只計入實際作答
+    stmt = select(item.c.ord - 1, func.avg(item.c.score), func.count(item.c.score)).select_from(ExamSession)
+    if teacher_id is not None:
+        stmt = stmt.join(VerificationCode).where(VerificationCode.teacher_id == teacher_id)
+    stmt = (
+        stmt.join(item, true())
+        .where(ExamSession.exam_id == exam_id, ExamSession.status == "completed")
+        .group_by(item.c.ord)
+        .having(func.count(item.c.score) > 0)
+        .order_by(item.c.ord)
+    )
+
+    result = await db.execute(stmt)
+    return [(int(i), float(avg), int(n)) for i, avg, n in result.all() if n]
+
+
+async def bulk_save_scored_sessions(
+    db: AsyncSession,
+    new_sessions: Sequence[dict[str, Any]],
+    updated_sessions: Sequence[dict[str, Any]],
+) -> None:
+    """以批次 INSERT 與依主鍵的批次 UPDATE 寫入評分結果（不提交）。
+
+    updated_sessions 的每筆資料須包含完整主鍵 (id, started_at)。
+    """
+    if new_sessions:
+        await db.execute(insert(ExamSession), list(new_sessions))
+    if updated_sessions:
+        await db.execute(update(ExamSession), list(updated_sessions))
@@ -0,0 +1,47 @@
+"""試卷模板資料存取層。"""
+
+from sqlalchemy import exists, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from app.db.models import ExamSession, ExamTemplateRecord, ExamTemplateVersion
+
+
+async def get_template_by_exam_id(db: AsyncSession, exam_id: str, for_update: bool = False) -> ExamTemplateRecord | None:
+    """依 exam_id 查詢模板；for_update 時鎖定該列，避免同時上傳產生相同版本號。"""
+    stmt = select(ExamTemplateRecord).where(ExamTemplateRecord.exam_id == exam_id)
+    if for_update:
+        stmt = stmt.with_for_update()
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def insert_template_if_absent(db: AsyncSession, exam_id: str, name: str, template_data: dict) -> None:
+    """以 INSERT ... ON CONFLICT DO NOTHING 建立第 0 版的模板列（不提交）。
+
+    同一試卷同時首次上傳時，後到者不會因唯一約束失敗，而是等先到者提交後沿用同一列。
+    """
+    await db.execute(
+        insert(ExamTemplateRecord)
+        .values(exam_id=exam_id, name=name, template_data=template_data, version=0)
+        .on_conflict_do_nothing(index_elements=[ExamTemplateRecord.exam_id])
+    )
+
+
+async def exam_has_sessions(db: AsyncSession, exam_id: str) -> bool:
+    """試卷是否已有任何作答紀錄。"""
+    result = await db.execute(select(exists().where(ExamSession.exam_id == exam_id)))
+    return bool(result.scalar())
+
+
+async def list_template_versions(db: AsyncSession, exam_id: str) -> list[ExamTemplateVersion]:
+    """列出試卷的歷次版本（新到舊），不載入模板內容。"""
+    result = await db.execute(
+        select(ExamTemplateVersion)
+        .join(ExamTemplateRecord, ExamTemplateRecord.id == ExamTemplateVersion.exam_template_id)
+        .where(ExamTemplateRecord.exam_id == exam_id)
+        .options(load_only(ExamTemplateVersion.version, ExamTemplateVersion.created_by, ExamTemplateVersion.created_at))
+        .order_by(ExamTemplateVersion.version.desc())
+    )
+    return list(result.scalars().all())
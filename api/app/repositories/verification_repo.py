@@ -2,43 +2,54 @@
 
 import uuid
 
-from sqlalchemy import select
+from collections.abc import Sequence
+
+from sqlalchemy import Row, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.db.models import VerificationCode
+from app.db.models import ExamSession, ExamTemplateRecord, VerificationCode
+from app.db.notify import CODE_CHANNEL, publish
+from app.services.code_index import code_index, encode_ranges
 
 
 async def create_codes(
     db: AsyncSession,
     codes: list[VerificationCode],
 ) -> list[VerificationCode]:
-    """批次建立驗證碼。"""
+    """批次建立驗證碼，提交後更新本地驗證碼索引並通知其他 worker。"""
     db.add_all(codes)
+    await publish(db, CODE_CHANNEL, encode_ranges(c.code for c in codes))
     await db.commit()
+    code_index.add_many(c.code for c in codes)
     for c in codes:
         await db.refresh(c)
     return codes
 
 
-async def get_codes_by_teacher(
+async def list_code_rows(
     db: AsyncSession,
     teacher_id: uuid.UUID,
     exam_id: str | None = None,
-) -> list[VerificationCode]:
-    """取得教師的驗證碼列表，可選依試卷篩選。"""
+) -> Sequence[Row]:
+    """取得教師的驗證碼列表（欄位同 CodeOut），可選依試卷篩選；只查欄位，不建立 ORM 物件。"""
     stmt = (
-        select(VerificationCode)
+        select(
+            VerificationCode.code,
+            VerificationCode.prefix,
+            VerificationCode.student_number,
+            VerificationCode.status,
+            ExamTemplateRecord.exam_id,
+            VerificationCode.created_at,
+        )
+        .join(ExamTemplateRecord, ExamTemplateRecord.id == VerificationCode.exam_template_id)
         .where(VerificationCode.teacher_id == teacher_id)
-        .options(selectinload(VerificationCode.exam_template))
         .order_by(VerificationCode.created_at.desc())
     )
     if exam_id is not None:
-        from app.db.models import ExamTemplateRecord
-        stmt = stmt.join(ExamTemplateRecord).where(ExamTemplateRecord.exam_id == exam_id)
+        stmt = stmt.where(ExamTemplateRecord.exam_id == exam_id)
 
     result = await db.execute(stmt)
-    return list(result.scalars().all())
+    return result.all()
 
 
 async def get_code_by_value(db: AsyncSession, code: str) -> VerificationCode | None:
@@ -47,3 +58,36 @@ async def get_code_by_value(db: AsyncSession, code: str) -> VerificationCode | N
         select(VerificationCode).where(VerificationCode.code == code)
     )
     return result.scalar_one_or_none()
+
+
+async def get_codes_for_scoring(db: AsyncSession, codes: Sequence[str]) -> list[Row]:
+    """一次查出多個驗證碼的歸屬、試卷與既有 session，並鎖定驗證碼列直到交易結束。
+
+    回傳欄位：id, code, teacher_id, exam_id, session_id, started_at（無 session 時後兩者為 None）。
+    """
+    if not codes:
+        return []
+    result = await db.execute(
+        select(
+            VerificationCode.id,
+            VerificationCode.code,
+            VerificationCode.teacher_id,
+            ExamTemplateRecord.exam_id,
+            ExamSession.id.label("session_id"),
+            ExamSession.started_at,
+        )
+        .join(ExamTemplateRecord, ExamTemplateRecord.id == VerificationCode.exam_template_id)
+        .outerjoin(ExamSession, ExamSession.verification_code_id == VerificationCode.id)
+        .where(VerificationCode.code.in_(codes))
+        .with_for_update(of=VerificationCode)
+    )
+    return list(result.all())
+
+
+async def mark_codes_completed(db: AsyncSession, code_ids: Sequence[uuid.UUID]) -> None:
+    """以單一 UPDATE 將多個驗證碼標記為已完成（不提交）。"""
+    if not code_ids:
+        return
+    await db.execute(
+        update(VerificationCode).where(VerificationCode.id.in_(code_ids)).values(status="completed")
+    )
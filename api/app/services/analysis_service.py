@@ -1,11 +1,18 @@
 """AI 分析服務：建構 prompt、呼叫 LLM、解析回應，產出弱點分析與強化建議。"""
 
 import json
+import time
 
+from app.core.metrics import counter, histogram
 from app.domain.analysis_models import AIAnalysis
 from app.domain.models import AssessmentResult, KnowledgePointCategory
 from app.services.llm_client import LLMClient
 
+_llm_requests = counter("llm_requests_total", "AI 分析的 LLM 呼叫次數（ok / invalid_response / error）", ("outcome",))
+_llm_duration = histogram(
+    "llm_request_duration_seconds", "LLM 呼叫耗時（秒）", buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+
 # 知識點前後置依賴對照表：key 的學習需要先具備 values 中的知識點
 KNOWLEDGE_POINT_DEPENDENCIES: dict[KnowledgePointCategory, list[KnowledgePointCategory]] = {
     KnowledgePointCategory.DECIMAL: [KnowledgePointCategory.INTEGER],
@@ -104,8 +111,18 @@ async def generate_ai_analysis(result: AssessmentResult, llm: LLMClient) -> AIAn
         Exception: LLM 呼叫本身的錯誤（網路、API key 等）
     """
     user_message = _build_user_message(result)
-    raw_response = await llm.generate(SYSTEM_PROMPT, user_message)
+    start = time.perf_counter()
+    try:
+        raw_response = await llm.generate(SYSTEM_PROMPT, user_message)
+    except Exception:
+        _llm_requests.labels("error").inc()
+        raise
+    finally:
+        _llm_duration.observe(time.perf_counter() - start)
     try:
-        return _parse_llm_response(raw_response)
+        analysis = _parse_llm_response(raw_response)
     except (json.JSONDecodeError, KeyError, ValueError) as e:
+        _llm_requests.labels("invalid_response").inc()
         raise ValueError(f"LLM 回應格式無效: {e}") from e
+    _llm_requests.labels("ok").inc()
+    return analysis
@@ -0,0 +1,148 @@
+"""測驗紀錄封存服務：將超過保留期限的 exam_sessions 匯出為壓縮檔並自主表移除。
+
+整個月份都早於截止日的月分區分批匯出後 DETACH + DROP，不需逐列刪除；
+預設分區中過期的零星資料則分批匯出、分批刪除。
+匯出格式為 gzip 壓縮的 JSON Lines，每列一筆 session。
+"""
+
+import gzip
+import json
+import os
+from collections.abc import Iterable
+from datetime import date, datetime, time, timezone
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.db.partitions import (
+    DEFAULT_PARTITION,
+    PARENT_TABLE,
+    add_months,
+    ensure_session_partitions,
+    list_month_partitions,
+)
+
+
+def _write_rows(fh, rows: Iterable) -> int:
+    """將資料列以 JSON Lines 寫入已開啟的檔案，回傳寫入筆數。"""
+    count = 0
+    for row in rows:
+        fh.write(json.dumps(dict(row._mapping), default=str, ensure_ascii=False).encode("utf-8"))
+        fh.write(b"\n")
+        count += 1
+    return count
+
+
+def _finalize(tmp_path: Path, final_path: Path) -> None:
+    """寫入完成後再改名，避免留下不完整的封存檔。"""
+    os.replace(tmp_path, final_path)
+
+
+async def archive_partition(
+    conn: AsyncConnection,
+    name: str,
+    output_dir: Path,
+    batch_size: int = 1000,
+) -> int:
+    """以 (started_at, id) keyset 分頁分批匯出整個月分區，成功後卸載並刪除該分區。
+
+    不使用 server-side cursor：asyncpg 的 portal 要到交易結束才釋放，
+    同一交易中的 DROP TABLE 會因分區仍被查詢使用而失敗。
+    """
+    final_path = output_dir / f"{name}.jsonl.gz"
+    tmp_path = final_path.with_suffix(".gz.tmp")
+
+    count = 0
+    after: tuple | None = None
+    with gzip.open(tmp_path, "wb") as fh:
+        while True:
+            where = "WHERE (started_at, id) > (:started_at, :id) " if after is not None else ""
+            params = {"limit": batch_size}
+            if after is not None:
+                params.update(started_at=after[0], id=after[1])
+            rows = (await conn.execute(
+                text(f'SELECT * FROM "{name}" {where}ORDER BY started_at, id LIMIT :limit'),
+                params,
+            )).all()
+            if not rows:
+                break
+            count += _write_rows(fh, rows)
+            after = (rows[-1].started_at, rows[-1].id)
+    _finalize(tmp_path, final_path)
+
+    await conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+    await conn.execute(text(f'DROP TABLE "{name}"'))
+    return count
+
+
+async def archive_default_partition(
+    conn: AsyncConnection,
+    before: datetime,
+    output_dir: Path,
+    batch_size: int = 1000,
+) -> int:
+    """分批匯出並刪除預設分區中早於 before 的資料，每批一次刪除。"""
+    final_path = output_dir / f"{DEFAULT_PARTITION}_{before:%Y%m%d}.jsonl.gz"
+    tmp_path = final_path.with_suffix(".gz.tmp")
+
+    count = 0
+    with gzip.open(tmp_path, "wb") as fh:
+        while True:
+            rows = (await conn.execute(
+                text(
+                    f"SELECT * FROM {DEFAULT_PARTITION} WHERE started_at < :before "
+                    f"ORDER BY started_at LIMIT :limit"
+                ),
+                {"before": before, "limit": batch_size},
+            )).all()
+            if not rows:
+                break
+            count += _write_rows(fh, rows)
+            await conn.execute(
+                text(f"DELETE FROM {DEFAULT_PARTITION} WHERE id = ANY(:ids) AND started_at < :before"),
+                {"ids": [r.id for r in rows], "before": before},
+            )
+
+    if count:
+        _finalize(tmp_path, final_path)
+    else:
+        tmp_path.unlink(missing_ok=True)
+    return count
+
+
+async def archive_sessions(
+    engine: AsyncEngine,
+    retention_days: int,
+    output_dir: Path,
+    batch_size: int = 1000,
+    today: date | None = None,
+) -> dict[str, int]:
+    """封存早於保留期限的所有 session，並預先建立未來月份分區。
+
+    每個分區各自一個交易：匯出檔寫完才會卸載分區，任一步失敗時該分區保持原狀。
+
+    Returns:
+        分區名稱 → 封存筆數
+    """
+    today = today or date.today()
+    cutoff = date.fromordinal(today.toordinal() - retention_days)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    async with engine.begin() as conn:
+        await ensure_session_partitions(conn, today=today)
+        partitions = await list_month_partitions(conn)
+
+    report: dict[str, int] = {}
+    for name, month in partitions:
+        # 只處理整個月份都早於截止日的分區
+        if add_months(month, 1) > cutoff:
+            continue
+        async with engine.begin() as conn:
+            report[name] = await archive_partition(conn, name, output_dir, batch_size)
+
+    async with engine.begin() as conn:
+        before = datetime.combine(cutoff, time.min, tzinfo=timezone.utc)
+        report[DEFAULT_PARTITION] = await archive_default_partition(conn, before, output_dir, batch_size)
+
+    return report
@@ -0,0 +1,163 @@
+"""作答暫存的延遲寫入：自動儲存先放在記憶體，每隔幾秒合併成一次批次 UPDATE 寫回 exam_sessions.answers。
+
+前端每隔數秒送出整份目前作答；同一個 session 在一個寫入週期內的多次儲存只保留最新一份，
+週期到時所有 session 以單一交易、一個 executemany UPDATE 寫入，每個 session 每週期至多寫一次。
+500 人的考試因此是每週期一個交易，而不是每次儲存一個交易。
+
+- UPDATE 以完整主鍵 (id, started_at) 定位，只掃描對應的月份分區；started_at 於 session
+  第一次自動儲存時查詢一次並快取。
+- 只更新仍在作答中（in_progress）的 session，交卷後不會被較晚的暫存寫回。
+- 作答附上伺服器收到的時間 saved_at，只有比資料庫中更新的暫存才寫入；
+  多 worker 各自有緩衝，寫入先後不一也不會以舊蓋新。
+- 寫入失敗時資料放回緩衝（不覆蓋期間收到的較新資料），下個週期重試；關閉時做最後一次寫入。
+代價是程序異常終止時最多遺失一個週期的暫存。
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import Float, bindparam, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import counter, histogram
+from app.db.models import ExamSession
+
+logger = logging.getLogger(__name__)
+
+_sessions = ExamSession.__table__
+_UPDATE_ANSWERS = (
+    update(_sessions)
+    .where(
+        _sessions.c.id == bindparam("b_id"),
+        _sessions.c.started_at == bindparam("b_started_at"),
+        _sessions.c.status == "in_progress",
+        or_(
+            _sessions.c.answers.is_(None),
+            _sessions.c.answers["saved_at"].astext.cast(Float) < bindparam("b_saved_at", type_=Float),
+        ),
+    )
+    .values(answers=bindparam("b_answers"))
+)
+
+_saves = counter("autosave_requests_total", "收到的自動儲存次數")
+_coalesced = counter("autosave_coalesced_total", "被同週期較新的儲存取代、不需寫入的次數")
+_flush_errors = counter("autosave_flush_errors_total", "寫入失敗的批次數")
+_batch_size = histogram(
+    "autosave_flush_sessions", "每次批次寫入的 session 數", buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+)
+_flush_duration = histogram("autosave_flush_duration_seconds", "每次批次寫入的時間（秒）")
+
+
+@dataclass(slots=True)
+class _Pending:
+    started_at: datetime
+    answers: dict
+
+
+class AutosaveBuffer:
+    """單一 worker 的作答暫存緩衝；於 lifespan 啟動與停止，存放在 app.state.autosave。"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        flush_seconds: float = 5.0,
+        max_known_sessions: int = 10_000,
+    ) -> None:
+        self._session_factory = session_factory
+        self._flush_seconds = flush_seconds
+        self._max_known = max_known_sessions
+        self._pending: dict[uuid.UUID, _Pending] = {}
+        self._started_at: OrderedDict[uuid.UUID, datetime] = OrderedDict()  # 作答中 session → 分區鍵
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def started_at(self, session_id: uuid.UUID) -> datetime | None:
+        """已確認作答中的 session 的 started_at；未快取時回傳 None，由呼叫端查詢後 remember()。"""
+        started_at = self._started_at.get(session_id)
+        if started_at is not None:
+            self._started_at.move_to_end(session_id)
+        return started_at
+
+    def remember(self, session_id: uuid.UUID, started_at: datetime) -> None:
+        self._started_at[session_id] = started_at
+        self._started_at.move_to_end(session_id)
+        while len(self._started_at) > self._max_known:
+            self._started_at.popitem(last=False)
+
+    def put(self, session_id: uuid.UUID, started_at: datetime, results: list[dict]) -> dict:
+        """暫存一份作答（取代同 session 尚未寫入的舊資料），回傳將寫入的內容。"""
+        _saves.inc()
+        answers = {"results": results, "saved_at": time.time()}
+        if self._pending.get(session_id) is not None:
+            _coalesced.inc()
+        self._pending[session_id] = _Pending(started_at, answers)
+        return answers
+
+    def get(self, session_id: uuid.UUID) -> dict | None:
+        """本 worker 尚未寫入的暫存。"""
+        pending = self._pending.get(session_id)
+        return pending.answers if pending is not None else None
+
+    def discard(self, session_id: uuid.UUID) -> None:
+        """交卷後丟棄該 session 的暫存與快取。"""
+        self._pending.pop(session_id, None)
+        self._started_at.pop(session_id, None)
+
+    async def flush(self) -> int:
+        """把目前緩衝一次寫入資料庫，回傳寫入的 session 數；失敗時資料放回緩衝。"""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        params = [
+            {
+                "b_id": session_id,
+                "b_started_at": pending.started_at,
+                "b_saved_at": pending.answers["saved_at"],
+                "b_answers": pending.answers,
+            }
+            for session_id, pending in batch.items()
+        ]
+        start = time.perf_counter()
+        try:
+            async with self._session_factory() as db:
+                await db.execute(_UPDATE_ANSWERS, params)
+                await db.commit()
+        except BaseException as e:
+            for session_id, pending in batch.items():
+                self._pending.setdefault(session_id, pending)
+            if not isinstance(e, Exception):
+                raise
+            _flush_errors.inc()
+            logger.exception("作答暫存寫入失敗（%d 筆），下個週期重試", len(batch))
+            return 0
+        _flush_duration.observe(time.perf_counter() - start)
+        _batch_size.observe(len(batch))
+        return len(batch)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止定期寫入，並寫入剩餘的暫存。"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_seconds)
+            await self.flush()
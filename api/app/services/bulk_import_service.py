@@ -0,0 +1,249 @@
+"""紙本成績批次匯入：解析 CSV / XLSX、逐列驗證、批次評分並以集合式語句寫入。
+
+檔案格式：第一列為標題，必須包含 verification_code、student_name，
+其餘欄位名稱為題號（例如 1-1、1-2，至少一欄），值為 0～1 的得分率，空白視為未作答（0 分）。
+標題以外的多餘資料格視為該列錯誤。整份檔案先完整驗證；有問題的資料列只會列入錯誤報告，不影響其他資料列寫入。
+"""
+
+import csv
+import io
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import PurePath
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import User
+from app.domain.compiled_template import CompiledTemplate
+from app.repositories.session_repo import bulk_save_scored_sessions
+from app.repositories.verification_repo import get_codes_for_scoring, mark_codes_completed
+
+CODE_COLUMN = "verification_code"
+NAME_COLUMN = "student_name"
+MAX_ROWS = 2000
+
+
+class BulkImportFileError(ValueError):
+    """整份檔案無法匯入（格式不支援、缺少必要欄位、未知題號等）。"""
+
+
+@dataclass(frozen=True)
+class Table:
+    """解析後的檔案：標題列與以標題為鍵的資料列（標題以外的多餘資料格放在鍵 None 之下）。"""
+
+    header: list[str]
+    rows: list[dict[str | None, Any]]
+
+
+class ParsedRow(BaseModel):
+    """通過格式驗證的一列成績。"""
+
+    row_number: int
+    verification_code: str
+    student_name: str
+    scores: list[float]
+
+
+class ImportRowError(BaseModel):
+    """無法匯入的一列及原因，row_number 對應檔案中的列號（標題為第 1 列）。"""
+
+    row_number: int
+    verification_code: str | None
+    error: str
+
+
+class BulkImportReport(BaseModel):
+    """批次匯入結果。"""
+
+    exam_id: str
+    created: int
+    updated: int
+    errors: list[ImportRowError]
+
+
+def read_table(filename: str, data: bytes) -> Table:
+    """依副檔名解析 CSV 或 XLSX。"""
+    suffix = PurePath(filename).suffix.lower()
+    if suffix == ".csv":
+        table = _read_csv(data)
+    elif suffix == ".xlsx":
+        table = _read_xlsx(data)
+    else:
+        raise BulkImportFileError("僅支援 .csv 或 .xlsx 檔案")
+    if len(table.rows) > MAX_ROWS:
+        raise BulkImportFileError(f"單次最多匯入 {MAX_ROWS} 列")
+    return table
+
+
+def _read_csv(data: bytes) -> Table:
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise BulkImportFileError("CSV 檔案須為 UTF-8 編碼") from e
+    reader = csv.DictReader(io.StringIO(text))  # 資料格多於標題時，多出的值以 list 放在鍵 None 之下
+    rows = list(reader)
+    return Table(header=[h.strip() for h in reader.fieldnames or []], rows=rows)
+
+
+def _read_xlsx(data: bytes) -> Table:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise BulkImportFileError("伺服器未安裝 openpyxl，無法讀取 XLSX，請改用 CSV") from e
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return Table(header=[], rows=[])
+        keys = ["" if h is None else str(h).strip() for h in header]
+        while keys and not keys[-1]:  # 工作表較寬時標題列尾端為空白儲存格
+            keys.pop()
+        table = Table(header=keys, rows=[])
+        for values in rows:
+            if all(v is None for v in values):
+                continue
+            row: dict[str | None, Any] = dict(zip(keys, values))
+            extra = [v for v in values[len(keys):] if v is not None]
+            if extra:
+                row[None] = extra
+            table.rows.append(row)
+        return table
+    finally:
+        workbook.close()
+
+
+def _parse_score(value: Any) -> float:
+    """解析單格得分率，空白為 0；超出 0～1 或無法轉換時拋出 ValueError。"""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return 0.0
+    score = float(value)
+    if not 0.0 <= score <= 1.0:
+        raise ValueError(f"得分率須介於 0～1：{value}")
+    return score
+
+
+def validate_rows(table: Table, compiled: CompiledTemplate) -> tuple[list[ParsedRow], list[ImportRowError]]:
+    """驗證全部資料列的格式，回傳 (有效資料列, 錯誤列)。
+
+    標題有空白或重複欄位、缺少必要欄位、沒有任何題號，或含有模板中不存在的題號時，
+    整份檔案拒絕（BulkImportFileError）。
+    """
+    header = table.header
+    blank = [str(i) for i, c in enumerate(header, start=1) if not c]
+    if blank:
+        raise BulkImportFileError(f"標題第 {', '.join(blank)} 欄空白")
+    duplicated = sorted({c for c in header if header.count(c) > 1})
+    if duplicated:
+        raise BulkImportFileError(f"標題欄位重複：{', '.join(duplicated)}")
+    missing = [c for c in (CODE_COLUMN, NAME_COLUMN) if c not in header]
+    if missing:
+        raise BulkImportFileError(f"缺少必要欄位：{', '.join(missing)}")
+    question_columns = [c for c in header if c not in (CODE_COLUMN, NAME_COLUMN)]
+    if not question_columns:
+        raise BulkImportFileError("沒有任何題號欄位")
+    unknown = [c for c in question_columns if c not in compiled.index]
+    if unknown:
+        raise BulkImportFileError(f"試卷 {compiled.exam_id} 中沒有題號：{', '.join(unknown)}")
+
+    valid: list[ParsedRow] = []
+    errors: list[ImportRowError] = []
+    seen: set[str] = set()
+    for row_number, row in enumerate(table.rows, start=2):
+        code = str(row.get(CODE_COLUMN) or "").strip()
+        name = str(row.get(NAME_COLUMN) or "").strip()
+        if row.get(None):
+            errors.append(
+                ImportRowError(row_number=row_number, verification_code=code or None, error="資料格數多於標題欄位")
+            )
+            continue
+        if not code:
+            errors.append(ImportRowError(row_number=row_number, verification_code=None, error="缺少驗證碼"))
+            continue
+        if not name:
+            errors.append(ImportRowError(row_number=row_number, verification_code=code, error="缺少學生姓名"))
+            continue
+        if code in seen:
+            errors.append(ImportRowError(row_number=row_number, verification_code=code, error="驗證碼在檔案中重複"))
+            continue
+
+        vector = [0.0] * len(compiled)
+        try:
+            for qid in question_columns:
+                vector[compiled.index[qid]] = _parse_score(row.get(qid))
+        except ValueError as e:
+            errors.append(ImportRowError(row_number=row_number, verification_code=code, error=f"題號 {qid}：{e}"))
+            continue
+
+        seen.add(code)
+        valid.append(ParsedRow(row_number=row_number, verification_code=code, student_name=name, scores=vector))
+    return valid, errors
+
+
+async def import_scores(
+    db: AsyncSession,
+    user: User,
+    compiled: CompiledTemplate,
+    table: Table,
+) -> BulkImportReport:
+    """驗證、批次評分並寫入整份成績。
+
+    資料庫往返固定為：一次查詢驗證碼（鎖定列）、一次批次 INSERT、一次批次 UPDATE、
+    一次更新驗證碼狀態，與學生人數無關。批次匯入不呼叫 AI 分析。
+    """
+    valid, errors = validate_rows(table, compiled)
+
+    found = {r.code: r for r in await get_codes_for_scoring(db, [p.verification_code for p in valid])}
+    accepted: list[tuple[ParsedRow, Any]] = []
+    for parsed in valid:
+        code_row = found.get(parsed.verification_code)
+        if code_row is None:
+            error = "驗證碼不存在"
+        elif code_row.teacher_id != user.id and user.role != "admin":
+            error = "無權操作此驗證碼"
+        elif code_row.exam_id != compiled.exam_id:
+            error = f"驗證碼屬於試卷 {code_row.exam_id}"
+        else:
+            accepted.append((parsed, code_row))
+            continue
+        errors.append(ImportRowError(row_number=parsed.row_number, verification_code=parsed.verification_code, error=error))
+
+    assessments = compiled.assess_batch([(p.student_name, p.scores) for p, _ in accepted])
+
+    now = datetime.now(timezone.utc)
+    new_sessions: list[dict[str, Any]] = []
+    updated_sessions: list[dict[str, Any]] = []
+    for (parsed, code_row), assessment in zip(accepted, assessments):
+        values = {
+            "student_name": parsed.student_name,
+            "scores": parsed.scores,
+            "answers": None,
+            "assessment": assessment.model_dump(),
+            "ai_analysis": None,
+            "status": "completed",
+            "completed_at": now,
+        }
+        if code_row.session_id is None:
+            new_sessions.append({
+                "id": uuid.uuid4(),
+                "verification_code_id": code_row.id,
+                "exam_id": compiled.exam_id,
+                **values,
+            })
+        else:
+            updated_sessions.append({"id": code_row.session_id, "started_at": code_row.started_at, **values})
+
+    await bulk_save_scored_sessions(db, new_sessions, updated_sessions)
+    await mark_codes_completed(db, [code_row.id for _, code_row in accepted])
+    await db.commit()
+
+    return BulkImportReport(
+        exam_id=compiled.exam_id,
+        created=len(new_sessions),
+        updated=len(updated_sessions),
+        errors=sorted(errors, key=lambda e: e.row_number),
+    )
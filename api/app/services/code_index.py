@@ -0,0 +1,143 @@
+"""驗證碼存在性索引：在查詢資料庫前先排除不存在的驗證碼。
+
+驗證碼格式固定為 {prefix}{001~999}，因此以「前綴 → 999 位元的 bitmap」
+精確記錄所有已建立的驗證碼（每個前綴約 125 bytes，沒有 Bloom filter 的誤判）。
+LISTEN 建立（含重新連線）後從資料庫重建；create_codes 寫入後本地更新並經 LISTEN/NOTIFY 通知其他 worker。
+索引尚未建立完成時一律放行，由資料庫判斷。驗證碼不會被刪除，因此索引只增不減。
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import counter, gauge
+from app.db.models import VerificationCode
+
+logger = logging.getLogger(__name__)
+
+NUMBER_DIGITS = 3
+
+_rejected = counter("code_index_rejected_total", "未查詢資料庫即判定不存在的驗證碼數")
+_prefixes = gauge("code_index_prefixes", "驗證碼索引中的前綴數")
+
+
+def split_code(code: str) -> tuple[str, int] | None:
+    """拆成 (前綴, 編號)；不符合 {prefix}{001~999} 格式時回傳 None。"""
+    prefix, digits = code[:-NUMBER_DIGITS], code[-NUMBER_DIGITS:]
+    if not prefix or not digits.isdigit() or not digits.isascii():
+        return None
+    number = int(digits)
+    return (prefix, number) if number >= 1 else None
+
+
+def encode_ranges(codes: Iterable[str]) -> str:
+    """將驗證碼壓縮為 NOTIFY payload，例如 "APEX5A:1-30;APEX5B:5-5"（payload 上限 8000 bytes）。"""
+    by_prefix: dict[str, list[int]] = {}
+    for code in codes:
+        parts = split_code(code)
+        if parts is not None:
+            by_prefix.setdefault(parts[0], []).append(parts[1])
+
+    ranges = []
+    for prefix, numbers in by_prefix.items():
+        numbers.sort()
+        start = prev = numbers[0]
+        for n in numbers[1:] + [None]:
+            if n is not None and n == prev + 1:
+                prev = n
+                continue
+            ranges.append(f"{prefix}:{start}-{prev}")
+            if n is not None:
+                start = prev = n
+    return ";".join(ranges)
+
+
+def decode_ranges(payload: str) -> list[str]:
+    """encode_ranges 的反向操作。"""
+    codes = []
+    for part in filter(None, payload.split(";")):
+        prefix, _, span = part.rpartition(":")
+        start, _, end = span.partition("-")
+        codes.extend(f"{prefix}{n:0{NUMBER_DIGITS}d}" for n in range(int(start), int(end) + 1))
+    return codes
+
+
+class CodeIndex:
+    """前綴 bitmap 索引。ready 之前 might_exist() 一律回傳 True。"""
+
+    def __init__(self) -> None:
+        self._bitmaps: dict[str, int] = {}
+        self._others: set[str] = set()  # 不符合標準格式的舊驗證碼
+        self._pending: list[list[str]] = []  # 進行中的每次重建各一份：重建期間的新增，重建完成後補上
+        self.ready = False
+
+    def _add(self, code: str) -> None:
+        parts = split_code(code)
+        if parts is None:
+            self._others.add(code)
+        else:
+            prefix, number = parts
+            self._bitmaps[prefix] = self._bitmaps.get(prefix, 0) | (1 << number)
+
+    def add_many(self, codes: Iterable[str]) -> None:
+        """加入新建立的驗證碼。"""
+        for code in codes:
+            self._add(code)
+            for pending in self._pending:
+                pending.append(code)
+        _prefixes.set(len(self._bitmaps))
+
+    def might_exist(self, code: str) -> bool:
+        """驗證碼可能存在時回傳 True（交由資料庫確認）；確定不存在時回傳 False。"""
+        if not self.ready:
+            return True
+        parts = split_code(code)
+        if parts is None:
+            found = code in self._others
+        else:
+            found = bool(self._bitmaps.get(parts[0], 0) >> parts[1] & 1)
+        if not found:
+            _rejected.inc()
+        return found
+
+    async def rebuild(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """從資料庫（主庫，避免副本落後）重建索引。
+
+        重建可能重疊（例如 LISTEN 斷線重連），每次重建各自收集期間的新增，互不清除。
+        """
+        pending: list[str] = []
+        self._pending.append(pending)
+        try:
+            fresh = CodeIndex()
+            async with session_factory() as db:
+                result = await db.stream_scalars(
+                    select(VerificationCode.code).execution_options(yield_per=5000)
+                )
+                async for code in result:
+                    fresh._add(code)
+            for code in pending:
+                fresh._add(code)
+            self._bitmaps, self._others = fresh._bitmaps, fresh._others
+            self.ready = True
+            _prefixes.set(len(self._bitmaps))
+        finally:
+            self._pending = [p for p in self._pending if p is not pending]
+
+    def on_notify(self, payload: str | None, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """LISTEN 處理函式：payload 為新增的驗證碼範圍；None 表示可能漏收，重新載入。"""
+        if payload is not None:
+            self.add_many(decode_ranges(payload))
+            return
+        task = asyncio.get_running_loop().create_task(self.rebuild(session_factory))
+        task.add_done_callback(_log_rebuild_failure)
+
+
+def _log_rebuild_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("驗證碼索引重建失敗", exc_info=task.exception())
+
+
+code_index = CodeIndex()
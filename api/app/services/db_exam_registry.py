@@ -0,0 +1,156 @@
+"""以資料庫為準的 ExamRegistry：按需載入 exam_templates，並依內容雜湊快取編譯結果。
+
+- resolve() 首次查詢某份試卷時才從主庫載入、解析並編譯，之後直接使用記憶體快取。
+- 內容雜湊為 md5(template_data::text)；JSONB 的文字表示是正規化的，
+  內容相同時雜湊必定相同，重新載入時可沿用已編譯的模板。
+- 試卷新增或修改時，寫入端發出 EXAM_CHANNEL 通知，各 worker 移除該試卷的快取；
+  另有定期版本輪詢作為漏收通知時的保險。
+"""
+
+import asyncio
+import logging
+from collections.abc import Sequence
+
+from sqlalchemy import Row, Text, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.metrics import counter
+from app.db.models import ExamTemplateRecord
+from app.domain.compiled_template import CompiledTemplate
+from app.domain.exam_registry import ExamRegistry
+from app.domain.models import ExamTemplate
+
+logger = logging.getLogger(__name__)
+
+_loads = counter("exam_registry_loads_total", "從資料庫載入試卷模板的次數")
+_compiles = counter("exam_registry_compiles_total", "試卷模板解析與編譯次數")
+_invalidations = counter("exam_registry_invalidations_total", "試卷模板快取失效次數")
+
+_content_hash = func.md5(cast(ExamTemplateRecord.template_data, Text))
+
+
+class DbExamRegistry(ExamRegistry):
+    """資料庫版測驗卷註冊表。父類別的 _templates / _compiled 即為目前已載入的快取。"""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], poll_seconds: float = 60) -> None:
+        super().__init__()
+        self._session_factory = session_factory
+        self._poll_seconds = poll_seconds
+        self._hashes: dict[str, str] = {}  # exam_id → 目前快取內容的雜湊
+        self._by_hash: dict[str, CompiledTemplate] = {}
+        self._generations: dict[str, int] = {}  # 每次失效遞增，避免載入途中的舊資料寫回快取
+        self._loading: dict[str, asyncio.Future] = {}
+        self._poll_task: asyncio.Task | None = None
+
+    async def resolve(self, exam_id: str) -> CompiledTemplate | None:
+        """取得編譯後的模板，未快取時從資料庫載入；同一試卷同時只會有一個載入查詢。"""
+        compiled = self._compiled.get(exam_id)
+        if compiled is not None:
+            return compiled
+
+        future = self._loading.get(exam_id)
+        if future is None:
+            generation = self._generations.get(exam_id, 0)
+            future = self._loading[exam_id] = asyncio.ensure_future(self._load(exam_id, generation))
+            future.add_done_callback(lambda f: self._forget_load(exam_id, f))
+        return await asyncio.shield(future)
+
+    def _forget_load(self, exam_id: str, future: asyncio.Future) -> None:
+        if self._loading.get(exam_id) is future:
+            del self._loading[exam_id]
+
+    async def list_active_ids(self) -> list[str]:
+        """列出資料庫中啟用的試卷 ID。"""
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(ExamTemplateRecord.exam_id)
+                .where(ExamTemplateRecord.is_active.is_(True))
+                .order_by(ExamTemplateRecord.created_at)
+            )
+            return list(result.scalars().all())
+
+    async def _fetch(self, exam_id: str) -> Row | None:
+        """查詢單一試卷的 (template_data, compiled, content_hash)。不限 is_active：停用的試卷仍需評分既有紀錄。"""
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(
+                    ExamTemplateRecord.template_data,
+                    ExamTemplateRecord.compiled,
+                    _content_hash.label("content_hash"),
+                )
+                .where(ExamTemplateRecord.exam_id == exam_id)
+            )
+            return result.first()
+
+    async def _fetch_versions(self) -> Sequence[Row]:
+        """查詢所有試卷的 (exam_id, content_hash)，供版本輪詢比對。"""
+        async with self._session_factory() as db:
+            result = await db.execute(select(ExamTemplateRecord.exam_id, _content_hash.label("content_hash")))
+            return result.all()
+
+    async def _load(self, exam_id: str, generation: int) -> CompiledTemplate | None:
+        row = await self._fetch(exam_id)
+        _loads.inc()
+        if row is None:
+            return None
+
+        compiled = self._by_hash.get(row.content_hash)
+        if compiled is None:
+            # 上傳時已預先編譯的模板直接還原權重；舊資料（compiled 為空）才在此編譯
+            compiled = CompiledTemplate(ExamTemplate.model_validate(row.template_data), row.compiled)
+            if row.compiled is None:
+                _compiles.inc()
+
+        # 載入期間收到失效通知：結果仍回傳給本次呼叫，但不寫入快取
+        if self._generations.get(exam_id, 0) == generation:
+            self._templates[exam_id] = compiled.template
+            self._compiled[exam_id] = compiled
+            self._hashes[exam_id] = row.content_hash
+            self._by_hash[row.content_hash] = compiled
+            self._prune()
+        return compiled
+
+    def _prune(self) -> None:
+        """丟棄已不屬於任何試卷的編譯結果。"""
+        live = set(self._hashes.values())
+        for content_hash in [h for h in self._by_hash if h not in live]:
+            del self._by_hash[content_hash]
+
+    def invalidate(self, exam_id: str | None = None) -> None:
+        """移除試卷快取；exam_id 為 None 時全部移除。編譯結果依雜湊保留，內容未變時不會重新編譯。"""
+        _invalidations.inc()
+        exam_ids = list(self._generations.keys() | self._compiled.keys()) if exam_id is None else [exam_id]
+        for eid in exam_ids:
+            self._generations[eid] = self._generations.get(eid, 0) + 1
+            self._templates.pop(eid, None)
+            self._compiled.pop(eid, None)
+            self._hashes.pop(eid, None)
+            self._loading.pop(eid, None)  # 進行中的載入可能讀到舊版本，後續請求改為重新載入
+
+    async def check_versions(self) -> None:
+        """比對資料庫中的內容雜湊，移除已變更或已刪除的試卷快取。"""
+        current = {row.exam_id: row.content_hash for row in await self._fetch_versions()}
+        for exam_id, content_hash in list(self._hashes.items()):
+            if current.get(exam_id) != content_hash:
+                self.invalidate(exam_id)
+
+    async def start_polling(self) -> None:
+        if self._poll_seconds > 0 and self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop_polling(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_seconds)
+            try:
+                await self.check_versions()
+            except Exception:
+                logger.exception("試卷版本輪詢失敗")
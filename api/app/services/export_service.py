@@ -0,0 +1,111 @@
+"""成績匯出服務：將測驗紀錄逐批轉為 CSV 或 Parquet 位元組串流。
+
+輸入為分批產出的資料列（來自 server-side cursor），輸出為可直接交給
+StreamingResponse 的 async iterator；任何時刻只保留一批資料在記憶體中。
+評估結果中的 10 個知識點與 4 個數學素養分數會攤平為獨立欄位。
+"""
+
+import csv
+import io
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from app.domain.models import KnowledgePointCategory, MathLiteracyDimension
+
+BASE_COLUMNS = ["session_id", "code", "student_name", "exam_id", "status", "started_at", "completed_at"]
+KNOWLEDGE_POINT_COLUMNS = [c.value for c in KnowledgePointCategory]
+LITERACY_COLUMNS = [d.value for d in MathLiteracyDimension]
+EXPORT_COLUMNS = BASE_COLUMNS + KNOWLEDGE_POINT_COLUMNS + LITERACY_COLUMNS
+
+
+def flatten_row(row: Any) -> list[Any]:
+    """將一筆 (session, code, assessment) 資料列攤平為 EXPORT_COLUMNS 順序的值。"""
+    assessment = row.assessment or {}
+    kp_scores = {s["category"]: s["score"] for s in assessment.get("knowledge_point_scores", [])}
+    ml_scores = {s["dimension"]: s["score"] for s in assessment.get("math_literacy_scores", [])}
+    return [
+        str(row.session_id),
+        row.code,
+        row.student_name,
+        row.exam_id,
+        row.status,
+        row.started_at,
+        row.completed_at,
+        *(kp_scores.get(c) for c in KNOWLEDGE_POINT_COLUMNS),
+        *(ml_scores.get(d) for d in LITERACY_COLUMNS),
+    ]
+
+
+async def iter_csv(batches: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """逐批產出 CSV 位元組。開頭加上 UTF-8 BOM，讓 Excel 正確辨識中文欄位。"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow(["" if v is None else v for v in flatten_row(row)])
+        yield buffer.getvalue().encode("utf-8")
+
+
+def parquet_available() -> bool:
+    """是否已安裝 Parquet 匯出所需的 pyarrow（選用依賴）。"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ChunkSink:
+    """ParquetWriter 的輸出端：累計寫入位置，但每次取出後即清空緩衝。"""
+
+    def __init__(self) -> None:
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        n = self._buffer.write(data)
+        self._position += n
+        return n
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+async def iter_parquet(batches: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """每批資料寫成一個 Parquet row group，寫完即送出，記憶體用量與總筆數無關。"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [(name, pa.string()) for name in BASE_COLUMNS[:5]]
+        + [("started_at", pa.timestamp("us", tz="UTC")), ("completed_at", pa.timestamp("us", tz="UTC"))]
+        + [(name, pa.float64()) for name in KNOWLEDGE_POINT_COLUMNS + LITERACY_COLUMNS]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for rows in batches:
+            columns = list(zip(*(flatten_row(r) for r in rows)))
+            writer.write_table(pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, schema)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
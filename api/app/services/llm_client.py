@@ -1,8 +1,13 @@
-"""LLM 客戶端抽象介面與 OpenAI 實作。"""
+"""LLM 客戶端抽象介面與 OpenAI 實作。
 
-from typing import Protocol, runtime_checkable
+openai SDK 匯入約需 0.5 秒（大量 pydantic 型別），延後到第一次呼叫 generate() 才載入，
+避免拖慢冷啟動；未使用 AI 分析的程序完全不會載入。
+"""
 
-from openai import AsyncOpenAI
+from typing import TYPE_CHECKING, Protocol, runtime_checkable
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 @runtime_checkable
@@ -16,12 +21,21 @@ class OpenAIClient:
     """使用 OpenAI API 的 LLM 客戶端實作。"""
 
     def __init__(self, api_key: str, model: str = "gpt-4o-mini", temperature: float = 0.3):
-        self._client = AsyncOpenAI(api_key=api_key)
+        self._api_key = api_key
+        self._client: "AsyncOpenAI | None" = None
         self._model = model
         self._temperature = temperature
 
+    @property
+    def client(self) -> "AsyncOpenAI":
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(api_key=self._api_key)
+        return self._client
+
     async def generate(self, system_prompt: str, user_message: str) -> str:
-        response = await self._client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model=self._model,
             temperature=self._temperature,
             messages=[
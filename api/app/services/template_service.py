@@ -0,0 +1,105 @@
+"""試卷模板上傳：解析 JSON / YAML、結構檢查、預先編譯並寫入新版本。
+
+上傳時就完成驗證與編譯，registry 載入時直接還原 compiled 欄位，
+不需在第一個請求時才解析權重；模板數量再多也不影響啟動時間（registry 按需載入）。
+"""
+
+import json
+import uuid
+from pathlib import PurePath
+from typing import Any
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ExamTemplateRecord, ExamTemplateVersion
+from app.db.notify import EXAM_CHANNEL, publish
+from app.domain.compiled_template import CompiledTemplate
+from app.domain.models import ExamTemplate
+from app.domain.template_validation import check_compatible, check_template
+from app.repositories.template_repo import exam_has_sessions, get_template_by_exam_id, insert_template_if_absent
+
+
+class TemplateValidationError(ValueError):
+    """模板無法使用，errors 為所有問題的清單。"""
+
+    def __init__(self, errors: list[str]) -> None:
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def parse_template_file(filename: str, data: bytes) -> Any:
+    """依副檔名解析 .json 或 .yaml / .yml。"""
+    suffix = PurePath(filename).suffix.lower()
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise TemplateValidationError(["檔案須為 UTF-8 編碼"]) from e
+
+    if suffix == ".json":
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            raise TemplateValidationError([f"JSON 格式錯誤：第 {e.lineno} 行 {e.msg}"]) from e
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise TemplateValidationError(["伺服器未安裝 PyYAML，無法讀取 YAML，請改用 JSON"]) from e
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise TemplateValidationError([f"YAML 格式錯誤：{e}"]) from e
+    raise TemplateValidationError(["僅支援 .json、.yaml 或 .yml 檔案"])
+
+
+def build_template(raw: Any) -> tuple[ExamTemplate, CompiledTemplate, list[str]]:
+    """驗證並編譯模板，回傳 (模板, 編譯結果, 警告)；有錯誤時拋出 TemplateValidationError。"""
+    try:
+        template = ExamTemplate.model_validate(raw)
+    except ValidationError as e:
+        raise TemplateValidationError(
+            [f"{'.'.join(str(p) for p in err['loc']) or '(root)'}: {err['msg']}" for err in e.errors()]
+        ) from e
+
+    errors, warnings = check_template(template)
+    if errors:
+        raise TemplateValidationError(errors)
+    return template, CompiledTemplate(template), warnings
+
+
+async def save_template(
+    db: AsyncSession,
+    template: ExamTemplate,
+    compiled: CompiledTemplate,
+    created_by: uuid.UUID | None,
+) -> ExamTemplateRecord:
+    """新增試卷或寫入新版本並提交；已有作答紀錄的試卷不可變更題號順序。
+
+    新試卷先以 ON CONFLICT DO NOTHING 建立第 0 版再鎖定讀回，之後與既有試卷同樣遞增版本：
+    同時首次上傳同一試卷時，後到者等先到者提交後寫入下一個版本，而不是違反唯一約束。
+    """
+    data = template.model_dump(mode="json")
+    record = await get_template_by_exam_id(db, template.exam_id, for_update=True)
+    if record is None:
+        await insert_template_if_absent(db, template.exam_id, template.name, data)
+        record = await get_template_by_exam_id(db, template.exam_id, for_update=True)
+    if record.version > 0 and await exam_has_sessions(db, template.exam_id):
+        errors = check_compatible(ExamTemplate.model_validate(record.template_data), template)
+        if errors:
+            raise TemplateValidationError(errors)
+    record.name = template.name
+    record.template_data = data
+    record.version += 1
+    record.compiled = compiled.to_dict()
+    await db.flush()
+
+    db.add(ExamTemplateVersion(
+        exam_template_id=record.id,
+        version=record.version,
+        template_data=data,
+        created_by=created_by,
+    ))
+    await publish(db, EXAM_CHANNEL, template.exam_id)
+    await db.commit()
+    return record
@@ -0,0 +1,406 @@
+"""開課壓力測試：模擬 N 個班級、每班 M 位學生同時開始並在時限結束前交卷。
+
+每位模擬學生依序執行：
+    POST /api/auth/verify-code → GET /api/student/exam/{id}
+    →（適性試卷）POST /api/student/exam/{id}/next 直到結束
+    → 作答期間每 --autosave-seconds 秒 PUT /api/student/exam/{id}/autosave（與前端相同，只送有變動的作答）
+    → POST /api/student/exam/{id}/submit → GET /api/student/result/{id}
+步驟之間有擬真的思考時間：班級開始後於 --arrival-seconds 內陸續輸入驗證碼、先閱讀題目，
+作答時間集中在時限的後段（多數學生在最後幾分鐘交卷，即尖峰）。--time-scale 可等比縮短所有等待。
+
+報表列出每個步驟的請求數、錯誤率（非 2xx 或連線失敗）、p50 / p95 / p99 延遲與錯誤狀態碼分布。
+伺服器忙碌（503 / 429 帶 Retry-After，見 app.core.admission）時比照前端，依秒數加上隨機抖動後重試，
+延遲計入等待時間（即學生感受到的交卷時間），重試次數另列為 busy_retries。
+
+目標環境：docker-compose.yml 的 PostgreSQL 與 LLM 替身（benchmarks.stub_llm）。
+--spawn 會啟動 LLM 替身與 uvicorn（OPENAI_BASE_URL 指向替身），PostgreSQL 需事先啟動；
+未指定時對 --base-url 上已在執行的 API 施壓（要經過 AI 分析，需以相同環境變數啟動該 API）。
+
+前置作業（於 repo 根目錄與 api/ 目錄）:
+    docker compose up -d postgres
+    python -m app.jobs.migrate_and_seed
+
+用法（於 api/ 目錄）:
+    python -m benchmarks.class_start --spawn --classes 4 --students 30 --time-scale 0.05
+    python -m benchmarks.class_start --base-url http://127.0.0.1:8000 --classes 10 --students 50 --json out.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import secrets
+import string
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from app.core.config import settings
+
+API_DIR = Path(__file__).resolve().parents[1]
+
+STEPS = ("verify_code", "get_exam", "next", "autosave", "submit", "get_result")
+
+
+@dataclass
+class StepStats:
+    latencies: list[float] = field(default_factory=list)  # 秒，含失敗的請求
+    errors: Counter = field(default_factory=Counter)  # 狀態碼或例外名稱 → 次數
+    busy_retries: int = 0  # 因 503 / 429 + Retry-After 而重試的次數
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.errors.values())
+
+
+def percentile(values: list[float], p: float) -> float:
+    """最近序位法百分位數（p 介於 0～100）；空串列回傳 NaN。"""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+MAX_BUSY_RETRIES = 5  # 與前端 web/src/api/index.js 相同
+
+
+def _busy_delay(resp: httpx.Response) -> float | None:
+    """伺服器忙碌時回傳重試前的等待秒數（Retry-After 到兩倍之間隨機），否則回傳 None。
+
+    Retry-After 是伺服器實際的消化時間，不乘 --time-scale。
+    """
+    if resp.status_code not in (503, 429):
+        return None
+    try:
+        seconds = min(max(float(resp.headers["Retry-After"]), 1.0), 30.0)
+    except (KeyError, ValueError):
+        return None
+    return seconds * random.uniform(1, 2)
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.steps: dict[str, StepStats] = defaultdict(StepStats)
+
+    async def request(self, client: httpx.AsyncClient, step: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        """送出請求並記錄延遲；非 2xx 或連線失敗記為錯誤，連線失敗時回傳 None。"""
+        stats = self.steps[step]
+        start = time.perf_counter()
+        for attempt in range(MAX_BUSY_RETRIES + 1):
+            try:
+                resp = await client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                stats.latencies.append(time.perf_counter() - start)
+                stats.errors[type(e).__name__] += 1
+                return None
+            delay = _busy_delay(resp)
+            if delay is None or attempt == MAX_BUSY_RETRIES:
+                break
+            stats.busy_retries += 1
+            await asyncio.sleep(delay)
+        stats.latencies.append(time.perf_counter() - start)
+        if not resp.is_success:
+            stats.errors[str(resp.status_code)] += 1
+        return resp
+
+    def summary(self) -> dict[str, dict]:
+        result = {}
+        for step in STEPS:
+            stats = self.steps.get(step)
+            if stats is None or not stats.count:
+                continue
+            result[step] = {
+                "requests": stats.count,
+                "errors": stats.error_count,
+                "error_rate": stats.error_count / stats.count,
+                "p50_ms": percentile(stats.latencies, 50) * 1000,
+                "p95_ms": percentile(stats.latencies, 95) * 1000,
+                "p99_ms": percentile(stats.latencies, 99) * 1000,
+                "max_ms": max(stats.latencies) * 1000,
+                "error_codes": dict(stats.errors),
+                "busy_retries": stats.busy_retries,
+            }
+        return result
+
+
+@dataclass
+class Profile:
+    """思考時間模型（秒，未乘 time_scale）。"""
+
+    arrival_seconds: float  # 班級開始後，學生於此區間內陸續輸入驗證碼
+    read_seconds: float  # 取得題目前的閱讀 / 準備時間中位數
+    exam_seconds: float  # 作答時限
+    result_delay_seconds: float  # 交卷後查看結果前的停頓上限
+    autosave_seconds: float  # 作答期間自動暫存的間隔，0 表示不暫存
+    time_scale: float
+
+    def sleep(self, seconds: float):
+        return asyncio.sleep(max(seconds, 0.0) * self.time_scale)
+
+    def elapsed(self, since: float) -> float:
+        """自 since（perf_counter）起經過的模擬秒數。"""
+        return (time.perf_counter() - since) / self.time_scale if self.time_scale else 0.0
+
+
+async def _autosave(client: httpx.AsyncClient, recorder: Recorder, session_id: str, headers: dict, results: list[dict]) -> None:
+    await recorder.request(
+        client, "autosave", "PUT", f"/api/student/exam/{session_id}/autosave",
+        json={"results": results}, headers=headers,
+    )
+
+
+def _answers(template: dict, rng: random.Random, ability: float) -> list[dict]:
+    """依學生程度產生作答：每題以 ability 的機率答對（部分題目給部分分數）。"""
+    results = []
+    for section in template["sections"]:
+        for question in section["questions"]:
+            roll = rng.random()
+            score = 1.0 if roll < ability else (0.5 if roll < ability + 0.1 else 0.0)
+            results.append({"question_id": question["question_id"], "score": score})
+    return results
+
+
+async def _student(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    profile: Profile,
+    code: str,
+    name: str,
+    rng: random.Random,
+) -> None:
+    class_start = time.perf_counter()
+    await profile.sleep(rng.uniform(0, profile.arrival_seconds))
+
+    resp = await recorder.request(
+        client, "verify_code", "POST", "/api/auth/verify-code", json={"code": code, "student_name": name}
+    )
+    if resp is None or not resp.is_success:
+        return
+    login = resp.json()
+    session_id = login["session_id"]
+    headers = {"Authorization": f"Bearer {login['access_token']}"}
+
+    await profile.sleep(rng.lognormvariate(math.log(profile.read_seconds), 0.5))
+    resp = await recorder.request(client, "get_exam", "GET", f"/api/student/exam/{session_id}", headers=headers)
+    if resp is None or not resp.is_success:
+        return
+    template = resp.json()["template"]
+    ability = rng.betavariate(5, 3)
+
+    if template.get("adaptive"):
+        # 適性試卷：逐題向伺服器要下一題，每題作答時間約為時限平均分配到題庫的一半
+        bank_size = sum(len(s["questions"]) for s in template["sections"])
+        per_item = profile.exam_seconds / max(bank_size, 1) * 0.5
+        results: list[dict] = []
+        last_save = time.perf_counter()
+        while True:
+            resp = await recorder.request(
+                client, "next", "POST", f"/api/student/exam/{session_id}/next",
+                json={"results": results}, headers=headers,
+            )
+            if resp is None or not resp.is_success:
+                return
+            nxt = resp.json()
+            if nxt["done"]:
+                break
+            await profile.sleep(rng.uniform(0.5, 1.5) * per_item)
+            results.append({"question_id": nxt["question_id"], "score": float(rng.random() < ability)})
+            if profile.autosave_seconds and profile.elapsed(last_save) >= profile.autosave_seconds:
+                await _autosave(client, recorder, session_id, headers, results)
+                last_save = time.perf_counter()
+    else:
+        results = _answers(template, rng, ability)
+
+    # 多數學生用到時限後段才交卷：交卷時間集中在時限前，形成尖峰
+    finish_at = profile.exam_seconds * rng.triangular(0.6, 1.0, 1.0)
+    if profile.autosave_seconds and not template.get("adaptive"):
+        # 一般試卷：作答進度隨時間線性增加，每個間隔暫存一次目前已作答的部分
+        answer_start = profile.elapsed(class_start)
+        saves = max(int((finish_at - answer_start) // profile.autosave_seconds), 0)
+        for k in range(1, saves + 1):
+            await profile.sleep(answer_start + k * profile.autosave_seconds - profile.elapsed(class_start))
+            answered = math.ceil(len(results) * k / (saves + 1))
+            await _autosave(client, recorder, session_id, headers, results[:answered])
+    await profile.sleep(finish_at - profile.elapsed(class_start))
+    resp = await recorder.request(
+        client, "submit", "POST", f"/api/student/exam/{session_id}/submit",
+        json={"results": results}, headers={**headers, "Idempotency-Key": secrets.token_hex(16)},
+    )
+    if resp is None or not resp.is_success:
+        return
+
+    await profile.sleep(rng.uniform(1, profile.result_delay_seconds))
+    await recorder.request(client, "get_result", "GET", f"/api/student/result/{session_id}", headers=headers)
+
+
+async def _generate_codes(client: httpx.AsyncClient, args: argparse.Namespace) -> list[list[str]]:
+    """以管理者帳號為每個班級產生一批新驗證碼（前綴每次執行隨機，不與既有資料衝突）。"""
+    resp = await client.post(
+        "/api/auth/login", json={"username": args.admin_username, "password": args.admin_password}
+    )
+    resp.raise_for_status()
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    run_tag = "".join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(4))
+    classes = []
+    for c in range(args.classes):
+        resp = await client.post(
+            "/api/teacher/codes/generate",
+            json={"exam_id": args.exam_id, "prefix": f"LT{run_tag}{c:02d}", "count": args.students},
+            headers=headers,
+        )
+        resp.raise_for_status()
+        classes.append([row["code"] for row in resp.json()])
+    return classes
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    profile = Profile(
+        arrival_seconds=args.arrival_seconds,
+        read_seconds=args.read_seconds,
+        exam_seconds=args.exam_seconds,
+        result_delay_seconds=args.result_delay_seconds,
+        autosave_seconds=args.autosave_seconds,
+        time_scale=args.time_scale,
+    )
+    total = args.classes * args.students
+    connections = args.max_connections or total
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    timeout = httpx.Timeout(args.request_timeout)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        classes = await _generate_codes(client, args)
+        recorder = Recorder()
+
+        async def class_run(index: int, codes: list[str]) -> None:
+            await profile.sleep(index * args.class_stagger)
+            await asyncio.gather(*(
+                _student(client, recorder, profile, code, f"壓測{index:02d}-{i:03d}", random.Random(rng.random()))
+                for i, code in enumerate(codes)
+            ))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(class_run(i, codes) for i, codes in enumerate(classes)))
+        wall = time.perf_counter() - start
+
+    return {
+        "classes": args.classes,
+        "students_per_class": args.students,
+        "time_scale": args.time_scale,
+        "wall_seconds": wall,
+        "steps": recorder.summary(),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['classes']} 班 × {report['students_per_class']} 人，"
+        f"time_scale={report['time_scale']}，耗時 {report['wall_seconds']:.1f}s"
+    )
+    print(f"{'step':<12}{'requests':>9}{'errors':>8}{'err%':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'busy':>6}  codes")
+    for step, s in report["steps"].items():
+        codes = ", ".join(f"{k}×{v}" for k, v in sorted(s["error_codes"].items()))
+        print(
+            f"{step:<12}{s['requests']:>9}{s['errors']:>8}{s['error_rate']:>7.1%}"
+            f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}{s['busy_retries']:>6}  {codes}"
+        )
+
+
+def _wait_ready(name: str, url: str, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{name} 提前結束（exit code {proc.returncode}）")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    raise TimeoutError(f"{timeout}s 內 {url} 未就緒")
+
+
+@contextmanager
+def spawned_servers(args: argparse.Namespace):
+    """啟動 LLM 替身與指向它的 uvicorn；結束時一併關閉。"""
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_llm", "--port", str(args.llm_port),
+         "--latency-ms", str(args.llm_latency_ms), "--failure-rate", str(args.llm_failure_rate)],
+        cwd=API_DIR,
+    )
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "DB_STARTUP_MODE": "verify",
+    }
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.api_port), "--log-level", "warning"],
+        cwd=API_DIR,
+        env=env,
+    )
+    try:
+        _wait_ready("LLM 替身", f"http://127.0.0.1:{args.llm_port}/", stub, 30)
+        _wait_ready("API", f"http://127.0.0.1:{args.api_port}/", api, 60)
+        args.base_url = f"http://127.0.0.1:{args.api_port}"
+        yield
+    finally:
+        for proc in (api, stub):
+            proc.terminate()
+            proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="開課尖峰壓力測試（學生作答流程）")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--classes", type=int, default=4)
+    parser.add_argument("--students", type=int, default=30, help="每班人數（1～999）")
+    parser.add_argument("--exam-id", default="grade5_entrance")
+    parser.add_argument("--admin-username", default=settings.admin_username)
+    parser.add_argument("--admin-password", default=settings.admin_password)
+    parser.add_argument("--arrival-seconds", type=float, default=120.0)
+    parser.add_argument("--read-seconds", type=float, default=20.0)
+    parser.add_argument("--exam-seconds", type=float, default=2400.0)
+    parser.add_argument("--result-delay-seconds", type=float, default=5.0)
+    parser.add_argument("--autosave-seconds", type=float, default=10.0, help="作答期間自動暫存間隔，0 表示不暫存")
+    parser.add_argument("--class-stagger", type=float, default=0.0, help="相鄰班級開始的間隔秒數")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="所有思考時間乘上此倍率")
+    parser.add_argument("--max-connections", type=int, default=0, help="0 表示每位學生一條連線")
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="另將報表寫入 JSON 檔")
+    parser.add_argument("--spawn", action="store_true", help="自行啟動 LLM 替身與 API")
+    parser.add_argument("--api-port", type=int, default=8766)
+    parser.add_argument("--llm-port", type=int, default=9100)
+    parser.add_argument("--llm-latency-ms", type=float, default=1500.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    if not 1 <= args.students <= 999:
+        parser.error("--students 須為 1～999（每班一個驗證碼前綴）")
+
+    if args.spawn:
+        with spawned_servers(args):
+            report = asyncio.run(run(args))
+    else:
+        report = asyncio.run(run(args))
+
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if any(s["errors"] for s in report["steps"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
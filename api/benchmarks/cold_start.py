@@ -0,0 +1,85 @@
+"""冷啟動基準測試：量測從啟動 uvicorn 到 GET / 第一次成功回應的毫秒數。
+
+需要可連線的 PostgreSQL（例如 docker compose up postgres），
+verify 模式需先執行過 python -m app.jobs.migrate_and_seed。
+migrate 模式重現 Render 的啟動方式：單一 worker 的 gunicorn 以 DB_STARTUP_MODE=migrate 啟動，
+master 在 fork 前檢查版本與 seed（資料庫已在 head）；--server gunicorn 可量測其他模式在 gunicorn 下的對照值。
+
+用法（於 api/ 目錄）:
+    python -m benchmarks.cold_start --mode create_all --mode verify --mode migrate --runs 5
+    python -m benchmarks.cold_start --mode verify --server gunicorn
+    python -m benchmarks.cold_start --budget-ms 2500
+
+中位數超過 --budget-ms 時以非零狀態結束；匯入時間的細項見 benchmarks.import_time。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[1]
+
+# verify 模式（正式環境）從啟動到第一個 200 的預算，包含匯入、連線檢查與驗證碼索引建立
+COLD_START_BUDGET_MS = 2500.0
+
+
+def measure_once(mode: str, server: str, port: int, timeout: float) -> float:
+    """啟動一個伺服器程序並輪詢 /，回傳第一次 200 回應所花的毫秒數。"""
+    env = {**os.environ, "DB_STARTUP_MODE": mode}
+    if server == "gunicorn" or mode == "migrate":  # 遷移由 gunicorn master 執行
+        env.update(WEB_CONCURRENCY="1", PORT=str(port))
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f"http://127.0.0.1:{port}/"
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{command[2]} 提前結束（exit code {proc.returncode}）")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise TimeoutError(f"{timeout}s 內未取得成功回應")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="量測 API 冷啟動到第一個成功回應的時間")
+    parser.add_argument("--mode", action="append", choices=["verify", "create_all", "migrate"], help="DB_STARTUP_MODE，可重複指定")
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn", help="migrate 模式一律使用 gunicorn")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--budget-ms", type=float, default=COLD_START_BUDGET_MS)
+    args = parser.parse_args()
+
+    over_budget = False
+    for mode in args.mode or ["verify"]:
+        samples = [measure_once(mode, args.server, args.port, args.timeout) for _ in range(args.runs)]
+        median = statistics.median(samples)
+        print(
+            f"{mode:<10} median {median:8.1f} ms   "
+            f"min {min(samples):8.1f} ms   max {max(samples):8.1f} ms   (n={len(samples)})"
+        )
+        if mode == "verify" and median > args.budget_ms:
+            print(f"超出預算：{median:.1f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+            over_budget = True
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""匯入時間基準測試：以 python -X importtime 量測 `import main` 的耗時並列出最重的模組。
+
+冷啟動（Render 免費方案休眠後喚醒）時，匯入時間直接加在使用者的第一個請求上；
+超過預算時以非零狀態結束，可放進 CI。不需要資料庫。
+
+用法（於 api/ 目錄）:
+    python -m benchmarks.import_time --runs 5 --top 15
+    python -m benchmarks.import_time --budget-ms 1200
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[1]
+
+# 開發機上目前約 0.8～0.9 秒（openai SDK 與 alembic 延後匯入前約 1.5 秒）
+IMPORT_BUDGET_MS = 1200.0
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure_once() -> tuple[float, dict[str, float]]:
+    """在全新的直譯器中匯入 main，回傳 (總毫秒數, {main 直接匯入的模組: 累計毫秒數})。"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=API_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # -X importtime 先印出子模組再印出父模組；縮排深度 1 的行屬於下一個深度 0 的模組
+    children: dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m is None:
+            continue
+        cumulative_ms = int(m.group(2)) / 1000
+        depth = len(m.group(3)) // 2
+        if depth == 1:
+            children[m.group(4)] = cumulative_ms
+        elif depth == 0:
+            if m.group(4) == "main":
+                return cumulative_ms, children
+            children = {}
+    raise RuntimeError("importtime 輸出中找不到 main")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="量測 import main 的耗時")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="列出累計耗時最高的前 N 個直接相依模組")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    measure_once()  # 預熱：確保 .pyc 已編譯，量測的是一般冷啟動而非首次部署
+    results = [measure_once() for _ in range(args.runs)]
+    totals = [total for total, _ in results]
+    median = statistics.median(totals)
+
+    print(f"import main  median {median:8.1f} ms   min {min(totals):8.1f} ms   max {max(totals):8.1f} ms   (n={len(totals)})")
+    modules = min(results, key=lambda r: abs(r[0] - median))[1]
+    for name, ms in sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    if median > args.budget_ms:
+        print(f"超出預算：{median:.1f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+    print(f"預算內：{median:.1f} ms <= {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
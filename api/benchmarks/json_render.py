@@ -0,0 +1,188 @@
+"""JSON 輸出基準測試：大量列表端點在改為「查詢列直接序列化」前後的每請求耗時。
+
+每個端點各建兩個路由，經完整的 FastAPI / ASGI 流程（httpx ASGITransport）呼叫：
+- before：舊寫法，由 ORM 物件建立 pydantic 模型，FastAPI 依 response_model 驗證後輸出；
+- after：目前寫法，查詢只取輸出欄位，rows_response / json_bytes_response 直接 orjson 輸出。
+資料以記憶體中的物件模擬，不含資料庫與 ORM 載入的成本（實際上 after 還省去建立 ORM 物件）。
+不需要資料庫。
+
+用法（於 api/ 目錄）:
+    python -m benchmarks.json_render --rows 999 --requests 200
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api.admin_router import SessionSummaryOut
+from app.api.json_response import FastJSONResponse, json_bytes_response, rows_response
+from app.api.teacher_router import CodeOut, SessionOut
+
+
+def _fixtures(rows: int):
+    now = datetime.now(timezone.utc)
+    codes = [
+        SimpleNamespace(
+            code=f"APEX5A{i:03d}",
+            prefix="APEX5A",
+            student_number=f"{i:03d}",
+            status="unused",
+            exam_template=SimpleNamespace(exam_id="grade5_entrance"),
+            created_at=now - timedelta(seconds=i),
+        )
+        for i in range(rows)
+    ]
+    sessions = [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            student_name=f"學生{i}",
+            exam_id="grade5_entrance",
+            verification_code=SimpleNamespace(code=f"APEX5A{i:03d}"),
+            status="completed",
+            started_at=now - timedelta(minutes=50),
+            completed_at=now,
+        )
+        for i in range(rows)
+    ]
+    code_row = namedtuple("CodeRow", list(CodeOut.model_fields))
+    session_row = namedtuple("SessionRow", list(SessionOut.model_fields))
+    summary_row = namedtuple("SummaryRow", list(SessionSummaryOut.model_fields))
+    code_rows = [
+        code_row(c.code, c.prefix, c.student_number, c.status, c.exam_template.exam_id, c.created_at) for c in codes
+    ]
+    session_rows = [
+        session_row(s.id, s.student_name, s.exam_id, s.verification_code.code, s.status, s.started_at, s.completed_at)
+        for s in sessions
+    ]
+    summary_rows = [summary_row(s.id, s.student_name, s.exam_id, s.status, s.verification_code.code) for s in sessions]
+    return codes, sessions, code_rows, session_rows, summary_rows
+
+
+def _app(rows: int) -> FastAPI:
+    codes, sessions, code_rows, session_rows, summary_rows = _fixtures(rows)
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/before/teacher/codes", response_model=list[CodeOut])
+    async def codes_before():
+        return [
+            CodeOut(
+                code=c.code,
+                prefix=c.prefix,
+                student_number=c.student_number,
+                status=c.status,
+                exam_id=c.exam_template.exam_id,
+                created_at=c.created_at,
+            )
+            for c in codes
+        ]
+
+    @app.get("/after/teacher/codes", response_model=list[CodeOut])
+    async def codes_after():
+        return rows_response(code_rows)
+
+    @app.get("/before/teacher/codes/generate", response_model=list[CodeOut])
+    async def generate_before():
+        return [
+            CodeOut(
+                code=c.code,
+                prefix=c.prefix,
+                student_number=c.student_number,
+                status=c.status,
+                exam_id="grade5_entrance",
+                created_at=c.created_at,
+            )
+            for c in codes
+        ]
+
+    @app.get("/after/teacher/codes/generate", response_model=list[CodeOut])
+    async def generate_after():
+        return json_bytes_response([
+            {
+                "code": c.code,
+                "prefix": c.prefix,
+                "student_number": c.student_number,
+                "status": c.status,
+                "exam_id": "grade5_entrance",
+                "created_at": c.created_at,
+            }
+            for c in codes
+        ])
+
+    @app.get("/before/teacher/results", response_model=list[SessionOut])
+    async def results_before():
+        return [
+            SessionOut(
+                session_id=str(s.id),
+                student_name=s.student_name,
+                exam_id=s.exam_id,
+                code=s.verification_code.code,
+                status=s.status,
+                started_at=s.started_at,
+                completed_at=s.completed_at,
+            )
+            for s in sessions
+        ]
+
+    @app.get("/after/teacher/results", response_model=list[SessionOut])
+    async def results_after():
+        return rows_response(session_rows)
+
+    @app.get("/before/admin/sessions", response_model=list[SessionSummaryOut])
+    async def sessions_before():
+        return [
+            SessionSummaryOut(
+                session_id=str(s.id),
+                student_name=s.student_name,
+                exam_id=s.exam_id,
+                status=s.status,
+                code=s.verification_code.code,
+            )
+            for s in sessions
+        ]
+
+    @app.get("/after/admin/sessions", response_model=list[SessionSummaryOut])
+    async def sessions_after():
+        return rows_response(summary_rows)
+
+    return app
+
+
+ENDPOINTS = ("/teacher/codes", "/teacher/codes/generate", "/teacher/results", "/admin/sessions")
+
+
+async def _time(client: AsyncClient, path: str, requests: int) -> tuple[float, int]:
+    for _ in range(10):
+        await client.get(path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        resp = await client.get(path)
+    return (time.perf_counter() - start) / requests * 1000, len(resp.content)
+
+
+async def run(rows: int, requests: int) -> None:
+    async with AsyncClient(transport=ASGITransport(app=_app(rows)), base_url="http://bench") as client:
+        print(f"{'endpoint':<26}{'before':>12}{'after':>12}{'speedup':>10}{'bytes':>10}")
+        for endpoint in ENDPOINTS:
+            before, size_before = await _time(client, "/before" + endpoint, requests)
+            after, size_after = await _time(client, "/after" + endpoint, requests)
+            assert size_before == size_after, f"{endpoint} 輸出大小不同：{size_before} != {size_after}"
+            print(f"{endpoint:<26}{before:>9.2f} ms{after:>9.2f} ms{before / after:>9.1f}x{size_after:>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比較列表端點的 JSON 輸出耗時")
+    parser.add_argument("--rows", type=int, default=999)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.requests))
+
+
+if __name__ == "__main__":
+    main()
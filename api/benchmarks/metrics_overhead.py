@@ -0,0 +1,113 @@
+"""指標開銷基準測試：請求中介層與 SQL 查詢計時各自增加的耗時。
+
+完整 HTTP 請求與 aiosqlite 查詢本身的耗時波動（數十 µs）遠大於指標開銷，無法直接比較，
+因此改為量測最小的單位：
+- request：RequestMetricsMiddleware 包住只回應 200 的 ASGI app，與直接呼叫該 app 比較；
+- query：同步 SQLite 記憶體資料庫執行 SELECT 1，engine 有無註冊查詢計時事件
+  （async engine 的事件同樣在底層同步 engine 上觸發）；
+- listener：同上，但只註冊空的 before/after_cursor_execute，即 SQLAlchemy 事件分派本身的成本，
+  與 query 的差距才是計時程式碼的成本。相對於 PostgreSQL 一次來回（數百 µs）兩者皆可忽略。
+兩組都在「關閉 / 開啟」之間交替跑多輪並取中位數。不需要 PostgreSQL。
+
+用法（於 api/ 目錄）:
+    python -m benchmarks.metrics_overhead --calls 100000 --rounds 7
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Callable
+
+from sqlalchemy import create_engine, event, text
+
+from app.core.request_metrics import RequestMetricsMiddleware
+from app.db.query_metrics import instrument_sync_engine
+
+
+class _Route:
+    path = "/api/student/exam/{session_id}/next"
+
+
+async def _app(scope, receive, send) -> None:
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request"}
+
+
+async def _send(message) -> None:
+    pass
+
+
+def _request_loop(app, calls: int) -> Callable[[], float]:
+    async def loop() -> None:
+        for _ in range(calls):
+            await app({"type": "http", "method": "POST"}, _receive, _send)
+
+    def timed() -> float:
+        start = time.perf_counter()
+        asyncio.run(loop())
+        return (time.perf_counter() - start) / calls * 1e6
+
+    return timed
+
+
+def _noop(*args) -> None:
+    pass
+
+
+def _query_loop(listeners: str | None, calls: int) -> Callable[[], float]:
+    engine = create_engine("sqlite://")
+    if listeners == "noop":
+        event.listen(engine, "before_cursor_execute", _noop)
+        event.listen(engine, "after_cursor_execute", _noop)
+    elif listeners == "metrics":
+        instrument_sync_engine(engine, "bench")
+    conn = engine.connect()
+    select_one = text("SELECT 1")
+
+    def timed() -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            conn.execute(select_one)
+        return (time.perf_counter() - start) / calls * 1e6
+
+    return timed
+
+
+def _compare(off: Callable[[], float], on: Callable[[], float], rounds: int) -> tuple[float, float]:
+    off(), on()  # 暖機
+    samples: dict[str, list[float]] = {"off": [], "on": []}
+    for _ in range(rounds):
+        samples["off"].append(off())
+        samples["on"].append(on())
+    return statistics.median(samples["off"]), statistics.median(samples["on"])
+
+
+def run(calls: int, rounds: int) -> None:
+    print(f"{'':<10}{'off':>13}{'on':>13}{'overhead':>13}")
+    results = {
+        "request": _compare(
+            _request_loop(_app, calls), _request_loop(RequestMetricsMiddleware(_app), calls), rounds
+        ),
+        "query": _compare(_query_loop(None, calls), _query_loop("metrics", calls), rounds),
+        "listener": _compare(_query_loop(None, calls), _query_loop("noop", calls), rounds),
+    }
+    for name, (off, on) in results.items():
+        print(f"{name:<10}{off:>10.2f} µs{on:>10.2f} µs{on - off:>+10.2f} µs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="量測請求指標與查詢計時的開銷")
+    parser.add_argument("--calls", type=int, default=100_000, help="每輪的請求 / 查詢數")
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+    run(args.calls, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
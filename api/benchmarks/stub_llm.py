@@ -0,0 +1,74 @@
+"""壓力測試用的 LLM 替身：相容 OpenAI Chat Completions 的最小 HTTP 服務。
+
+API 以 OPENAI_API_KEY=<任意值>、OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 啟動時，
+OpenAIClient 的呼叫會送到這裡，走完整的 SDK 與網路路徑，但不花費額度、延遲可控制：
+每次回應前等待對數常態分布的延遲（中位數 --latency-ms），並依 --failure-rate 回傳 500。
+回應內容為固定的 AIAnalysis JSON。
+
+用法（於 api/ 目錄）:
+    python -m benchmarks.stub_llm --port 9100 --latency-ms 1500
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+ANALYSIS = {
+    "weakness_analysis": "（壓力測試替身）分數、小數的運算流暢度較弱。",
+    "enhancement_suggestions": "（壓力測試替身）先複習整數與小數的四則運算，再練習分數應用題。",
+}
+
+
+def create_app(latency_ms: float, sigma: float = 0.4, failure_rate: float = 0.0, seed: int | None = None) -> FastAPI:
+    """建立替身服務；延遲為中位數 latency_ms、對數標準差 sigma 的對數常態分布。"""
+    rng = random.Random(seed)
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: dict):
+        app.state.calls += 1
+        await asyncio.sleep(latency_ms / 1000 * math.exp(rng.gauss(0, sigma)))
+        if rng.random() < failure_rate:
+            return JSONResponse({"error": {"message": "stub failure", "type": "server_error"}}, status_code=500)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(ANALYSIS, ensure_ascii=False)},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="相容 OpenAI 的 LLM 替身服務")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=1500.0, help="回應延遲中位數")
+    parser.add_argument("--sigma", type=float, default=0.4, help="延遲的對數標準差")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.sigma, args.failure_rate, args.seed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
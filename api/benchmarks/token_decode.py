@@ -0,0 +1,71 @@
+"""JWT 解碼基準測試：比較每次 jose.jwt.decode 與快取查詢的成本。
+
+模擬一場 500 位學生的考試：每位學生持有一個 session token，
+依隨機順序送出輪詢 / 自動儲存請求，每個請求解碼一次 token。
+不需要資料庫。
+
+用法（於 api/ 目錄）:
+    python -m benchmarks.token_decode --students 500 --requests-per-student 40
+"""
+
+import argparse
+import random
+import time
+
+from jose import jwt
+
+from app.auth.security import create_access_token
+from app.auth.token_cache import TokenCache
+from app.core.config import settings
+
+
+def _tokens(students: int) -> list[str]:
+    return [
+        create_access_token(
+            {"sub": f"student-{i}", "type": "student_session", "session_id": f"s-{i}", "exam_id": "grade5_entrance"},
+            expires_minutes=settings.jwt_student_token_expire_minutes,
+        )
+        for i in range(students)
+    ]
+
+
+def _decode(token: str) -> dict:
+    return jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+
+
+def run(students: int, requests_per_student: int, seed: int) -> None:
+    tokens = _tokens(students)
+    stream = [t for t in tokens for _ in range(requests_per_student)]
+    random.Random(seed).shuffle(stream)
+
+    start = time.perf_counter()
+    for token in stream:
+        _decode(token)
+    uncached = time.perf_counter() - start
+
+    cache = TokenCache(max_entries=max(students, 1))
+    start = time.perf_counter()
+    for token in stream:
+        payload = cache.get(token)
+        if payload is None:
+            cache.put(token, _decode(token))
+    cached = time.perf_counter() - start
+
+    n = len(stream)
+    print(f"{students} 位學生，共 {n} 個請求")
+    print(f"  每次解碼:   {uncached * 1000:8.1f} ms 總計，{uncached / n * 1e6:7.2f} µs/請求")
+    print(f"  快取後:     {cached * 1000:8.1f} ms 總計，{cached / n * 1e6:7.2f} µs/請求")
+    print(f"  加速倍數:   {uncached / cached:8.1f}x（命中率 {cache.hit_ratio():.1%}）")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比較 JWT 解碼與快取查詢的成本")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--requests-per-student", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.students, args.requests_per_student, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""多 worker 擴展基準測試：gunicorn worker 數與吞吐量的關係。
+
+對每個 worker 數啟動一次 gunicorn（gunicorn.conf.py，WEB_CONCURRENCY 覆寫），
+以固定並行數持續送出 --duration 秒的請求，回報每秒請求數、p50 / p99 延遲與相對單一 worker 的倍率。
+預設端點為 POST /api/exams/{exam_id}/assess（純 CPU 評分，不寫資料庫），
+最能反映單一事件迴圈被 CPU 工作卡住的情形；--endpoint login 改測 bcrypt 登入。
+
+壓力產生器與伺服器在同一台機器上會互搶 CPU，worker 數接近核心數時倍率會被低估；
+需要精確數字時請在另一台機器以 --base-url 模式執行（不啟動 gunicorn，只量測）。
+
+需要可連線的 PostgreSQL 並已執行 python -m app.jobs.migrate_and_seed。
+
+用法（於 api/ 目錄）:
+    python -m benchmarks.worker_scaling --workers 1 --workers 2 --workers 4 --concurrency 64 --duration 20
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from app.core.config import settings
+from app.data.grade5_entrance import grade5_entrance_template
+
+API_DIR = Path(__file__).resolve().parents[1]
+
+
+def _request(endpoint: str) -> tuple[str, dict]:
+    if endpoint == "login":
+        return "/api/auth/login", {"username": settings.admin_username, "password": settings.admin_password}
+    template = grade5_entrance_template
+    results = [
+        {"question_id": q.question_id, "score": float(i % 3 != 0)}
+        for i, q in enumerate(template.get_all_questions())
+    ]
+    body = {"student_name": "擴展測試", "exam_id": template.exam_id, "results": results}
+    return f"/api/exams/{template.exam_id}/assess", body
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)), 1) - 1] if ordered else math.nan
+
+
+async def load(base_url: str, endpoint: str, concurrency: int, duration: float) -> dict:
+    """以 concurrency 個並行迴圈持續送出請求 duration 秒。"""
+    path, body = _request(endpoint)
+    latencies: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for _ in range(concurrency):  # 暖機：每個 worker 載入模板快取、建立連線
+            await client.post(path, json=body)
+        deadline = time.perf_counter() + duration
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    resp = await client.post(path, json=body)
+                    ok = resp.is_success
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "errors": errors,
+    }
+
+
+def _start_gunicorn(workers: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(port), "DB_STARTUP_MODE": "verify"}
+    return subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"], cwd=API_DIR, env=env)
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn 提前結束（exit code {proc.returncode}）")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{timeout}s 內 {url} 未就緒")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="量測 gunicorn worker 數與吞吐量的關係")
+    parser.add_argument("--workers", type=int, action="append", help="worker 數，可重複指定（預設 1 2 4）")
+    parser.add_argument("--endpoint", choices=["assess", "login"], default="assess")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--base-url", help="只對已在執行的伺服器量測一次，不啟動 gunicorn")
+    args = parser.parse_args()
+
+    if args.base_url:
+        r = asyncio.run(load(args.base_url, args.endpoint, args.concurrency, args.duration))
+        print(f"{r['rps']:.1f} req/s  p50 {r['p50_ms']:.1f} ms  p99 {r['p99_ms']:.1f} ms  errors {r['errors']}")
+        return
+
+    print(f"{'workers':>8}{'req/s':>10}{'scaling':>9}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    baseline = None
+    for workers in args.workers or [1, 2, 4]:
+        proc = _start_gunicorn(workers, args.port)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            _wait_ready(base_url + "/", proc)
+            r = asyncio.run(load(base_url, args.endpoint, args.concurrency, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait()
+        baseline = baseline or r["rps"]
+        print(
+            f"{workers:>8}{r['rps']:>10.1f}{r['rps'] / baseline:>8.2f}x"
+            f"{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
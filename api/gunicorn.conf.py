@@ -0,0 +1,70 @@
+"""Gunicorn 多 worker 部署設定：gunicorn -c gunicorn.conf.py main:app
+
+- worker 數由 WEB_CONCURRENCY 指定（預設為 CPU 核心數，最多 8）；每個 worker 是獨立的
+  uvicorn 事件迴圈，bcrypt 或評分的 CPU 尖峰只會卡住其中一個。
+- preload_app：master 先匯入應用程式再 fork，worker 共用已載入的模組（copy-on-write），
+  啟動較快、記憶體較省。匯入時不建立任何連線或執行緒（連線池、bcrypt 執行緒池都是首次使用才建立），
+  post_fork 仍會丟棄繼承來的連線池以防萬一；LISTEN、模板輪詢等背景工作在各 worker 的 lifespan 中啟動。
+- 優雅重啟：kill -HUP <master pid> 逐一以新 worker 取代舊 worker；graceful_timeout 內
+  讓進行中的請求完成。max_requests 加上 jitter 定期輪替 worker，避免記憶體緩慢成長。
+
+各 worker 的本地狀態與跨程序一致性：
+- 使用者快取、試卷模板、驗證碼索引：異動時以 PostgreSQL LISTEN/NOTIFY 通知所有 worker 失效
+  （app.db.notify），LISTEN 重新連線後再做一次整體同步；模板另有定期版本比對作為保底。
+- JWT 驗證快取：token 內容不可變，不需失效；停用帳號由使用者快取的失效處理。
+- 結果與模板的序列化快取：以 ETag（內容雜湊）為鍵，內容改變即換鍵，不會讀到舊資料。
+- 驗證碼限流計數、准入控制名額：每個 worker 各自計數，實際上限為設定值乘以 worker 數。
+- 作答自動儲存緩衝：各 worker 各自批次寫入，以伺服器收到時間 saved_at 防止舊暫存覆蓋新暫存。
+- 指標：各 worker 寫入 METRICS_DIR，/metrics 輸出加總（app.core.metrics_multiprocess）。
+"""
+
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(os.cpu_count() or 1, 8)))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+timeout = 60  # worker 無回應多久後由 master 重啟
+graceful_timeout = 30
+keepalive = 5
+max_requests = 10000
+max_requests_jitter = 1000
+
+# 信任這些來源的 X-Forwarded-For / X-Forwarded-Proto（由 uvicorn worker 套用），request.client 因此是
+# 真實的學生 IP，驗證碼限流才能以 IP 計數。預設為私有網段：Render 與 docker compose 的代理都由內網連入；
+# 取最右邊一個不受信任的位址，客戶端自行偽造的 X-Forwarded-For 前段不會被採用。
+forwarded_allow_ips = os.environ.get(
+    "FORWARDED_ALLOW_IPS", "127.0.0.1,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16"
+)
+
+accesslog = None
+errorlog = "-"
+
+# 多 worker 指標彙總目錄；必須在 preload 匯入 app.core.config 之前設定
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "apexmath-metrics"))
+
+
+def on_starting(server):
+    """master 啟動：清空上一次執行留下的指標檔；DB_STARTUP_MODE=migrate 時在 fork worker 前遷移與 seed。
+
+    preload_app 已匯入應用程式，遷移檢查不需另外啟動 Python 程序；失敗時 master 結束，服務不會啟動。
+    """
+    from app.core.config import settings
+    from app.core.metrics_multiprocess import clear_directory
+
+    clear_directory(os.environ["METRICS_DIR"])
+    if settings.db_startup_mode == "migrate":
+        from app.jobs.migrate_and_seed import migrate_on_start
+
+        migrate_on_start()
+
+
+def post_fork(server, worker):
+    """worker 建立後：丟棄從 master 繼承的連線池，各 worker 使用自己的連線。"""
+    from app.db.engine import engine, read_engine
+
+    engine.sync_engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.sync_engine.dispose(close=False)
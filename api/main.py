@@ -6,32 +6,48 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.admin_router import router as admin_router
+from app.api.json_response import FastJSONResponse
+from app.api.metrics_router import router as metrics_router
 from app.api.router import router as exam_router
 from app.api.student_router import router as student_router
 from app.api.teacher_router import router as teacher_router
 from app.auth.router import router as auth_router
+from app.auth.security import shutdown_password_executor
+from app.auth.user_cache import user_cache
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.data.grade5_entrance import register_grade5_entrance
-from app.db.engine import async_session_factory, engine
+from app.core.metrics_multiprocess import MetricsFileExporter
+from app.core.profiler import ProfilingMiddleware
+from app.core.request_metrics import RequestMetricsMiddleware
+from app.db.engine import async_session_factory, dispose_engines, engine
+from app.db.migrations import verify_schema_at_head
 from app.db.models import Base
+from app.db.notify import CODE_CHANNEL, EXAM_CHANNEL, USER_CHANNEL, NotifyListener
+from app.db.partitions import ensure_session_partitions
 from app.db.seed import run_seed
-from app.domain.exam_registry import ExamRegistry
+from app.services.autosave_buffer import AutosaveBuffer
+from app.services.code_index import code_index
+from app.services.db_exam_registry import DbExamRegistry
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """應用程式生命週期管理：啟動時建表與 seed，關閉時清理連線池。"""
-    # Startup: 建立資料庫表（開發用，正式環境改用 alembic migrate）
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-    # Seed 預設資料
-    async with async_session_factory() as session:
-        await run_seed(session)
-
-    # 保留記憶體 ExamRegistry 以相容既有 scoring 流程
-    registry = ExamRegistry()
-    register_grade5_entrance(registry)
+    """應用程式生命週期管理：啟動時檢查（或建立）資料庫，關閉時清理連線池。"""
+    if settings.db_startup_mode == "create_all":
+        # 開發模式：每次啟動都建表、補分區並 seed
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await ensure_session_partitions(conn)
+        async with async_session_factory() as session:
+            await run_seed(session)
+    else:
+        # 正式模式：只確認 schema 已在 Alembic head，遷移與 seed 由 migrate-and-seed 任務
+        # 或（migrate 模式）gunicorn master 負責
+        await verify_schema_at_head(engine)
+
+    # 試卷模板以資料庫為準：按需載入並快取編譯結果，定期比對版本
+    registry = DbExamRegistry(async_session_factory, poll_seconds=settings.exam_registry_poll_seconds)
+    await registry.start_polling()
     app.state.registry = registry
 
     # 若有設定 OPENAI_API_KEY，啟用 AI 分析功能
@@ -41,13 +57,42 @@ async def lifespan(app: FastAPI):
     else:
         app.state.llm_client = None
 
+    # 跨 worker 快取失效：其他 worker 異動使用者、試卷或新增驗證碼時同步本地狀態；
+    # LISTEN 建立後會觸發一次整體同步，補上啟動期間的異動。
+    # 驗證碼索引（不存在的驗證碼不必查詢資料庫）即在這次同步中載入，載入完成前一律放行
+    listener = NotifyListener(settings.async_database_url)
+    listener.subscribe(USER_CHANNEL, user_cache.invalidate)
+    listener.subscribe(CODE_CHANNEL, lambda payload: code_index.on_notify(payload, async_session_factory))
+    listener.subscribe(EXAM_CHANNEL, registry.invalidate)
+    await listener.start()
+    app.state.notify_listener = listener
+
+    # 作答自動儲存：記憶體緩衝，定期批次寫回 exam_sessions.answers
+    autosave = AutosaveBuffer(async_session_factory, flush_seconds=settings.autosave_flush_seconds)
+    await autosave.start()
+    app.state.autosave = autosave
+
+    # 多 worker：定期寫出本 worker 的指標，/metrics 加總所有 worker
+    exporter = None
+    if settings.metrics_dir:
+        exporter = MetricsFileExporter(settings.metrics_dir, settings.metrics_flush_seconds)
+        await exporter.start()
+    app.state.metrics_exporter = exporter
+
     yield
 
-    # Shutdown: 關閉連線池
-    await engine.dispose()
+    # Shutdown: 寫入剩餘的作答暫存，停止 LISTEN，關閉連線池（含唯讀副本）
+    if exporter is not None:
+        await exporter.stop()
+    await autosave.stop()
+    await listener.stop()
+    await registry.stop_polling()
+    await dispose_engines()
+    shutdown_password_executor()
 
 
-app = FastAPI(title="ApexMath 峰數學能力檢測平台", lifespan=lifespan)
+# 未宣告 response_model 的路由（dict 回應）改以 orjson 輸出
+app = FastAPI(title="ApexMath 峰數學能力檢測平台", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # CORS 設定
 _cors_origins = settings.cors_origins.split(",")
@@ -57,14 +102,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],  # 跨網域部署時前端才讀得到 503 的重試秒數
 )
 
+# 依 Accept-Encoding 壓縮 JSON / CSV 回應；已預先壓縮的快取內容直接放行
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
+
+# 管理者帶 X-Profile 標頭時以取樣剖析器執行該請求；其他請求只多一次標頭掃描
+app.add_middleware(ProfilingMiddleware, interval=settings.profile_interval_ms / 1000)
+
+# 每個路由的請求數、狀態碼、延遲與 SQL 查詢耗時；最後加入即為最外層，延遲包含上述中介層
+app.add_middleware(RequestMetricsMiddleware)
+
 # 註冊路由
 app.include_router(auth_router)
 app.include_router(exam_router)
 app.include_router(teacher_router)
 app.include_router(student_router)
 app.include_router(admin_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
@@ -1,4 +1,4 @@
-"""測試設定：提供共用 fixtures。"""
+"""測試設定：提供共用 fixtures 與資料庫 session 的替身。"""
 
 import pytest
 from fastapi import FastAPI
@@ -60,3 +60,42 @@ def client(test_app):
     """提供測試用 HTTP client。"""
     transport = ASGITransport(app=test_app)
     return AsyncClient(transport=transport, base_url="http://test")
+
+
+class FakeResult:
+    """模擬查詢結果：first / scalar_one_or_none 回傳同一列，all 回傳 rows。"""
+
+    def __init__(self, row=None, rows=None):
+        self._row = row
+        self._rows = rows if rows is not None else []
+
+    def first(self):
+        return self._row
+
+    def scalar_one_or_none(self):
+        return self._row
+
+    def all(self):
+        return self._rows
+
+
+class FakeDBSession:
+    """模擬 AsyncSession：每次查詢都回傳同一列（或同一組 rows），記錄查詢次數與語句。
+
+    測試「不應查詢資料庫」時斷言 calls == 0；commits 記錄 commit 次數。
+    """
+
+    def __init__(self, row=None, rows=None):
+        self.row = row
+        self.rows = rows
+        self.calls = 0
+        self.commits = 0
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        self.calls += 1
+        self.statements.append(stmt)
+        return FakeResult(self.row, self.rows)
+
+    async def commit(self):
+        self.commits += 1
@@ -0,0 +1,272 @@
+"""測試適性測驗引擎：資訊量索引選題、EAP 能力估計、單元結束條件與評分對應。"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api import student_router as student_module
+from app.api import teacher_router as teacher_module
+from app.auth.dependencies import get_current_user, get_student_session_payload
+from app.auth.security import create_access_token
+from app.data.grade5_entrance import grade5_entrance_template
+from app.db.engine import get_db, get_read_db
+from app.domain.adaptive import THETA_GRID, AdaptiveEngine, adaptive_engine, information, probability
+from app.domain.compiled_template import CompiledTemplate
+from app.domain.exam_registry import ExamRegistry
+from app.domain.models import (
+    AdaptiveSettings,
+    ExamTemplate,
+    KnowledgePointCategory,
+    MathLiteracyDimension,
+    QuestionDefinition,
+    SectionDefinition,
+)
+from tests.conftest import FakeDBSession
+
+KP = KnowledgePointCategory
+ML = MathLiteracyDimension
+
+
+def _bank_template(items_per_section: int = 8, target_se: float | None = None) -> ExamTemplate:
+    """兩個單元、每單元 40 題的題庫，難度 -3～3、鑑別度 0.8～2.0。"""
+    rng = random.Random(7)
+    sections = []
+    for s, kp in enumerate((KP.INTEGER, KP.FRACTION)):
+        questions = [
+            QuestionDefinition(
+                question_id=f"{s}-{i}",
+                knowledge_point=kp,
+                difficulty_weight=1.0,
+                literacy_weights={list(ML)[i % 4]: 1.0},
+                irt_a=round(rng.uniform(0.8, 2.0), 2),
+                irt_b=round(-3 + 6 * i / 39, 3),
+            )
+            for i in range(40)
+        ]
+        sections.append(SectionDefinition(section_id=f"sec-{s}", name=kp.value, knowledge_point=kp, questions=questions))
+    return ExamTemplate(
+        exam_id="bank",
+        name="題庫",
+        sections=sections,
+        adaptive=AdaptiveSettings(items_per_section=items_per_section, target_se=target_se),
+    )
+
+
+def _simulate(engine: AdaptiveEngine, theta: float) -> dict[str, float]:
+    """以真實能力 theta 作答（得分率取 P(θ) 四捨五入），直到引擎回報結束。"""
+    params = {
+        q.question_id: (q.irt_a, q.irt_b) for q in engine.compiled.template.get_all_questions()
+    }
+    responses: dict[str, float] = {}
+    while True:
+        nxt = engine.next_question(responses)
+        if nxt.done:
+            return responses
+        responses[nxt.question_id] = float(round(probability(*params[nxt.question_id], theta)))
+
+
+@pytest.fixture()
+def engine():
+    return AdaptiveEngine(CompiledTemplate(_bank_template()))
+
+
+class TestItemSelection:
+    def test_first_item_has_max_information_at_prior_mean(self, engine):
+        nxt = engine.next_question({})
+        params = {q.question_id: (q.irt_a, q.irt_b) for q in engine.compiled.template.sections[0].questions}
+        best = max(params, key=lambda qid: information(*params[qid], 0.0))
+        assert (nxt.section_id, nxt.question_id, nxt.theta) == ("sec-0", best, 0.0)
+
+    def test_index_matches_brute_force(self, engine):
+        section = engine.sections[0]
+        rng = random.Random(1)
+        for _ in range(50):
+            g = rng.randrange(len(THETA_GRID))
+            answered = set(rng.sample(range(len(section.question_ids)), 10))
+            pos = section.select(THETA_GRID[g], answered)
+            infos = {p: information(*section.params[p], THETA_GRID[g]) for p in range(40) if p not in answered}
+            assert infos[pos] == max(infos.values())
+
+    def test_correct_answer_raises_theta_and_difficulty(self, engine):
+        first = engine.next_question({})
+        after = engine.next_question({first.question_id: 1.0})
+        b = {q.question_id: q.irt_b for q in engine.compiled.template.get_all_questions()}
+        assert after.theta > first.theta
+        assert b[after.question_id] > b[first.question_id]
+
+    def test_rejects_unknown_question(self, engine):
+        with pytest.raises(ValueError, match="Invalid question_id"):
+            engine.next_question({"nope": 1.0})
+
+
+class TestStopping:
+    def test_sections_end_after_items_per_section(self, engine):
+        responses = _simulate(engine, 0.5)
+        assert len(responses) == 16
+        assert sum(qid.startswith("0-") for qid in responses) == 8
+
+    def test_target_se_ends_sections_early(self):
+        engine = AdaptiveEngine(CompiledTemplate(_bank_template(items_per_section=30, target_se=0.45)))
+        responses = _simulate(engine, 0.0)
+        assert len(responses) < 60
+        assert all(est.se <= 0.45 for est in engine.estimate(responses).values())
+
+    def test_estimate_tracks_true_ability(self, engine):
+        for theta in (-1.5, 0.0, 1.5):
+            estimates = engine.estimate(_simulate(engine, theta))
+            assert all(abs(est.theta - theta) < 0.8 for est in estimates.values())
+
+
+class TestAdaptiveAssessment:
+    def test_scores_keep_assessment_shape(self, engine):
+        responses = _simulate(engine, 1.0)
+        result, stored = engine.assess("小明", responses)
+        assert len(result.knowledge_point_scores) == len(KP)
+        assert len(result.math_literacy_scores) == len(ML)
+        assert sum(v is not None for v in stored) == len(responses)
+
+    def test_higher_ability_scores_higher(self, engine):
+        low, _ = engine.assess("A", _simulate(engine, -1.5))
+        high, _ = engine.assess("B", _simulate(engine, 1.5))
+        score = {s.category: s.score for s in high.knowledge_point_scores}
+        for s in low.knowledge_point_scores:
+            if s.category in (KP.INTEGER, KP.FRACTION):
+                assert score[s.category] > s.score
+
+    def test_blank_submission_rejected(self, engine):
+        with pytest.raises(ValueError, match="not finished"):
+            engine.assess("空白", {})
+
+    def test_partial_submission_rejected(self, engine):
+        responses = _simulate(engine, 0.5)
+        responses.pop(next(reversed(responses)))
+        with pytest.raises(ValueError, match="not finished"):
+            engine.assess("中途", responses)
+
+    def test_non_adaptive_template_rejected(self):
+        with pytest.raises(ValueError):
+            adaptive_engine(CompiledTemplate(grade5_entrance_template))
+
+    def test_engine_cached_per_compiled_template(self):
+        compiled = CompiledTemplate(_bank_template())
+        assert adaptive_engine(compiled) is adaptive_engine(compiled)
+
+
+class TestNextQuestionEndpoint:
+    def _client(self, template):
+        app = FastAPI()
+        app.include_router(student_module.router)
+        registry = ExamRegistry()
+        registry.register(template)
+        app.state.registry = registry
+
+        self.db = FakeDBSession()
+
+        async def _db():
+            yield self.db
+
+        app.dependency_overrides[get_read_db] = _db
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    def _headers(self, exam_id):
+        token = create_access_token({"type": "student_session", "session_id": "s-1", "exam_id": exam_id})
+        return {"Authorization": f"Bearer {token}"}
+
+    async def test_returns_next_question_without_db(self):
+        async with self._client(_bank_template()) as client:
+            resp = await client.post("/api/student/exam/s-1/next", json={"results": []}, headers=self._headers("bank"))
+        assert resp.status_code == 200
+        assert resp.json()["section_id"] == "sec-0"
+        assert resp.json()["done"] is False
+        assert self.db.calls == 0  # token 帶有 exam_id 時不查詢資料庫
+
+    async def test_non_adaptive_exam_returns_400(self):
+        async with self._client(grade5_entrance_template) as client:
+            resp = await client.post(
+                "/api/student/exam/s-1/next", json={"results": []}, headers=self._headers("grade5_entrance")
+            )
+        assert resp.status_code == 400
+
+    async def test_out_of_range_score_returns_422(self):
+        async with self._client(_bank_template()) as client:
+            resp = await client.post(
+                "/api/student/exam/s-1/next",
+                json={"results": [{"question_id": "0-20", "score": 1.5}]},
+                headers=self._headers("bank"),
+            )
+        assert resp.status_code == 422
+
+
+class TestAdaptiveScoringEndpoints:
+    def _app(self, db) -> FastAPI:
+        app = FastAPI()
+        app.include_router(student_module.router)
+        app.include_router(teacher_module.router)
+        registry = ExamRegistry()
+        registry.register(_bank_template())
+        app.state.registry = registry
+        app.state.llm_client = None
+
+        async def _db():
+            yield db
+
+        app.dependency_overrides[get_db] = _db
+        return app
+
+    async def test_unfinished_submit_returns_422(self):
+        sid = "00000000-0000-0000-0000-000000000001"
+        session = SimpleNamespace(id=sid, student_name="小明", exam_id="bank", status="in_progress")
+        app = self._app(FakeDBSession(session))
+        app.dependency_overrides[get_student_session_payload] = lambda: {"session_id": sid}
+        engine = adaptive_engine(await app.state.registry.resolve("bank"))
+        first = engine.next_question({})
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            for results in ([], [{"question_id": first.question_id, "score": 1.0}]):
+                resp = await client.post(
+                    f"/api/student/exam/{sid}/submit",
+                    json={"results": results},
+                )
+                assert resp.status_code == 422
+                assert "not finished" in resp.json()["detail"]
+        assert session.status == "in_progress"
+
+    async def test_teacher_scoring_rejects_adaptive_exam(self):
+        code = SimpleNamespace(id=1, code="BANK001", teacher_id=1)
+        app = self._app(FakeDBSession(code))
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, role="teacher")
+        body = {"verification_code": "BANK001", "student_name": "小明", "exam_id": "bank", "results": []}
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            resp = await client.post("/api/teacher/scoring", json=body)
+        assert resp.status_code == 422
+        assert resp.json()["detail"] == "適性試卷需由學生線上作答，不支援手動評分"
+
+
+class TestQuestionStats:
+    def _client(self, db):
+        app = FastAPI()
+        app.include_router(teacher_module.router)
+        registry = ExamRegistry()
+        registry.register(_bank_template())
+        app.state.registry = registry
+
+        async def _db():
+            yield db
+
+        app.dependency_overrides[get_read_db] = _db
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, role="teacher")
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    async def test_unused_bank_item_is_skipped(self):
+        # 索引 1 的題目從未被選中：avg 為 NULL、作答人數 0
+        db = FakeDBSession(rows=[(0, 0.75, 4), (1, None, 0), (2, 0.5, 2)])
+        async with self._client(db) as client:
+            resp = await client.get("/api/teacher/exams/bank/question-stats")
+        assert resp.status_code == 200
+        assert resp.json() == [
+            {"question_id": "0-0", "average_score": 0.75, "answered_count": 4},
+            {"question_id": "0-2", "average_score": 0.5, "answered_count": 2},
+        ]
+        assert "HAVING" in str(db.statements[0])
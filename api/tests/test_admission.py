@@ -0,0 +1,115 @@
+"""測試准入控制：並行上限、先進先出排隊、佇列滿與逾時的 503 + Retry-After。"""
+
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core import admission
+from app.core.admission import AdmissionController, AdmissionRejected, admit
+
+
+class TestAdmissionController:
+    async def test_admits_up_to_limit_without_waiting(self):
+        controller = AdmissionController("t_limit", limit=2, queue_size=10, queue_timeout=1)
+        await controller.acquire()
+        await controller.acquire()
+        assert controller.active == 2
+        assert controller.queued == 0
+
+    async def test_waiters_are_served_in_order(self):
+        controller = AdmissionController("t_fifo", limit=1, queue_size=10, queue_timeout=1)
+        await controller.acquire()
+        order: list[int] = []
+
+        async def waiter(i: int) -> None:
+            await controller.acquire()
+            order.append(i)
+
+        tasks = [asyncio.create_task(waiter(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        assert controller.queued == 3
+        for _ in range(3):
+            controller.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2]
+        assert controller.active == 1
+
+    async def test_queue_full_rejects_immediately(self):
+        controller = AdmissionController("t_full", limit=1, queue_size=1, queue_timeout=5)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire()
+        assert exc.value.reason == "queue_full"
+        assert exc.value.retry_after >= 1
+        controller.release()
+        await waiting
+
+    async def test_queue_timeout_rejects_and_leaves_queue(self):
+        controller = AdmissionController("t_timeout", limit=1, queue_size=10, queue_timeout=0.01)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire()
+        assert exc.value.reason == "timeout"
+        assert controller.queued == 0
+        controller.release()
+        assert controller.active == 0
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        controller = AdmissionController("t_cancel", limit=1, queue_size=10, queue_timeout=5)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        controller.release()
+        assert controller.active == 0
+        assert controller.queued == 0
+
+    async def test_retry_after_grows_with_queue(self):
+        controller = AdmissionController("t_retry", limit=1, queue_size=100, queue_timeout=5)
+        for _ in range(10):
+            await controller.acquire()
+            controller.release(service_time=2.0)
+        await controller.acquire()
+        idle = controller.retry_after()
+        waiting = [asyncio.create_task(controller.acquire()) for _ in range(4)]
+        await asyncio.sleep(0)
+        assert controller.retry_after() > idle >= 2
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+
+
+class TestAdmitDependency:
+    @pytest.fixture
+    def controller(self, monkeypatch):
+        controller = AdmissionController("t_dep", limit=1, queue_size=0, queue_timeout=1)
+        monkeypatch.setitem(admission._controllers, "t_dep", controller)
+        return controller
+
+    async def test_saturated_route_returns_503_with_retry_after(self, controller):
+        app = FastAPI()
+        release = asyncio.Event()
+
+        @app.post("/submit")
+        async def submit(_: None = Depends(admit("t_dep"), scope="function")):
+            await release.wait()
+            return {"ok": True}
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/submit"))
+            while controller.active == 0:
+                await asyncio.sleep(0.001)
+            busy = await client.post("/submit")
+            assert busy.status_code == 503
+            assert int(busy.headers["Retry-After"]) >= 1
+
+            release.set()
+            assert (await first).status_code == 200
+        assert controller.active == 0
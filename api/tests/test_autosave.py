@@ -0,0 +1,246 @@
+"""測試作答自動儲存：同週期合併、每週期一次批次寫入、失敗重試，以及 API 只在首次儲存時查詢。
+
+批次 UPDATE 的條件（只寫作答中的 session、不以舊蓋新）需要真實 PostgreSQL，
+設定 TEST_DATABASE_URL 指向「專用」測試資料庫才會執行。
+"""
+
+import os
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api import student_router as student_module
+from app.auth.security import create_access_token
+from app.db.engine import get_db
+from app.db.models import Base, ExamSession, ExamTemplateRecord, User, VerificationCode
+from app.services.autosave_buffer import AutosaveBuffer
+from tests.conftest import FakeDBSession
+
+STARTED_AT = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+class FakeWriteSession:
+    """模擬 async_sessionmaker 產生的 session：記錄每次 execute 的參數列與 commit。"""
+
+    def __init__(self, log: list, fail: bool = False) -> None:
+        self.log = log
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        if self.fail:
+            raise ConnectionError("db down")
+        self.log.append(("execute", params))
+
+    async def commit(self):
+        self.log.append(("commit", None))
+
+
+class FakeSessionFactory:
+    def __init__(self) -> None:
+        self.log: list = []
+        self.fail = False
+
+    def __call__(self):
+        return FakeWriteSession(self.log, self.fail)
+
+    @property
+    def batches(self) -> list[list[dict]]:
+        return [params for op, params in self.log if op == "execute"]
+
+
+def _results(score: float) -> list[dict]:
+    return [{"question_id": "q1", "score": score}]
+
+
+class TestAutosaveBuffer:
+    async def test_repeated_saves_coalesce_to_one_row(self):
+        factory = FakeSessionFactory()
+        buffer = AutosaveBuffer(factory)
+        sid = uuid.uuid4()
+        for score in (0.0, 0.5, 1.0):
+            buffer.put(sid, STARTED_AT, _results(score))
+        assert await buffer.flush() == 1
+        [batch] = factory.batches
+        assert len(batch) == 1
+        assert batch[0]["b_answers"]["results"] == _results(1.0)
+        assert batch[0]["b_started_at"] == STARTED_AT
+
+    async def test_many_sessions_share_one_transaction(self):
+        factory = FakeSessionFactory()
+        buffer = AutosaveBuffer(factory)
+        for _ in range(500):
+            buffer.put(uuid.uuid4(), STARTED_AT, _results(1.0))
+        assert await buffer.flush() == 500
+        assert [op for op, _ in factory.log] == ["execute", "commit"]
+        assert buffer.pending_count == 0
+
+    async def test_empty_flush_does_not_touch_db(self):
+        factory = FakeSessionFactory()
+        assert await AutosaveBuffer(factory).flush() == 0
+        assert factory.log == []
+
+    async def test_failed_flush_keeps_newer_saves(self):
+        factory = FakeSessionFactory()
+        buffer = AutosaveBuffer(factory)
+        a, b = uuid.uuid4(), uuid.uuid4()
+        buffer.put(a, STARTED_AT, _results(0.0))
+        buffer.put(b, STARTED_AT, _results(0.0))
+        factory.fail = True
+        assert await buffer.flush() == 0
+        buffer.put(a, STARTED_AT, _results(1.0))  # 失敗後收到的較新暫存不可被舊資料蓋掉
+        factory.fail = False
+        assert await buffer.flush() == 2
+        rows = {row["b_id"]: row["b_answers"]["results"] for row in factory.batches[0]}
+        assert rows == {a: _results(1.0), b: _results(0.0)}
+
+    async def test_discard_drops_pending_save(self):
+        factory = FakeSessionFactory()
+        buffer = AutosaveBuffer(factory)
+        sid = uuid.uuid4()
+        buffer.remember(sid, STARTED_AT)
+        buffer.put(sid, STARTED_AT, _results(1.0))
+        buffer.discard(sid)
+        assert buffer.get(sid) is None
+        assert buffer.started_at(sid) is None
+        assert await buffer.flush() == 0
+
+    async def test_stop_flushes_remaining(self):
+        factory = FakeSessionFactory()
+        buffer = AutosaveBuffer(factory, flush_seconds=3600)
+        await buffer.start()
+        buffer.put(uuid.uuid4(), STARTED_AT, _results(1.0))
+        await buffer.stop()
+        assert len(factory.batches) == 1
+
+    def test_known_sessions_are_bounded(self):
+        buffer = AutosaveBuffer(FakeSessionFactory(), max_known_sessions=2)
+        ids = [uuid.uuid4() for _ in range(3)]
+        for sid in ids:
+            buffer.remember(sid, STARTED_AT)
+        assert buffer.started_at(ids[0]) is None
+        assert buffer.started_at(ids[2]) == STARTED_AT
+
+
+class TestAutosaveEndpoint:
+    @pytest.fixture()
+    def session_id(self):
+        return str(uuid.uuid4())
+
+    @pytest.fixture()
+    def headers(self, session_id):
+        token = create_access_token({"type": "student_session", "session_id": session_id})
+        return {"Authorization": f"Bearer {token}"}
+
+    def _client(self, db: FakeDBSession, buffer: AutosaveBuffer) -> AsyncClient:
+        app = FastAPI()
+        app.include_router(student_module.router)
+        app.state.autosave = buffer
+
+        async def _db():
+            yield db
+
+        app.dependency_overrides[get_db] = _db
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    async def test_only_first_save_queries_db(self, session_id, headers):
+        db = FakeDBSession(SimpleNamespace(started_at=STARTED_AT, status="in_progress"))
+        buffer = AutosaveBuffer(FakeSessionFactory())
+        client = self._client(db, buffer)
+        for score in (0.0, 1.0):
+            resp = await client.put(
+                f"/api/student/exam/{session_id}/autosave", json={"results": _results(score)}, headers=headers
+            )
+            assert resp.status_code == 202
+        assert db.calls == 1
+        assert buffer.get(uuid.UUID(session_id))["results"] == _results(1.0)
+
+        restored = await client.get(f"/api/student/exam/{session_id}/autosave", headers=headers)
+        assert restored.json()["results"] == _results(1.0)
+        assert db.calls == 1
+
+    async def test_completed_session_rejected(self, session_id, headers):
+        db = FakeDBSession(SimpleNamespace(started_at=STARTED_AT, status="completed"))
+        buffer = AutosaveBuffer(FakeSessionFactory())
+        resp = await self._client(db, buffer).put(
+            f"/api/student/exam/{session_id}/autosave", json={"results": []}, headers=headers
+        )
+        assert resp.status_code == 400
+        assert buffer.pending_count == 0
+
+    async def test_restore_reads_db_when_not_buffered(self, session_id, headers):
+        db = FakeDBSession({"results": _results(0.5), "saved_at": 1.0})
+        resp = await self._client(db, AutosaveBuffer(FakeSessionFactory())).get(
+            f"/api/student/exam/{session_id}/autosave", headers=headers
+        )
+        assert resp.json() == {"results": _results(0.5), "saved_at": 1.0}
+
+    async def test_other_session_forbidden(self, headers):
+        db = FakeDBSession(None)
+        resp = await self._client(db, AutosaveBuffer(FakeSessionFactory())).put(
+            f"/api/student/exam/{uuid.uuid4()}/autosave", json={"results": []}, headers=headers
+        )
+        assert resp.status_code == 403
+
+
+@pytest.mark.skipif(TEST_DATABASE_URL is None, reason="需要設定 TEST_DATABASE_URL")
+class TestFlushOnPostgres:
+    @pytest.fixture()
+    async def pg_factory(self):
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        yield async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    async def _sessions(self, factory, statuses: list[str]) -> list[ExamSession]:
+        async with factory() as db:
+            teacher = User(username="t1", hashed_password="x", display_name="T1", role="teacher")
+            template = ExamTemplateRecord(exam_id="grade5_entrance", name="小五入班檢測", template_data={})
+            db.add_all([teacher, template])
+            await db.flush()
+            sessions = []
+            for i, status in enumerate(statuses):
+                vc = VerificationCode(
+                    code=f"SAVE{i:03d}", prefix="SAVE", student_number=f"{i:03d}",
+                    teacher_id=teacher.id, exam_template_id=template.id, status="in_progress",
+                )
+                db.add(vc)
+                await db.flush()
+                session = ExamSession(verification_code_id=vc.id, student_name=f"學生{i}", exam_id="grade5_entrance", status=status)
+                db.add(session)
+                sessions.append(session)
+            await db.commit()
+            return sessions
+
+    async def _answers(self, factory, session: ExamSession) -> dict | None:
+        async with factory() as db:
+            return await db.scalar(select(ExamSession.answers).where(ExamSession.id == session.id))
+
+    async def test_batch_skips_completed_and_older_saves(self, pg_factory):
+        active, completed = await self._sessions(pg_factory, ["in_progress", "completed"])
+        newer, older = AutosaveBuffer(pg_factory), AutosaveBuffer(pg_factory)
+        older.put(active.id, active.started_at, _results(0.0))
+        newer.put(active.id, active.started_at, _results(1.0))
+        newer.put(completed.id, completed.started_at, _results(1.0))
+
+        await newer.flush()
+        await older.flush()  # 另一個 worker 較晚才寫入較舊的暫存
+
+        assert (await self._answers(pg_factory, active))["results"] == _results(1.0)
+        assert await self._answers(pg_factory, completed) is None
@@ -0,0 +1,231 @@
+"""測試紙本成績批次匯入：檔案解析、逐列驗證與批次評分。
+
+寫入資料庫的部分（新建與更新 session 的批次語句）需要真實 PostgreSQL，
+設定 TEST_DATABASE_URL 指向「專用」測試資料庫才會執行。
+"""
+
+import os
+import random
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.data.grade5_entrance import grade5_entrance_template
+from app.db.models import Base, ExamSession, ExamTemplateRecord, User, VerificationCode
+from app.domain.compiled_template import CompiledTemplate
+from app.domain.models import ExamSubmission, QuestionResult
+from app.domain.scoring import generate_assessment
+from app.services.bulk_import_service import BulkImportFileError, Table, import_scores, read_table, validate_rows
+
+COMPILED = CompiledTemplate(grade5_entrance_template)
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def _row(code: str = "APEX5A001", name: str = "小明", **scores) -> dict:
+    return {"verification_code": code, "student_name": name, "1-1": "", "1-2": "", **scores}
+
+
+def _table(*rows: dict) -> Table:
+    """以各列鍵的聯集（依出現順序）為標題。"""
+    return Table(header=list(dict.fromkeys(k for row in rows for k in row)), rows=list(rows))
+
+
+class TestReadTable:
+    def test_reads_csv_with_bom(self):
+        data = "\ufeffverification_code,student_name,1-1\nAPEX5A001,小明,1\n".encode("utf-8")
+        table = read_table("scores.csv", data)
+        assert table.header == ["verification_code", "student_name", "1-1"]
+        assert table.rows == [{"verification_code": "APEX5A001", "student_name": "小明", "1-1": "1"}]
+
+    def test_extra_csv_cells_are_row_errors(self):
+        data = "verification_code,student_name,1-1\nA1,小明,1,1\nA2,小華,1\n".encode("utf-8")
+        valid, errors = validate_rows(read_table("scores.csv", data), COMPILED)
+        assert [v.verification_code for v in valid] == ["A2"]
+        assert [(e.row_number, e.verification_code, e.error) for e in errors] == [(2, "A1", "資料格數多於標題欄位")]
+
+    def test_header_comes_from_file_not_first_row(self):
+        data = "verification_code,student_name,1-1,1-2\nA1,小明,1\n".encode("utf-8")  # 第一列較短
+        table = read_table("scores.csv", data)
+        assert table.header == ["verification_code", "student_name", "1-1", "1-2"]
+        valid, errors = validate_rows(table, COMPILED)
+        assert errors == []
+        assert valid[0].scores[COMPILED.index["1-1"]] == 1.0
+
+    def test_rejects_unknown_extension(self):
+        with pytest.raises(BulkImportFileError):
+            read_table("scores.txt", b"")
+
+    def test_rejects_non_utf8_csv(self):
+        with pytest.raises(BulkImportFileError):
+            read_table("scores.csv", "驗證碼".encode("big5"))
+
+
+class TestValidateRows:
+    def test_missing_required_column(self):
+        with pytest.raises(BulkImportFileError, match="student_name"):
+            validate_rows(_table({"verification_code": "A", "1-1": "1"}), COMPILED)
+
+    def test_unknown_question_column(self):
+        with pytest.raises(BulkImportFileError, match="9-9"):
+            validate_rows(_table(_row(**{"9-9": "1"})), COMPILED)
+
+    def test_no_question_columns(self):
+        with pytest.raises(BulkImportFileError, match="沒有任何題號欄位"):
+            validate_rows(_table({"verification_code": "A1", "student_name": "小明"}), COMPILED)
+
+    def test_blank_or_duplicate_header(self):
+        with pytest.raises(BulkImportFileError, match="第 3 欄空白"):
+            validate_rows(Table(header=["verification_code", "student_name", "", "1-1"], rows=[]), COMPILED)
+        with pytest.raises(BulkImportFileError, match="重複：1-1"):
+            validate_rows(Table(header=["verification_code", "student_name", "1-1", "1-1"], rows=[]), COMPILED)
+
+    def test_blank_cells_score_zero(self):
+        valid, errors = validate_rows(_table(_row(**{"1-2": "0.5"})), COMPILED)
+        assert errors == []
+        assert valid[0].scores[COMPILED.index["1-1"]] == 0.0
+        assert valid[0].scores[COMPILED.index["1-2"]] == 0.5
+        assert len(valid[0].scores) == len(COMPILED)
+
+    def test_bad_rows_do_not_block_good_rows(self):
+        rows = [
+            _row("A1"),
+            _row("A2", **{"1-1": "1.5"}),
+            _row("A3", **{"1-1": "abc"}),
+            _row("A1"),
+            _row("", "小華"),
+            _row("A4", ""),
+            _row("A5", **{"1-1": "1"}),
+        ]
+        valid, errors = validate_rows(_table(*rows), COMPILED)
+        assert [v.verification_code for v in valid] == ["A1", "A5"]
+        assert [e.row_number for e in errors] == [3, 4, 5, 6, 7]
+        assert "重複" in errors[2].error
+
+
+class TestAssessBatch:
+    def test_matches_generate_assessment(self):
+        rng = random.Random(5)
+        entries = []
+        for i in range(20):
+            vector = [rng.choice([0.0, 0.5, 1.0]) for _ in range(len(COMPILED))]
+            entries.append((f"學生{i}", vector))
+
+        batch = COMPILED.assess_batch(entries)
+
+        for (name, vector), assessment in zip(entries, batch):
+            submission = ExamSubmission(
+                student_name=name,
+                exam_id=COMPILED.exam_id,
+                results=[QuestionResult(question_id=q, score=s) for q, s in COMPILED.to_score_map(vector).items()],
+            )
+            assert assessment == generate_assessment(grade5_entrance_template, submission)
+
+
+@pytest.mark.skipif(TEST_DATABASE_URL is None, reason="需要設定 TEST_DATABASE_URL")
+class TestImportScoresOnPostgres:
+    @pytest.fixture()
+    async def pg_engine(self):
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        yield engine
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    @pytest.fixture()
+    async def seeded(self, pg_engine):
+        """建立教師、試卷與驗證碼：BULK001/002 未使用，BULK003/004 已有作答中的 session，OTHER001 屬於其他教師。"""
+        factory = async_sessionmaker(pg_engine, expire_on_commit=False)
+        async with factory() as db:
+            teacher = User(username="t1", hashed_password="x", display_name="T1", role="teacher")
+            other = User(username="t2", hashed_password="x", display_name="T2", role="teacher")
+            template = ExamTemplateRecord(exam_id=COMPILED.exam_id, name="小五入班檢測", template_data={})
+            db.add_all([teacher, other, template])
+            await db.flush()
+            codes = {}
+            for code, owner, status in [
+                ("BULK001", teacher, "unused"),
+                ("BULK002", teacher, "unused"),
+                ("BULK003", teacher, "in_progress"),
+                ("BULK004", teacher, "in_progress"),
+                ("OTHER001", other, "unused"),
+            ]:
+                codes[code] = VerificationCode(
+                    code=code, prefix=code[:-3], student_number=code[-3:],
+                    teacher_id=owner.id, exam_template_id=template.id, status=status,
+                )
+            db.add_all(codes.values())
+            await db.flush()
+            existing = {
+                code: ExamSession(
+                    verification_code_id=codes[code].id, student_name="線上生", exam_id=COMPILED.exam_id,
+                    answers={"results": [], "saved_at": 1.0},
+                )
+                for code in ("BULK003", "BULK004")
+            }
+            db.add_all(existing.values())
+            await db.commit()
+        return factory, teacher, {code: s.id for code, s in existing.items()}
+
+    async def test_creates_and_updates_in_batches(self, pg_engine, seeded):
+        factory, teacher, existing = seeded
+        rows = [
+            _row("BULK001", "新生一", **{"1-1": "1", "1-2": "0.5"}),
+            _row("BULK002", "新生二", **{"1-1": "0"}),
+            _row("BULK003", "舊生一", **{"1-1": "1"}),
+            _row("BULK004", "舊生二", **{"1-2": "1"}),
+            _row("OTHER001", "他班生"),
+            _row("NOPE001", "查無此碼"),
+        ]
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement.split(None, 3)[:3], executemany))
+
+        event.listen(pg_engine.sync_engine, "before_cursor_execute", _record)
+        try:
+            async with factory() as db:
+                report = await import_scores(db, teacher, COMPILED, _table(*rows))
+        finally:
+            event.remove(pg_engine.sync_engine, "before_cursor_execute", _record)
+
+        assert (report.created, report.updated) == (2, 2)
+        assert [(e.row_number, e.error) for e in report.errors] == [(6, "無權操作此驗證碼"), (7, "驗證碼不存在")]
+        # 固定的資料庫往返：查驗證碼、一次 INSERT、一次 UPDATE session、一次 UPDATE 驗證碼
+        assert [words[:2] for words, _ in statements] == [
+            ["SELECT", "verification_codes.id,"],
+            ["INSERT", "INTO"],
+            ["UPDATE", "exam_sessions"],
+            ["UPDATE", "verification_codes"],
+        ]
+        assert statements[2][1] is True  # 依主鍵的 executemany UPDATE
+
+        async with factory() as db:
+            sessions = {
+                row.code: row
+                for row in (await db.execute(
+                    select(VerificationCode.code, VerificationCode.status, ExamSession)
+                    .join(ExamSession, ExamSession.verification_code_id == VerificationCode.id)
+                )).all()
+            }
+            other_status = await db.scalar(select(VerificationCode.status).where(VerificationCode.code == "OTHER001"))
+
+        assert set(sessions) == {"BULK001", "BULK002", "BULK003", "BULK004"}
+        for code, row in sessions.items():
+            assert row.status == "completed"
+            assert row.ExamSession.status == "completed"
+            assert row.ExamSession.answers is None
+            assert row.ExamSession.assessment["student_name"] == row.ExamSession.student_name
+        new = sessions["BULK001"].ExamSession
+        assert new.student_name == "新生一"
+        assert new.scores[COMPILED.index["1-1"]] == 1.0
+        assert new.scores[COMPILED.index["1-2"]] == 0.5
+        assert sum(new.scores) == 1.5
+        updated = sessions["BULK003"].ExamSession
+        assert updated.id == existing["BULK003"]  # 既有 session 原地更新，不另建新列
+        assert updated.student_name == "舊生一"
+        assert updated.scores[COMPILED.index["1-1"]] == 1.0
+        assert other_status == "unused"
@@ -0,0 +1,227 @@
+"""測試驗證碼索引與查無限流：不存在的驗證碼不查詢資料庫，連續查無時回傳 429。"""
+
+import asyncio
+import os
+import runpy
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.auth import router as auth_module
+from app.auth.security import decode_access_token
+from app.core.rate_limit import SlidingWindowLimiter
+from app.db.engine import get_db
+from app.services.code_index import CodeIndex, decode_ranges, encode_ranges, split_code
+from tests.conftest import FakeDBSession
+
+STARTED_AT = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+
+
+class TestSplitCode:
+    def test_standard_code(self):
+        assert split_code("APEX5A001") == ("APEX5A", 1)
+        assert split_code("APEX5A999") == ("APEX5A", 999)
+
+    def test_invalid_codes(self):
+        assert split_code("001") is None
+        assert split_code("APEX5A000") is None
+        assert split_code("APEX5Aabc") is None
+        assert split_code("APEX5A１２３") is None
+
+
+class TestRanges:
+    def test_round_trip(self):
+        codes = [f"APEX5A{n:03d}" for n in (1, 2, 3, 7)] + ["B2025010"]
+        payload = encode_ranges(codes)
+        assert payload == "APEX5A:1-3;APEX5A:7-7;B2025:10-10"
+        assert sorted(decode_ranges(payload)) == sorted(codes)
+
+    def test_full_batch_fits_notify_payload(self):
+        payload = encode_ranges(f"LONGPREFIX12{n:03d}" for n in range(1, 1000))
+        assert payload == "LONGPREFIX12:1-999"
+
+
+class TestCodeIndex:
+    def test_passes_everything_until_ready(self):
+        index = CodeIndex()
+        assert index.might_exist("NOPE01001")
+
+    def test_exact_membership(self):
+        index = CodeIndex()
+        index.ready = True
+        index.add_many(["APEX5A001", "APEX5A030", "legacy"])
+        assert index.might_exist("APEX5A001")
+        assert index.might_exist("APEX5A030")
+        assert index.might_exist("legacy")
+        assert not index.might_exist("APEX5A002")
+        assert not index.might_exist("APEX5B001")
+        assert not index.might_exist("other")
+
+    def test_notify_payload_adds_codes(self):
+        index = CodeIndex()
+        index.ready = True
+        index.on_notify("APEX5A:5-6", session_factory=None)
+        assert index.might_exist("APEX5A006")
+        assert not index.might_exist("APEX5A007")
+
+
+    async def test_overlapping_rebuilds_keep_codes_added_meanwhile(self):
+        index = CodeIndex()
+        first_started, release_first = asyncio.Event(), asyncio.Event()
+
+        class _Stream:
+            def __init__(self, codes, wait=None):
+                self.codes, self.wait = codes, wait
+
+            def __aiter__(self):
+                return self._gen()
+
+            async def _gen(self):
+                if self.wait is not None:
+                    first_started.set()
+                    await self.wait.wait()
+                for code in self.codes:
+                    yield code
+
+        streams = [_Stream(["APEX5A001"], wait=release_first), _Stream(["APEX5A001"])]
+
+        class _Session:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def stream_scalars(self, stmt):
+                return streams.pop(0)
+
+        first = asyncio.create_task(index.rebuild(_Session))
+        await first_started.wait()
+        index.add_many(["APEX5A002"])  # 第一次重建進行中的新增
+        second = asyncio.create_task(index.rebuild(_Session))
+        await second
+        index.add_many(["APEX5A003"])
+        release_first.set()
+        await first
+
+        assert all(index.might_exist(f"APEX5A{n:03d}") for n in (1, 2, 3))
+        assert index._pending == []
+
+
+class TestSlidingWindowLimiter:
+    def test_blocks_after_limit_until_window_passes(self, monkeypatch):
+        now = 1000.0
+        monkeypatch.setattr("app.core.rate_limit.time.monotonic", lambda: now)
+        limiter = SlidingWindowLimiter(limit=2, window_seconds=60)
+        limiter.hit("ip")
+        assert limiter.retry_after("ip") is None
+        now = 1010.0
+        limiter.hit("ip")
+        assert limiter.retry_after("ip") == pytest.approx(50.0)
+        now = 1060.5
+        assert limiter.retry_after("ip") is None
+
+
+class TestVerifyCodeShortCircuit:
+    @pytest.fixture()
+    def db(self, monkeypatch):
+        index = CodeIndex()
+        index.ready = True
+        index.add_many(["APEX5A001"])
+        monkeypatch.setattr(auth_module, "code_index", index)
+        monkeypatch.setattr(auth_module, "_ip_misses", SlidingWindowLimiter(3, 60))
+        monkeypatch.setattr(auth_module, "_prefix_misses", SlidingWindowLimiter(100, 60))
+        return FakeDBSession()  # 未設定 row：查無驗證碼
+
+    def _client(self, db, headers=None):
+        app = FastAPI()
+        app.include_router(auth_module.router)
+
+        async def _db():
+            yield db
+
+        app.dependency_overrides[get_db] = _db
+        # 與正式部署相同：uvicorn 依 gunicorn.conf.py 的 forwarded_allow_ips 還原真實來源 IP
+        with mock.patch.dict(os.environ):  # gunicorn.conf.py 會設定 METRICS_DIR，讀完即還原
+            trusted = runpy.run_path("gunicorn.conf.py")["forwarded_allow_ips"]
+        asgi = ProxyHeadersMiddleware(app, trusted_hosts=trusted)
+        return AsyncClient(transport=ASGITransport(app=asgi), base_url="http://test", headers=headers)
+
+    async def test_unknown_code_rejected_without_db(self, db):
+        async with self._client(db) as client:
+            resp = await client.post("/api/auth/verify-code", json={"code": "APEX5A002", "student_name": "小明"})
+        assert resp.status_code == 404
+        assert db.calls == 0
+
+    async def test_repeated_misses_are_rate_limited(self, db):
+        async with self._client(db) as client:
+            for n in range(2, 5):
+                await client.post("/api/auth/verify-code", json={"code": f"APEX5A{n:03d}", "student_name": "x"})
+            resp = await client.post("/api/auth/verify-code", json={"code": "APEX5A005", "student_name": "x"})
+        assert resp.status_code == 429
+        assert int(resp.headers["Retry-After"]) >= 1
+        assert db.calls == 0
+
+    async def test_ip_limit_never_blocks_existing_code(self, db):
+        # 同一 NAT 出口的其他學生打錯達上限後，輸入正確驗證碼的學生仍可進入
+        db.row = SimpleNamespace(
+            id=uuid.uuid4(),
+            status="in_progress",
+            exam_id="grade5_entrance",
+            session_id=uuid.uuid4(),
+            started_at=STARTED_AT,
+        )
+        async with self._client(db) as client:
+            misses = [
+                (await client.post("/api/auth/verify-code", json={"code": f"APEX5A{n:03d}", "student_name": "x"})).status_code
+                for n in range(2, 6)
+            ]
+            resp = await client.post("/api/auth/verify-code", json={"code": "APEX5A001", "student_name": "小明"})
+        assert misses == [404, 404, 404, 429]
+        assert resp.status_code == 200
+
+    async def test_ip_limit_keys_on_forwarded_client(self, db):
+        attacker = self._client(db, {"X-Forwarded-For": "6.6.6.6, 203.0.113.1"})
+        student = self._client(db, {"X-Forwarded-For": "203.0.113.2"})
+        async with attacker, student:
+            for n in range(2, 5):
+                await attacker.post("/api/auth/verify-code", json={"code": f"APEX5A{n:03d}", "student_name": "x"})
+            blocked = await attacker.post("/api/auth/verify-code", json={"code": "APEX5A005", "student_name": "x"})
+            other = await student.post("/api/auth/verify-code", json={"code": "APEX5A005", "student_name": "x"})
+        assert blocked.status_code == 429
+        assert other.status_code == 404
+        assert db.calls == 0
+
+    async def test_prefix_limit_never_blocks_existing_code(self, monkeypatch):
+        index = CodeIndex()
+        index.ready = True
+        index.add_many(["APEX5A001"])
+        monkeypatch.setattr(auth_module, "code_index", index)
+        monkeypatch.setattr(auth_module, "_ip_misses", SlidingWindowLimiter(100, 60))
+        monkeypatch.setattr(auth_module, "_prefix_misses", SlidingWindowLimiter(2, 60))
+        row = SimpleNamespace(
+            id=uuid.uuid4(),
+            status="in_progress",
+            exam_id="grade5_entrance",
+            session_id=uuid.uuid4(),
+            started_at=STARTED_AT,
+        )
+        db = FakeDBSession(row)
+        async with self._client(db) as client:
+            misses = [
+                (await client.post("/api/auth/verify-code", json={"code": f"APEX5A{n:03d}", "student_name": "x"})).status_code
+                for n in range(2, 5)
+            ]
+            resp = await client.post("/api/auth/verify-code", json={"code": "APEX5A001", "student_name": "小明"})
+        assert misses == [404, 404, 429]
+        assert resp.status_code == 200
+        assert resp.json()["session_id"] == str(row.session_id)
+        # 權杖帶分區鍵 started_at，後續查詢才能只掃該月的分區
+        payload = decode_access_token(resp.json()["access_token"])
+        assert datetime.fromisoformat(payload["started_at"]) == STARTED_AT
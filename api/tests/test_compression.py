@@ -0,0 +1,119 @@
+"""測試回應壓縮中介層：編碼協商、大小門檻、串流壓縮與預先壓縮內容的放行。"""
+
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app.core import metrics
+from app.core.compression import CompressionMiddleware, _brotli, negotiate_encoding
+
+BIG = {"rows": [{"student_name": "小明", "score": i / 100} for i in range(200)]}
+
+
+def _client() -> AsyncClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    async def big():
+        return JSONResponse(BIG)
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/precompressed")
+    async def precompressed():
+        body = gzip.compress(b'{"pre": true}' * 100)
+        return Response(body, media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/csv")
+    async def csv():
+        async def rows():
+            yield "code,name\n"
+            for i in range(300):
+                yield f"APEX5A{i:03d},學生{i}\n"
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    @app.get("/binary")
+    async def binary():
+        return Response(b"\x00" * 5000, media_type="application/vnd.apache.parquet")
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("分析" * 1000)
+
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+class TestNegotiateEncoding:
+    def test_picks_gzip(self):
+        assert negotiate_encoding("gzip, deflate") == "gzip"
+
+    def test_respects_q_zero(self):
+        assert negotiate_encoding("gzip;q=0, identity") is None
+
+    def test_wildcard(self):
+        assert negotiate_encoding("*") == ("br" if _brotli() else "gzip")
+
+    def test_empty_header(self):
+        assert negotiate_encoding("") is None
+
+
+class TestCompressionMiddleware:
+    async def test_large_json_is_gzipped(self):
+        async with _client() as client:
+            resp = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.headers["vary"] == "Accept-Encoding"
+        assert int(resp.headers["content-length"]) < len(resp.content)
+        assert resp.json() == BIG
+
+    async def test_small_response_not_compressed(self):
+        async with _client() as client:
+            resp = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in resp.headers
+        assert resp.json() == {"ok": True}
+
+    async def test_no_accept_encoding_passes_through(self):
+        async with _client() as client:
+            resp = await client.get("/big", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in resp.headers
+
+    async def test_precompressed_not_recompressed(self):
+        async with _client() as client:
+            resp = await client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.content == b'{"pre": true}' * 100
+
+    async def test_streaming_csv_compressed_per_chunk(self):
+        async with _client() as client:
+            resp = await client.get("/csv", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "content-length" not in resp.headers
+        lines = resp.text.splitlines()
+        assert lines[0] == "code,name"
+        assert lines[-1] == "APEX5A299,學生299"
+
+    async def test_binary_formats_skipped(self):
+        async with _client() as client:
+            resp = await client.get("/binary", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in resp.headers
+
+    async def test_records_bytes_saved(self):
+        saved = metrics.counter("http_compression_bytes_saved_total")
+        before = saved.value
+        async with _client() as client:
+            await client.get("/text", headers={"Accept-Encoding": "gzip"})
+        assert saved.value - before > 2000
+
+    async def test_counts_compressed_responses(self):
+        responses = metrics.counter("http_compression_responses_total")
+        before = responses.value
+        async with _client() as client:
+            await client.get("/text", headers={"Accept-Encoding": "gzip"})
+            await client.get("/text", headers={"Accept-Encoding": "identity"})
+        assert responses.value - before == 1
@@ -1,3 +1,6 @@
+import asyncio
+from types import SimpleNamespace
+
 import pytest
 
 from app.domain.models import (
@@ -8,6 +11,7 @@ from app.domain.models import (
     SectionDefinition,
 )
 from app.domain.exam_registry import ExamRegistry
+from app.services.db_exam_registry import DbExamRegistry
 
 
 # ===========================================================================
@@ -99,3 +103,126 @@ class TestGrade5EntranceExam:
         reg = ExamRegistry()
         register_grade5_entrance(reg)
         assert reg.get("grade5_entrance") is not None
+
+
+# ===========================================================================
+# Compiled template: 分數向量與題目索引
+# ===========================================================================
+
+class TestCompiledTemplate:
+    @pytest.fixture()
+    def compiled(self, registry):
+        return registry.get_compiled("grade5_entrance")
+
+    def test_registry_caches_compiled(self, registry, compiled):
+        assert registry.get_compiled("grade5_entrance") is compiled
+
+    def test_get_compiled_nonexistent_returns_none(self, registry):
+        assert registry.get_compiled("nope") is None
+
+    def test_question_order_follows_sections(self, compiled, template):
+        assert compiled.question_ids == [q.question_id for q in template.get_all_questions()]
+        assert compiled.question_ids[0] == "1-1"
+        assert len(compiled) == 44
+
+    def test_to_vector_fills_unanswered_with_zero(self, compiled):
+        vector = compiled.to_vector({"1-2": 0.5, "10-3": 1.0})
+        assert len(vector) == 44
+        assert vector[compiled.index["1-2"]] == 0.5
+        assert vector[-1] == 1.0
+        assert sum(vector) == 1.5
+
+    def test_to_vector_invalid_id_raises(self, compiled):
+        with pytest.raises(ValueError, match="INVALID"):
+            compiled.to_vector({"INVALID": 1.0})
+
+    def test_round_trip(self, compiled):
+        vector = [i / 44 for i in range(44)]
+        assert compiled.to_vector(compiled.to_score_map(vector)) == vector
+
+    def test_to_score_map_length_mismatch_raises(self, compiled):
+        with pytest.raises(ValueError):
+            compiled.to_score_map([1.0, 0.0])
+
+
+# ===========================================================================
+# DB-backed registry（以假資料來源取代資料庫查詢）
+# ===========================================================================
+
+class FakeDbRegistry(DbExamRegistry):
+    """以記憶體中的 {exam_id: (template_data, content_hash)} 模擬 exam_templates。"""
+
+    def __init__(self, rows: dict):
+        super().__init__(session_factory=None, poll_seconds=0)
+        self.rows = rows
+        self.fetches = 0
+        self.gate: asyncio.Event | None = None
+
+    async def _fetch(self, exam_id):
+        self.fetches += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        row = self.rows.get(exam_id)
+        if row is None:
+            return None
+        return SimpleNamespace(template_data=row[0], compiled=None, content_hash=row[1])
+
+    async def _fetch_versions(self):
+        return [SimpleNamespace(exam_id=k, content_hash=v[1]) for k, v in self.rows.items()]
+
+
+class TestDbExamRegistry:
+    @pytest.fixture()
+    def db_registry(self, template):
+        return FakeDbRegistry({"grade5_entrance": (template.model_dump(mode="json"), "h1")})
+
+    async def test_loads_once_then_serves_from_cache(self, db_registry):
+        first = await db_registry.resolve("grade5_entrance")
+        second = await db_registry.resolve("grade5_entrance")
+        assert first is second
+        assert len(first) == 44
+        assert db_registry.fetches == 1
+        assert db_registry.get("grade5_entrance") is first.template
+
+    async def test_unknown_exam_returns_none(self, db_registry):
+        assert await db_registry.resolve("nope") is None
+
+    async def test_concurrent_resolves_share_one_query(self, db_registry):
+        db_registry.gate = asyncio.Event()
+        waiters = [asyncio.create_task(db_registry.resolve("grade5_entrance")) for _ in range(10)]
+        await asyncio.sleep(0)
+        db_registry.gate.set()
+        results = await asyncio.gather(*waiters)
+        assert db_registry.fetches == 1
+        assert all(r is results[0] for r in results)
+
+    async def test_unchanged_content_reuses_compiled(self, db_registry):
+        first = await db_registry.resolve("grade5_entrance")
+        db_registry.invalidate("grade5_entrance")
+        second = await db_registry.resolve("grade5_entrance")
+        assert db_registry.fetches == 2
+        assert second is first
+
+    async def test_changed_content_detected_by_version_check(self, db_registry, template):
+        first = await db_registry.resolve("grade5_entrance")
+        data = template.model_dump(mode="json")
+        data["name"] = "小五入班檢測（修訂）"
+        db_registry.rows["grade5_entrance"] = (data, "h2")
+
+        await db_registry.check_versions()
+        second = await db_registry.resolve("grade5_entrance")
+        assert second is not first
+        assert second.template.name == "小五入班檢測（修訂）"
+
+    async def test_invalidation_during_load_is_not_cached(self, db_registry):
+        db_registry.gate = asyncio.Event()
+        task = asyncio.create_task(db_registry.resolve("grade5_entrance"))
+        await asyncio.sleep(0)
+        db_registry.invalidate("grade5_entrance")
+        fresh = asyncio.create_task(db_registry.resolve("grade5_entrance"))
+        await asyncio.sleep(0)
+        db_registry.gate.set()
+        assert await task is not None
+        assert await fresh is not None
+        assert db_registry.fetches == 2
+        assert db_registry.get_compiled("grade5_entrance") is await fresh
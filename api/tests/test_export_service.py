@@ -0,0 +1,84 @@
+"""測試成績匯出：資料列攤平與 CSV / Parquet 串流。"""
+
+import csv
+import io
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.data.grade5_entrance import grade5_entrance_template
+from app.domain.models import ExamSubmission, QuestionResult
+from app.domain.scoring import generate_assessment
+from app.services.export_service import EXPORT_COLUMNS, flatten_row, iter_csv, iter_parquet
+
+
+def _row(name: str, completed: bool = True):
+    assessment = None
+    if completed:
+        submission = ExamSubmission(
+            student_name=name,
+            exam_id="grade5_entrance",
+            results=[QuestionResult(question_id="1-1", score=1.0)],
+        )
+        assessment = generate_assessment(grade5_entrance_template, submission).model_dump(mode="json")
+    return SimpleNamespace(
+        session_id=uuid.uuid4(),
+        code="APEX5A001",
+        student_name=name,
+        exam_id="grade5_entrance",
+        status="completed" if completed else "in_progress",
+        started_at=datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc),
+        completed_at=datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc) if completed else None,
+        assessment=assessment,
+    )
+
+
+async def _batches(*batches):
+    for b in batches:
+        yield b
+
+
+async def _collect(chunks) -> bytes:
+    return b"".join([c async for c in chunks])
+
+
+class TestFlattenRow:
+    def test_has_all_columns(self):
+        assert len(flatten_row(_row("小明"))) == len(EXPORT_COLUMNS) == 7 + 10 + 4
+
+    def test_scores_in_category_columns(self):
+        values = dict(zip(EXPORT_COLUMNS, flatten_row(_row("小明"))))
+        assert values["正整數"] == 1.0
+        assert values["小數"] == 0.0
+
+    def test_in_progress_has_empty_scores(self):
+        values = flatten_row(_row("小華", completed=False))
+        assert values[7:] == [None] * 14
+
+
+class TestCsvExport:
+    async def test_streams_header_then_rows(self):
+        chunks = [c async for c in iter_csv(_batches([_row("A"), _row("B")], [_row("C")]))]
+        assert len(chunks) == 3  # header + 每批一塊
+        text = b"".join(chunks).decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(text)))
+        assert rows[0] == EXPORT_COLUMNS
+        assert [r[2] for r in rows[1:]] == ["A", "B", "C"]
+
+    async def test_starts_with_bom(self):
+        data = await _collect(iter_csv(_batches()))
+        assert data.startswith(b"\xef\xbb\xbf")
+
+
+class TestParquetExport:
+    async def test_row_groups_per_batch(self):
+        pq = pytest.importorskip("pyarrow.parquet")
+        data = await _collect(iter_parquet(_batches([_row("A"), _row("B")], [_row("C", completed=False)])))
+        parquet_file = pq.ParquetFile(io.BytesIO(data))
+        assert parquet_file.metadata.num_row_groups == 2
+        table = parquet_file.read()
+        assert table.column_names == EXPORT_COLUMNS
+        assert table.column("student_name").to_pylist() == ["A", "B", "C"]
+        assert table.column("正整數").to_pylist() == [1.0, 1.0, None]
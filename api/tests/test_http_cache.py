@@ -0,0 +1,161 @@
+"""測試試卷與結果端點的 ETag / 304 與預先壓縮的回應內容。"""
+
+import gzip
+import json
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from fastapi import FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+
+from app.api import student_router as student_module
+from app.api.http_cache import etag_matches, exam_content_response, template_body
+from app.auth.security import create_access_token
+from app.db.engine import get_db, get_read_db
+from tests.conftest import FakeDBSession
+
+
+class TestTemplateEndpoint:
+    async def test_returns_etag_and_template(self, client, template):
+        resp = await client.get("/api/exams/grade5_entrance")
+        assert resp.status_code == 200
+        assert resp.headers["etag"].startswith('"')
+        assert resp.headers["cache-control"] == "public, no-cache"
+        assert resp.json()["exam_id"] == template.exam_id
+        assert len(resp.json()["sections"]) == len(template.sections)
+
+    async def test_if_none_match_returns_304(self, client):
+        etag = (await client.get("/api/exams/grade5_entrance")).headers["etag"]
+        resp = await client.get("/api/exams/grade5_entrance", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        assert resp.headers["etag"] == etag
+
+    async def test_serves_precompressed_gzip(self, client):
+        resp = await client.get("/api/exams/grade5_entrance", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.json()["exam_id"] == "grade5_entrance"
+
+    async def test_bytes_cached_per_template(self, registry):
+        compiled = registry.get_compiled("grade5_entrance")
+        assert template_body(compiled) is template_body(compiled)
+
+
+class TestExamContentResponse:
+    def _app(self, compiled):
+        app = FastAPI()
+
+        @app.get("/content/{session_id}")
+        async def content(session_id: str, request: Request):
+            return exam_content_response(request, compiled, session_id, "小明")
+
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    async def test_gzip_prefix_matches_plain_body(self, registry):
+        compiled = registry.get_compiled("grade5_entrance")
+        async with self._app(compiled) as client:
+            plain = await client.get("/content/s-1", headers={"Accept-Encoding": "identity"})
+            zipped = await client.get("/content/s-1", headers={"Accept-Encoding": "gzip"})
+        assert zipped.headers["content-encoding"] == "gzip"
+        assert zipped.json() == plain.json()
+
+        data = plain.json()
+        assert set(data) == {"template", "exam_id", "name", "session_id", "student_name"}
+        assert (data["session_id"], data["student_name"]) == ("s-1", "小明")
+        assert data["template"]["exam_id"] == "grade5_entrance"
+
+    async def test_etag_differs_per_session(self, registry):
+        compiled = registry.get_compiled("grade5_entrance")
+        async with self._app(compiled) as client:
+            a = (await client.get("/content/s-1")).headers["etag"]
+            b = (await client.get("/content/s-2")).headers["etag"]
+            again = await client.get("/content/s-1", headers={"If-None-Match": f'W/{a}, "other"'})
+        assert a != b
+        assert again.status_code == 304
+
+    def test_gzip_body_is_valid_single_member(self, registry):
+        compiled = registry.get_compiled("grade5_entrance")
+        cached = template_body(compiled)
+        assert gzip.decompress(cached.gzip) == cached.body
+        assert json.loads(cached.body)["exam_id"] == "grade5_entrance"
+
+
+class TestResultEndpoint:
+    def _client(self, row, db=None):
+        app = FastAPI()
+        app.include_router(student_module.router)
+
+        async def _db():
+            yield db if db is not None else FakeDBSession(row)
+
+        app.dependency_overrides[get_read_db] = _db
+        app.dependency_overrides[get_db] = _db
+        return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    def _row(self, status, completed_at=None):
+        return SimpleNamespace(
+            id=uuid.uuid4(),
+            student_name="小明",
+            exam_id="grade5_entrance",
+            status=status,
+            assessment={"ok": True} if status == "completed" else None,
+            ai_analysis=None,
+            completed_at=completed_at,
+        )
+
+    def _headers(self, row, **extra):
+        token = create_access_token({"type": "student_session", "session_id": str(row.id)})
+        return {"Authorization": f"Bearer {token}", **extra}
+
+    async def test_completed_result_revalidates_with_304(self):
+        row = self._row("completed", datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc))
+        async with self._client(row) as client:
+            first = await client.get(f"/api/student/result/{row.id}", headers=self._headers(row))
+            second = await client.get(
+                f"/api/student/result/{row.id}",
+                headers=self._headers(row, **{"If-None-Match": first.headers["etag"]}),
+            )
+        assert first.status_code == 200
+        assert first.json()["assessment"] == {"ok": True}
+        assert second.status_code == 304
+
+    async def test_rescoring_changes_etag(self):
+        row = self._row("completed", datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc))
+        async with self._client(row) as client:
+            before = (await client.get(f"/api/student/result/{row.id}", headers=self._headers(row))).headers["etag"]
+            row.completed_at = datetime(2026, 10, 2, 9, 0, tzinfo=timezone.utc)
+            after = await client.get(
+                f"/api/student/result/{row.id}",
+                headers=self._headers(row, **{"If-None-Match": before}),
+            )
+        assert after.status_code == 200
+        assert after.headers["etag"] != before
+
+    async def test_in_progress_result_has_no_etag(self):
+        row = self._row("in_progress")
+        async with self._client(row) as client:
+            resp = await client.get(f"/api/student/result/{row.id}", headers=self._headers(row))
+        assert resp.status_code == 200
+        assert "etag" not in resp.headers
+
+
+def test_etag_matches_wildcard():
+    request = SimpleNamespace(headers={"if-none-match": "*"})
+    assert etag_matches(request, '"abc"')
+
+    async def test_lookup_includes_partition_key_from_token(self):
+        row = self._row("in_progress")
+        db = FakeDBSession(row)
+        started_at = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+        token = create_access_token(
+            {"type": "student_session", "session_id": str(row.id), "started_at": started_at.isoformat()}
+        )
+        async with self._client(row, db) as client:
+            resp = await client.get(f"/api/student/result/{row.id}", headers={"Authorization": f"Bearer {token}"})
+            # 舊權杖沒有 started_at，退回只以 id 查詢
+            await client.get(f"/api/student/result/{row.id}", headers=self._headers(row))
+        assert resp.status_code == 200
+        with_key, without_key = (str(stmt.compile()) for stmt in db.statements)
+        assert "exam_sessions.started_at = " in with_key
+        assert "exam_sessions.started_at = " not in without_key
@@ -0,0 +1,49 @@
+"""測試 orjson 列表輸出與 pydantic response_model 輸出一致，以及列表查詢的欄位。"""
+
+import json
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from pydantic import TypeAdapter
+
+from app.api.admin_router import SessionSummaryOut
+from app.api.json_response import FastJSONResponse, rows_response
+from app.api.teacher_router import SessionOut
+from app.repositories.session_repo import list_session_rows
+from tests.conftest import FakeDBSession
+
+
+class TestRowsResponse:
+    def test_matches_pydantic_output(self):
+        row_type = namedtuple("Row", list(SessionOut.model_fields))
+        rows = [
+            row_type(uuid.uuid4(), "小明", "grade5_entrance", "APEX5A001", "completed",
+                     datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc),
+                     datetime(2026, 10, 1, 9, 50, 12, 345678, tzinfo=timezone.utc)),
+            row_type(uuid.uuid4(), "小華", "grade5_entrance", "", "in_progress",
+                     datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc), None),
+        ]
+        expected = TypeAdapter(list[SessionOut]).dump_json(
+            [SessionOut(**{**r._asdict(), "session_id": str(r.session_id)}) for r in rows]
+        )
+        assert rows_response(rows).body == expected
+
+    def test_default_response_class_uses_utc_z(self):
+        body = FastJSONResponse({"at": datetime(2026, 10, 1, tzinfo=timezone.utc)}).body
+        assert json.loads(body) == {"at": "2026-10-01T00:00:00Z"}
+
+
+class TestListSessionRows:
+    async def test_selects_only_output_fields(self):
+        db = FakeDBSession(rows=[])
+        await list_session_rows(db, SessionSummaryOut.model_fields, exam_id="grade5_entrance")
+        stmt = db.statements[0]
+        assert list(stmt.selected_columns.keys()) == list(SessionSummaryOut.model_fields)
+        assert "assessment" not in str(stmt)
+
+    async def test_teacher_filter(self):
+        db = FakeDBSession(rows=[])
+        teacher_id = uuid.uuid4()
+        await list_session_rows(db, SessionOut.model_fields, teacher_id)
+        assert "verification_codes.teacher_id" in str(db.statements[0])
@@ -0,0 +1,174 @@
+"""測試指標登錄表的直方圖與標籤、Prometheus 文字輸出、請求中介層與 SQL 查詢計時。"""
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api import metrics_router as metrics_module
+from app.core import metrics
+from app.core.request_metrics import RequestMetricsMiddleware
+from app.db.query_metrics import instrument_engine
+from app.services.analysis_service import generate_ai_analysis
+from tests.test_analysis_service import FakeLLMClient, _make_result
+
+
+def _sample(name: str, **labels: str) -> float | None:
+    """從 Prometheus 輸出中取出指定樣本的值。"""
+    prefix = name + ("{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else "")
+    for line in metrics.render_prometheus().splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestRegistry:
+    def test_histogram_buckets_are_cumulative(self):
+        h = metrics.histogram("test_histogram_seconds", "測試", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            h.observe(value)
+        assert h.cumulative()[-3:] == [(0.1, 1), (1.0, 3), (float("inf"), 4)]
+        assert _sample("test_histogram_seconds_bucket", le="+Inf") == 4
+        assert _sample("test_histogram_seconds_sum") == pytest.approx(4.05)
+
+    def test_labeled_family_keeps_children_separate(self):
+        family = metrics.counter("test_labeled_total", "測試", ("kind",))
+        family.labels("a").inc()
+        family.labels("a").inc()
+        family.labels("b").inc()
+        assert _sample("test_labeled_total", kind="a") == 2
+        assert _sample("test_labeled_total", kind="b") == 1
+
+    def test_label_values_are_escaped(self):
+        metrics.counter("test_escaped_total", "測試", ("path",)).labels('a"b\\c').inc()
+        assert 'test_escaped_total{path="a\\"b\\\\c"} 1' in metrics.render_prometheus()
+
+    def test_type_mismatch_rejected(self):
+        metrics.counter("test_kind_total")
+        with pytest.raises(TypeError):
+            metrics.histogram("test_kind_total")
+
+    def test_wrong_label_count_rejected(self):
+        with pytest.raises(ValueError):
+            metrics.counter("test_arity_total", "", ("a", "b")).labels("x")
+
+    def test_snapshot_skips_histograms_and_families(self):
+        metrics.histogram("test_snapshot_seconds")
+        snapshot = metrics.snapshot()
+        assert "test_snapshot_seconds" not in snapshot
+        assert "test_labeled_total" not in snapshot
+
+    def test_collectors_run_before_output(self):
+        g = metrics.gauge("test_collected")
+        metrics.add_collector(lambda: g.set(42))
+        assert metrics.snapshot()["test_collected"] == 42
+
+
+@pytest.fixture()
+async def db_engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine, "test")
+    yield engine
+    await engine.dispose()
+
+
+def _client(db_engine) -> AsyncClient:
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+    app.include_router(metrics_module.router)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        async with db_engine.connect() as conn:
+            for _ in range(3):
+                await conn.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return AsyncClient(transport=ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test")
+
+
+class TestRequestMetrics:
+    async def test_route_template_used_as_label(self, db_engine):
+        before = _sample("http_requests_total", method="GET", route="/items/{item_id}", status="200") or 0
+        async with _client(db_engine) as client:
+            await client.get("/items/1")
+            await client.get("/items/2")
+        after = _sample("http_requests_total", method="GET", route="/items/{item_id}", status="200")
+        assert after - before == 2
+        assert _sample("http_request_duration_seconds_count", method="GET", route="/items/{item_id}") >= 2
+
+    async def test_unmatched_paths_share_one_label(self, db_engine):
+        async with _client(db_engine) as client:
+            await client.get("/no/such/a")
+            await client.get("/no/such/b")
+        text_out = metrics.render_prometheus()
+        assert 'route="unmatched",status="404"' in text_out
+        assert "/no/such" not in text_out
+
+    async def test_exception_counted_as_500(self, db_engine):
+        async with _client(db_engine) as client:
+            resp = await client.get("/boom")
+        assert resp.status_code == 500
+        assert _sample("http_request_exceptions_total", method="GET", route="/boom") >= 1
+        assert _sample("http_requests_total", method="GET", route="/boom", status="500") >= 1
+
+    async def test_queries_attributed_to_route(self, db_engine):
+        before = _sample("db_route_queries_total", route="/items/{item_id}") or 0
+        async with _client(db_engine) as client:
+            await client.get("/items/1")
+        assert _sample("db_route_queries_total", route="/items/{item_id}") - before == 3
+        assert _sample("db_route_query_seconds_total", route="/items/{item_id}") > 0
+        assert _sample("db_query_duration_seconds_count", engine="test") >= 3
+
+    async def test_queries_outside_requests_not_attributed(self, db_engine):
+        before = _sample("db_query_duration_seconds_count", engine="test") or 0
+        async with db_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        assert _sample("db_query_duration_seconds_count", engine="test") - before == 1
+
+    async def test_failed_query_counted(self, db_engine):
+        before = _sample("db_query_errors_total", engine="test") or 0
+        async with db_engine.connect() as conn:
+            with pytest.raises(Exception):
+                await conn.execute(text("SELECT * FROM missing_table"))
+            await conn.execute(text("SELECT 1"))
+        assert _sample("db_query_errors_total", engine="test") - before == 1
+
+
+class TestMetricsEndpoint:
+    async def test_prometheus_text_format(self, db_engine, monkeypatch):
+        monkeypatch.setattr(metrics_module.settings, "metrics_token", "s3cret")
+        async with _client(db_engine) as client:
+            resp = await client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE http_request_duration_seconds histogram" in resp.text
+
+    async def test_token_required_when_configured(self, db_engine, monkeypatch):
+        monkeypatch.setattr(metrics_module.settings, "metrics_token", "s3cret")
+        async with _client(db_engine) as client:
+            assert (await client.get("/metrics")).status_code == 401
+            bad = await client.get("/metrics", headers={"Authorization": "Bearer nope"})
+            good = await client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        assert bad.status_code == 401
+        assert good.status_code == 200
+
+    async def test_disabled_without_token(self, db_engine, monkeypatch):
+        monkeypatch.setattr(metrics_module.settings, "metrics_token", None)
+        async with _client(db_engine) as client:
+            resp = await client.get("/metrics", headers={"Authorization": "Bearer "})
+        assert resp.status_code == 404
+
+
+class TestLLMMetrics:
+    async def test_outcomes_recorded(self):
+        before = _sample("llm_requests_total", outcome="invalid_response") or 0
+        with pytest.raises(ValueError):
+            await generate_ai_analysis(_make_result(), FakeLLMClient("not json"))
+        assert _sample("llm_requests_total", outcome="invalid_response") - before == 1
+        assert _sample("llm_request_duration_seconds_count") >= 1
@@ -0,0 +1,78 @@
+"""測試多 worker 指標彙總：狀態匯出與加總、worker 檔案讀取、結束 worker 的計數保留。"""
+
+import json
+
+from app.core import metrics
+from app.core.metrics_multiprocess import MetricsFileExporter, clear_directory, render_all
+
+
+def _worker_state(requests: float, in_flight: float, latencies: list[float]) -> dict:
+    """模擬另一個 worker 匯出的狀態。"""
+    counts = [0, 0, 0]
+    for v in latencies:
+        counts[0 if v <= 0.1 else 1 if v <= 1.0 else 2] += 1
+    return {
+        "mp_requests_total": {
+            "type": "counter", "help": "", "labels": ["route"], "samples": [[["/a"], requests]],
+        },
+        "mp_in_flight": {"type": "gauge", "help": "", "labels": [], "samples": [[[], in_flight]]},
+        "mp_latency_seconds": {
+            "type": "histogram", "help": "", "labels": [], "buckets": [0.1, 1.0],
+            "samples": [[[], {"counts": counts, "sum": sum(latencies)}]],
+        },
+    }
+
+
+def _value(text: str, sample: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{sample} not found")
+
+
+class TestMergeStates:
+    def test_counters_gauges_and_histograms_are_summed(self):
+        merged = metrics.merge_states([_worker_state(3, 1, [0.05, 2.0]), _worker_state(4, 2, [0.5])])
+        text = metrics.render_state(merged)
+        assert _value(text, 'mp_requests_total{route="/a"}') == 7
+        assert _value(text, "mp_in_flight") == 3
+        assert _value(text, 'mp_latency_seconds_bucket{le="0.1"}') == 1
+        assert _value(text, 'mp_latency_seconds_bucket{le="1"}') == 2
+        assert _value(text, 'mp_latency_seconds_bucket{le="+Inf"}') == 3
+        assert _value(text, "mp_latency_seconds_count") == 3
+
+    def test_export_round_trips_through_json(self):
+        metrics.histogram("mp_local_seconds", "測試").observe(0.2)
+        state = json.loads(json.dumps(metrics.export_state()))
+        assert metrics.render_state(metrics.merge_states([state])) == metrics.render_prometheus()
+
+
+class TestWorkerFiles:
+    def test_render_all_adds_other_workers(self, tmp_path):
+        (tmp_path / "worker-1.json").write_text(json.dumps(_worker_state(5, 1, [])))
+        (tmp_path / "worker-2.json").write_text(json.dumps(_worker_state(6, 1, [])))
+        text = render_all(tmp_path)
+        assert _value(text, 'mp_requests_total{route="/a"}') == 11
+
+    def test_own_file_not_counted_twice(self, tmp_path):
+        exporter = MetricsFileExporter(tmp_path)
+        counter = metrics.counter("mp_own_total")
+        counter.inc(2)
+        exporter.write()
+        assert _value(render_all(tmp_path, exporter.path), "mp_own_total") == counter.value
+
+    def test_retired_worker_keeps_counters_and_drops_gauges(self, tmp_path):
+        metrics.counter("mp_retired_total").inc(5)
+        metrics.gauge("mp_retired_gauge").set(9)
+        exporter = MetricsFileExporter(tmp_path)
+        exporter.write()
+        exporter.retire()
+        assert not exporter.path.exists()
+        dead = json.loads((tmp_path / "dead.json").read_text())
+        assert "mp_retired_total" in dead
+        assert "mp_retired_gauge" not in dead
+
+    def test_clear_directory(self, tmp_path):
+        (tmp_path / "worker-1.json").write_text("{}")
+        clear_directory(tmp_path)
+        assert list(tmp_path.iterdir()) == []
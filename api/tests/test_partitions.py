@@ -0,0 +1,87 @@
+"""測試 exam_sessions 月分區的命名與月份計算，以及分區的建立與列舉。
+
+建立分區需要真實 PostgreSQL，設定 TEST_DATABASE_URL 指向「專用」測試資料庫才會執行。
+"""
+
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.partitions import (
+    add_months,
+    create_month_partition,
+    ensure_session_partitions,
+    list_month_partitions,
+    month_start,
+    partition_month,
+    partition_name,
+)
+from app.db.models import Base
+from tests.test_archive_service import TEST_DATABASE_URL, add_sessions
+
+
+class TestMonthArithmetic:
+    def test_month_start(self):
+        assert month_start(date(2026, 10, 19)) == date(2026, 10, 1)
+
+    @pytest.mark.parametrize(
+        ("start", "months", "expected"),
+        [
+            (date(2026, 10, 1), 1, date(2026, 11, 1)),
+            (date(2026, 11, 15), 2, date(2027, 1, 1)),
+            (date(2026, 1, 31), -1, date(2025, 12, 1)),
+            (date(2026, 12, 1), 12, date(2027, 12, 1)),
+        ],
+    )
+    def test_add_months(self, start, months, expected):
+        assert add_months(start, months) == expected
+
+
+class TestPartitionNames:
+    def test_partition_name(self):
+        assert partition_name(date(2026, 3, 1)) == "exam_sessions_2026_03"
+
+    def test_round_trip(self):
+        assert partition_month(partition_name(date(2025, 12, 1))) == date(2025, 12, 1)
+
+    @pytest.mark.parametrize("name", ["exam_sessions_default", "exam_sessions", "exam_sessions_2026_3"])
+    def test_non_monthly_names(self, name):
+        assert partition_month(name) is None
+
+
+@pytest.mark.skipif(TEST_DATABASE_URL is None, reason="需要設定 TEST_DATABASE_URL")
+class TestPartitionsOnPostgres:
+    @pytest.fixture()
+    async def pg_engine(self):
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        yield engine
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    async def test_ensure_creates_current_and_future_months_once(self, pg_engine):
+        async with pg_engine.begin() as conn:
+            created = await ensure_session_partitions(conn, months_ahead=2, today=date(2026, 11, 19))
+            again = await ensure_session_partitions(conn, months_ahead=2, today=date(2026, 11, 19))
+            listed = await list_month_partitions(conn)
+        assert created == ["exam_sessions_2026_11", "exam_sessions_2026_12", "exam_sessions_2027_01"]
+        assert again == []
+        assert listed == [(name, partition_month(name)) for name in created]
+
+    async def test_new_partition_takes_rows_from_default(self, pg_engine):
+        await add_sessions(
+            pg_engine, [datetime(2025, 3, 1, tzinfo=timezone.utc), datetime(2025, 3, 31, 23, 59, tzinfo=timezone.utc),
+                        datetime(2025, 4, 1, tzinfo=timezone.utc)],
+        )
+        async with pg_engine.begin() as conn:
+            assert await create_month_partition(conn, date(2025, 3, 1)) is True
+            assert await create_month_partition(conn, date(2025, 3, 1)) is False
+            moved = await conn.scalar(text('SELECT count(*) FROM "exam_sessions_2025_03"'))
+            left = await conn.scalar(text("SELECT count(*) FROM exam_sessions_default"))
+            total = await conn.scalar(text("SELECT count(*) FROM exam_sessions"))
+        assert (moved, left, total) == (2, 1, 3)
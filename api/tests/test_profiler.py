@@ -0,0 +1,101 @@
+"""測試隨選剖析：只剖析管理者帶 X-Profile 的請求、folded stacks 內容與 SQL 紀錄。"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.auth.security import create_access_token
+from app.core import profiler
+from app.core.profiler import PROFILE_ID_HEADER, ProfilingMiddleware
+from app.core.request_metrics import RequestMetricsMiddleware
+from app.db.query_metrics import instrument_engine
+
+
+def _busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture()
+async def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler.settings, "profile_dir", str(tmp_path))
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine, "profile-test")
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, interval=0.002)
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/slow/{item_id}")
+    async def slow_endpoint(item_id: int):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+        await asyncio.sleep(0.05)
+        _busy(0.05)
+        return {"id": item_id}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+    await engine.dispose()
+
+
+def _headers(role: str, profile: bool = True) -> dict[str, str]:
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'u-1', 'role': role})}"}
+    if profile:
+        headers["X-Profile"] = "1"
+    return headers
+
+
+class TestProfilingMiddleware:
+    async def test_admin_request_is_profiled(self, client):
+        resp = await client.get("/slow/1", headers=_headers("admin"))
+        assert resp.json() == {"id": 1}
+        profile_id = resp.headers[PROFILE_ID_HEADER]
+
+        record = profiler.load_profile(profile_id)
+        assert record["route"] == "/slow/{item_id}"
+        assert record["status"] == 200
+        assert [q["statement"] for q in record["queries"]] == ["SELECT 1", "SELECT 2"]
+        assert record["samples"] > 10
+
+        folded = profiler.load_folded(profile_id)
+        stacks = [line.rsplit(" ", 1)[0] for line in folded.splitlines()]
+        assert any("slow_endpoint" in s and s.endswith(profiler.AWAIT_MARKER) for s in stacks)
+        assert any("slow_endpoint" in s and "_busy" in s for s in stacks)
+
+    async def test_non_admin_header_ignored(self, client, tmp_path):
+        resp = await client.get("/slow/1", headers=_headers("teacher"))
+        assert resp.status_code == 200
+        assert PROFILE_ID_HEADER not in resp.headers
+        assert list(tmp_path.iterdir()) == []
+
+    async def test_no_header_not_profiled(self, client, tmp_path):
+        resp = await client.get("/slow/1", headers=_headers("admin", profile=False))
+        assert PROFILE_ID_HEADER not in resp.headers
+        assert list(tmp_path.iterdir()) == []
+
+    async def test_list_profiles_omits_queries(self, client):
+        await client.get("/slow/1", headers=_headers("admin"))
+        await client.get("/slow/2", headers=_headers("admin"))
+        summaries = profiler.list_profiles()
+        assert len(summaries) == 2
+        assert all("queries" not in s and s["query_count"] == 2 for s in summaries)
+
+
+class TestProfileStorage:
+    def test_invalid_ids_rejected(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiler.settings, "profile_dir", str(tmp_path))
+        (tmp_path / "secret.json").write_text("{}")
+        assert profiler.load_profile("../secret") is None
+        assert profiler.load_folded("secret") is None
+
+    def test_fold_format(self):
+        samples = profiler.collections.Counter({"a;b": 3, "a": 1})
+        assert profiler.fold(samples) == "a 1\na;b 3\n"
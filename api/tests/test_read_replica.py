@@ -0,0 +1,92 @@
+"""測試唯讀副本路由與 read-your-writes 保護（以假 session 模擬主庫與副本）。"""
+
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.api import student_router as student_module
+from app.auth.security import create_access_token
+from app.core.config import settings
+from app.db.engine import get_db, get_read_db
+from tests.conftest import FakeDBSession
+
+
+def _session_row(status: str):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        completed_at=datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc) if status == "completed" else None,
+        student_name="小明",
+        exam_id="grade5_entrance",
+        status=status,
+        assessment={"ok": True} if status == "completed" else None,
+        ai_analysis=None,
+    )
+
+
+def _make_client(replica: FakeDBSession, primary: FakeDBSession):
+    app = FastAPI()
+    app.include_router(student_module.router)
+
+    async def _read_db():
+        yield replica
+
+    async def _db():
+        yield primary
+
+    app.dependency_overrides[get_read_db] = _read_db
+    app.dependency_overrides[get_db] = _db
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.fixture()
+def session_id():
+    return str(uuid.uuid4())
+
+
+@pytest.fixture()
+def headers(session_id):
+    token = create_access_token({"type": "student_session", "session_id": session_id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture()
+def with_replica(monkeypatch):
+    monkeypatch.setattr(student_module, "has_read_replica", lambda: True)
+
+
+class TestExamResultReadRouting:
+    async def test_completed_on_replica_skips_primary(self, with_replica, session_id, headers):
+        replica, primary = FakeDBSession(_session_row("completed")), FakeDBSession(None)
+        resp = await _make_client(replica, primary).get(f"/api/student/result/{session_id}", headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["status"] == "completed"
+        assert (replica.calls, primary.calls) == (1, 0)
+
+    async def test_stale_replica_falls_back_to_primary(self, with_replica, session_id, headers):
+        replica, primary = FakeDBSession(_session_row("in_progress")), FakeDBSession(_session_row("completed"))
+        resp = await _make_client(replica, primary).get(f"/api/student/result/{session_id}", headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["status"] == "completed"
+        assert primary.calls == 1
+
+    async def test_missing_on_replica_falls_back_to_primary(self, with_replica, session_id, headers):
+        replica, primary = FakeDBSession(None), FakeDBSession(_session_row("completed"))
+        resp = await _make_client(replica, primary).get(f"/api/student/result/{session_id}", headers=headers)
+        assert resp.status_code == 200
+
+    async def test_guard_disabled_returns_replica_row(self, with_replica, monkeypatch, session_id, headers):
+        monkeypatch.setattr(settings, "read_your_writes", False)
+        replica, primary = FakeDBSession(_session_row("in_progress")), FakeDBSession(_session_row("completed"))
+        resp = await _make_client(replica, primary).get(f"/api/student/result/{session_id}", headers=headers)
+        assert resp.json()["status"] == "in_progress"
+        assert primary.calls == 0
+
+    async def test_without_replica_never_double_reads(self, session_id, headers):
+        replica, primary = FakeDBSession(_session_row("in_progress")), FakeDBSession(None)
+        resp = await _make_client(replica, primary).get(f"/api/student/result/{session_id}", headers=headers)
+        assert resp.json()["status"] == "in_progress"
+        assert primary.calls == 0
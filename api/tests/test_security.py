@@ -0,0 +1,106 @@
+"""測試安全工具：密碼雜湊走執行緒池並於 cost 變更時重新雜湊；JWT 解碼快取。"""
+
+import asyncio
+import time
+
+import pytest
+from passlib.context import CryptContext
+
+from app.auth import security
+from app.auth.token_cache import TokenCache
+
+
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(
+        schemes=["bcrypt"],
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fast_context(monkeypatch):
+    """測試改用低 cost，避免每次雜湊耗時數百毫秒。"""
+    monkeypatch.setattr(security, "pwd_context", _context(4))
+
+
+class TestPasswordHashing:
+    async def test_hash_and_verify(self):
+        hashed = await security.hash_password("s3cret")
+        assert hashed.startswith("$2b$04$")
+        assert await security.verify_password("s3cret", hashed)
+        assert not await security.verify_password("wrong", hashed)
+
+    async def test_same_cost_needs_no_rehash(self):
+        hashed = await security.hash_password("s3cret")
+        assert await security.verify_and_rehash("s3cret", hashed) == (True, None)
+
+    async def test_changed_cost_rehashes_on_verify(self):
+        old_hash = _context(5).hash("s3cret")
+        valid, new_hash = await security.verify_and_rehash("s3cret", old_hash)
+        assert valid
+        assert new_hash is not None and new_hash.startswith("$2b$04$")
+
+    async def test_wrong_password_never_rehashes(self):
+        old_hash = _context(5).hash("s3cret")
+        assert await security.verify_and_rehash("wrong", old_hash) == (False, None)
+
+    async def test_event_loop_keeps_running_while_hashing(self, monkeypatch):
+        monkeypatch.setattr(security, "pwd_context", _context(10))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.gather(*(security.hash_password("s3cret") for _ in range(4)))
+        task.cancel()
+        assert ticks > 5
+
+
+class TestTokenCache:
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        cache = TokenCache(max_entries=2)
+        monkeypatch.setattr(security, "token_cache", cache)
+        return cache
+
+    def test_second_decode_skips_verification(self, monkeypatch):
+        token = security.create_access_token({"sub": "s-1", "type": "student_session"})
+        calls = 0
+        real_decode = security.jwt.decode
+
+        def counting_decode(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            return real_decode(*args, **kwargs)
+
+        monkeypatch.setattr(security.jwt, "decode", counting_decode)
+        first = security.decode_access_token(token)
+        second = security.decode_access_token(token)
+        assert first == second and first["sub"] == "s-1"
+        assert calls == 1
+
+    def test_returns_copy(self):
+        token = security.create_access_token({"sub": "s-1"})
+        security.decode_access_token(token)["sub"] = "tampered"
+        assert security.decode_access_token(token)["sub"] == "s-1"
+
+    def test_entry_expires_with_token(self, fresh_cache):
+        fresh_cache.put("t", {"sub": "s-1", "exp": time.time() - 1})
+        assert fresh_cache.get("t") is None
+
+    def test_invalid_token_not_cached(self, fresh_cache):
+        assert security.decode_access_token("not-a-jwt") is None
+        assert fresh_cache.get("not-a-jwt") is None
+
+    def test_bounded_lru(self, fresh_cache):
+        exp = time.time() + 60
+        for t in ("a", "b", "c"):
+            fresh_cache.put(t, {"exp": exp})
+        assert fresh_cache.get("a") is None
+        assert fresh_cache.get("c") is not None
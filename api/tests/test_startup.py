@@ -0,0 +1,26 @@
+"""測試冷啟動匯入路徑：重量級的選用相依套件不應在匯入 main 時載入。"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from app.services.llm_client import OpenAIClient
+
+API_DIR = Path(__file__).resolve().parents[1]
+
+DEFERRED_MODULES = ("openai", "alembic", "pyarrow", "openpyxl", "yaml", "brotli")
+
+
+def test_import_main_skips_deferred_modules():
+    code = (
+        "import sys, main\n"
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == ""
+
+
+def test_openai_client_created_on_first_use():
+    client = OpenAIClient(api_key="sk-test")
+    assert client._client is None
+    assert client.client is client.client
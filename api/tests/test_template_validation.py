@@ -0,0 +1,142 @@
+"""測試試卷模板上傳：檔案解析、結構檢查、相容性規則與預先編譯結果。
+
+同時首次上傳的寫入需要真實 PostgreSQL，設定 TEST_DATABASE_URL 指向「專用」測試資料庫才會執行。
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.data.grade5_entrance import grade5_entrance_template
+from app.db.models import Base, ExamTemplateRecord, ExamTemplateVersion
+from app.domain.compiled_template import CompiledTemplate
+from app.domain.models import MathLiteracyDimension
+from app.domain.template_validation import check_compatible, check_template
+from app.services.template_service import TemplateValidationError, build_template, parse_template_file, save_template
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def _raw() -> dict:
+    return grade5_entrance_template.model_dump(mode="json")
+
+
+class TestParseTemplateFile:
+    def test_parses_json_with_bom(self):
+        data = ("\ufeff" + json.dumps(_raw(), ensure_ascii=False)).encode("utf-8")
+        assert parse_template_file("exam.json", data)["exam_id"] == "grade5_entrance"
+
+    def test_parses_yaml(self):
+        yaml = pytest.importorskip("yaml")
+        data = yaml.safe_dump(_raw(), allow_unicode=True).encode("utf-8")
+        assert parse_template_file("exam.YML", data) == _raw()
+
+    def test_reports_json_syntax_error(self):
+        with pytest.raises(TemplateValidationError, match="JSON"):
+            parse_template_file("exam.json", b'{"exam_id": ')
+
+    def test_rejects_unknown_extension(self):
+        with pytest.raises(TemplateValidationError):
+            parse_template_file("exam.txt", b"{}")
+
+
+class TestCheckTemplate:
+    def test_builtin_template_is_valid(self):
+        template, compiled, warnings = build_template(_raw())
+        assert template == grade5_entrance_template
+        assert len(compiled) == 44
+        assert warnings == []
+
+    def test_pydantic_errors_are_listed(self):
+        raw = _raw()
+        del raw["name"]
+        with pytest.raises(TemplateValidationError) as e:
+            build_template(raw)
+        assert any(msg.startswith("name:") for msg in e.value.errors)
+
+    def test_duplicate_question_and_bad_exam_id(self):
+        raw = _raw()
+        raw["exam_id"] = "Grade 5"
+        questions = raw["sections"][0]["questions"]
+        questions[1]["question_id"] = questions[0]["question_id"]
+        with pytest.raises(TemplateValidationError) as e:
+            build_template(raw)
+        assert len(e.value.errors) == 2
+
+    def test_knowledge_point_must_match_section(self):
+        raw = _raw()
+        raw["sections"][0]["questions"][0]["knowledge_point"] = raw["sections"][1]["knowledge_point"]
+        with pytest.raises(TemplateValidationError, match="知識點"):
+            build_template(raw)
+
+    def test_literacy_weight_out_of_range(self):
+        raw = _raw()
+        raw["sections"][0]["questions"][0]["literacy_weights"] = {MathLiteracyDimension.COMPUTATIONAL_FLUENCY.value: 2.0}
+        with pytest.raises(TemplateValidationError, match="素養權重"):
+            build_template(raw)
+
+    def test_uncovered_dimension_is_warning(self):
+        template = grade5_entrance_template.model_copy(deep=True)
+        for section in template.sections:
+            for q in section.questions:
+                q.literacy_weights.pop(MathLiteracyDimension.COMPUTATIONAL_FLUENCY, None)
+        errors, warnings = check_template(template)
+        assert errors == []
+        assert len(warnings) == 1
+
+
+class TestCheckCompatible:
+    def test_same_question_order_is_compatible(self):
+        renamed = grade5_entrance_template.model_copy(update={"name": "改版"})
+        assert check_compatible(grade5_entrance_template, renamed) == []
+
+    def test_reordered_questions_are_rejected(self):
+        template = grade5_entrance_template.model_copy(deep=True)
+        questions = template.sections[0].questions
+        questions[0], questions[1] = questions[1], questions[0]
+        assert check_compatible(grade5_entrance_template, template)
+
+
+class TestPrecompiled:
+    def test_restored_template_scores_identically(self):
+        compiled = CompiledTemplate(grade5_entrance_template)
+        restored = CompiledTemplate(grade5_entrance_template, json.loads(json.dumps(compiled.to_dict())))
+        vector = [i % 3 / 2 for i in range(len(compiled))]
+        assert restored.question_ids == compiled.question_ids
+        assert restored.assess_vector("小明", vector) == compiled.assess_vector("小明", vector)
+
+
+@pytest.mark.skipif(TEST_DATABASE_URL is None, reason="需要設定 TEST_DATABASE_URL")
+class TestSaveTemplateOnPostgres:
+    @pytest.fixture()
+    async def pg_factory(self):
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        yield async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    async def _save(self, factory):
+        async with factory() as db:
+            record = await save_template(db, grade5_entrance_template, CompiledTemplate(grade5_entrance_template), None)
+            return record.version
+
+    async def test_first_upload_is_version_one(self, pg_factory):
+        assert await self._save(pg_factory) == 1
+        assert await self._save(pg_factory) == 2
+
+    async def test_concurrent_first_uploads_both_succeed(self, pg_factory):
+        versions = await asyncio.gather(*(self._save(pg_factory) for _ in range(4)))
+        assert sorted(versions) == [1, 2, 3, 4]
+        async with pg_factory() as db:
+            records = (await db.scalars(select(ExamTemplateRecord))).all()
+            history = (await db.scalars(select(ExamTemplateVersion.version))).all()
+        assert [(r.exam_id, r.version) for r in records] == [("grade5_entrance", 4)]
+        assert sorted(history) == [1, 2, 3, 4]
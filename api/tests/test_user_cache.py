@@ -0,0 +1,144 @@
+"""測試已驗證使用者快取：命中、過期、失效與 get_current_user 的查詢次數。"""
+
+import os
+import time
+import uuid
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.auth import dependencies
+from app.auth.security import create_access_token
+from app.auth.user_cache import UserCache
+from app.db.models import Base, User
+from app.db.notify import USER_CHANNEL, NotifyListener
+from tests.conftest import FakeDBSession
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def _user(is_active: bool = True) -> User:
+    return User(id=uuid.uuid4(), username="t1", display_name="王老師", role="teacher", is_active=is_active)
+
+
+class TestUserCache:
+    def test_hit_returns_snapshot_without_password(self):
+        cache = UserCache(ttl_seconds=60, max_entries=10)
+        user = _user()
+        user.hashed_password = "secret-hash"
+        cache.put(str(user.id), user)
+
+        cached = cache.get(str(user.id))
+        assert cached is not user
+        assert (cached.id, cached.role, cached.display_name) == (user.id, "teacher", "王老師")
+        assert cached.hashed_password is None
+
+    def test_expired_entry_is_miss(self, monkeypatch):
+        cache = UserCache(ttl_seconds=1, max_entries=10)
+        user = _user()
+        cache.put(str(user.id), user)
+        now = time.monotonic()
+        monkeypatch.setattr("app.auth.user_cache.time.monotonic", lambda: now + 5)
+        assert cache.get(str(user.id)) is None
+
+    def test_inactive_user_not_cached(self):
+        cache = UserCache(ttl_seconds=60, max_entries=10)
+        user = _user(is_active=False)
+        cache.put(str(user.id), user)
+        assert cache.get(str(user.id)) is None
+
+    def test_invalidate_one_and_all(self):
+        cache = UserCache(ttl_seconds=60, max_entries=10)
+        a, b = _user(), _user()
+        cache.put(str(a.id), a)
+        cache.put(str(b.id), b)
+        cache.invalidate(str(a.id))
+        assert cache.get(str(a.id)) is None
+        assert cache.get(str(b.id)) is not None
+        cache.invalidate()
+        assert cache.get(str(b.id)) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = UserCache(ttl_seconds=60, max_entries=2)
+        a, b, c = _user(), _user(), _user()
+        cache.put(str(a.id), a)
+        cache.put(str(b.id), b)
+        cache.get(str(a.id))
+        cache.put(str(c.id), c)
+        assert cache.get(str(b.id)) is None
+        assert cache.get(str(a.id)) is not None
+
+    def test_disabled_when_ttl_zero(self):
+        cache = UserCache(ttl_seconds=0, max_entries=10)
+        user = _user()
+        cache.put(str(user.id), user)
+        assert cache.get(str(user.id)) is None
+
+
+class TestGetCurrentUser:
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        cache = UserCache(ttl_seconds=60, max_entries=10)
+        monkeypatch.setattr(dependencies, "user_cache", cache)
+        return cache
+
+    async def test_second_request_skips_db(self):
+        user = _user()
+        db = FakeDBSession(user)
+        token = create_access_token({"sub": str(user.id), "role": "teacher"})
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        first = await dependencies.get_current_user(credentials, db)
+        second = await dependencies.get_current_user(credentials, db)
+
+        assert first.id == second.id == user.id
+        assert db.calls == 1
+        # 未命中查詢後即結束交易，排隊等准入名額時不佔住連線
+        assert db.commits == 1
+
+    async def test_invalidation_forces_reload(self, fresh_cache):
+        user = _user()
+        db = FakeDBSession(user)
+        token = create_access_token({"sub": str(user.id), "role": "teacher"})
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        await dependencies.get_current_user(credentials, db)
+        listener = NotifyListener("postgresql+asyncpg://unused/db")
+        listener.subscribe(USER_CHANNEL, fresh_cache.invalidate)
+        listener.dispatch(USER_CHANNEL, str(user.id))
+        await dependencies.get_current_user(credentials, db)
+
+        assert db.calls == 2
+
+
+@pytest.mark.skipif(TEST_DATABASE_URL is None, reason="需要設定 TEST_DATABASE_URL")
+class TestGetCurrentUserOnPostgres:
+    @pytest.fixture()
+    async def pg_engine(self, monkeypatch):
+        monkeypatch.setattr(dependencies, "user_cache", UserCache(ttl_seconds=60, max_entries=10))
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        yield engine
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+    async def test_cache_miss_returns_connection_to_pool(self, pg_engine):
+        factory = async_sessionmaker(pg_engine, expire_on_commit=False)
+        async with factory() as db:
+            db.add(User(username="t1", hashed_password="x", display_name="王老師", role="teacher"))
+            await db.commit()
+            user_id = await db.scalar(select(User.id))
+        token = create_access_token({"sub": str(user_id), "role": "teacher"})
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        async with factory() as db:
+            user = await dependencies.get_current_user(credentials, db)
+            # 路由接著可能在 admit() 排隊：此時 session 不應持有交易或連線
+            assert not db.in_transaction()
+            assert pg_engine.pool.checkedout() == 0
+            assert user.role == "teacher"
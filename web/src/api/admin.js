@@ -25,6 +25,16 @@ export function getExamTemplates() {
   return api.get('/admin/exams')
 }
 
+export function uploadExamTemplate(file) {
+  const form = new FormData()
+  form.append('file', file)
+  return api.post('/admin/exams/upload', form)
+}
+
+export function getExamTemplateVersions(examId) {
+  return api.get(`/admin/exams/${examId}/versions`)
+}
+
 export function assignExamToTeacher(payload) {
   return api.post('/admin/exams/assign', payload)
 }
@@ -4,6 +4,8 @@
  * - Render 部署：VITE_API_BASE_URL = API 服務外部 URL，自動附加 /api
  * - request 攔截器自動附加 Bearer token（若有）
  * - response 攔截器自動解包 response.data，讓呼叫端直接取得 JSON 資料
+ * - 伺服器忙碌（503 / 429 且帶 Retry-After）時依指示秒數加上隨機抖動後自動重試
+ * - newIdempotencyKey() 產生 Idempotency-Key：交卷、評分等寫入請求重送時伺服器回放第一次的結果
  */
 import axios from 'axios'
 
@@ -23,10 +25,46 @@ api.interceptors.request.use((config) => {
   return config
 })
 
-// 回應攔截器：成功時直接回傳 data；失敗時拋出錯誤供呼叫端 catch
+// 忙碌重試：最多重試次數與單次等待上限（秒）
+const MAX_BUSY_RETRIES = 5
+const MAX_RETRY_AFTER_SECONDS = 30
+
+/**
+ * 由 Retry-After 標頭計算等待毫秒數；沒有標頭（非准入控制的拒絕）時回傳 null。
+ * 等待時間在 [Retry-After, 2 × Retry-After) 之間隨機分布，避免同一批被拒的請求同時重試。
+ */
+function busyRetryDelay(error) {
+  const status = error.response?.status
+  if (status !== 503 && status !== 429) return null
+  const seconds = Number(error.response.headers?.['retry-after'])
+  if (!Number.isFinite(seconds) || seconds < 0) return null
+  const base = Math.min(Math.max(seconds, 1), MAX_RETRY_AFTER_SECONDS) * 1000
+  return base + Math.random() * base
+}
+
+// 回應攔截器：成功時直接回傳 data；伺服器忙碌時延後重試；其餘失敗拋出錯誤供呼叫端 catch
 api.interceptors.response.use(
   (response) => response.data,
-  (error) => Promise.reject(error),
+  async (error) => {
+    const config = error.config
+    const delay = busyRetryDelay(error)
+    if (!config || delay === null || (config.busyRetries ?? 0) >= MAX_BUSY_RETRIES) {
+      return Promise.reject(error)
+    }
+    config.busyRetries = (config.busyRetries ?? 0) + 1
+    await new Promise((resolve) => setTimeout(resolve, delay))
+    return api(config)
+  },
 )
 
+/**
+ * 產生一個 Idempotency-Key。同一次操作（含失敗後的手動重試）應沿用同一個鍵，
+ * 成功後再為下一次操作產生新鍵；自動忙碌重試會沿用原請求的標頭。
+ */
+export function newIdempotencyKey() {
+  if (globalThis.crypto?.randomUUID) return crypto.randomUUID()
+  // 非 HTTPS 環境沒有 randomUUID
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`
+}
+
 export default api
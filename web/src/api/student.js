@@ -8,9 +8,25 @@ export function getExamQuestions(sessionId) {
   return api.get(`/student/exam/${sessionId}`)
 }
 
-/** 提交作答 */
-export function submitAnswers(sessionId, payload) {
-  return api.post(`/student/exam/${sessionId}/submit`, payload)
+/** 適性測驗：依目前作答取得下一題（不寫入資料庫，每次帶入全部作答） */
+export function getNextQuestion(sessionId, payload) {
+  return api.post(`/student/exam/${sessionId}/next`, payload)
+}
+
+/** 暫存作答中的答案（覆蓋前一份，伺服器數秒內寫入資料庫） */
+export function autosaveAnswers(sessionId, payload) {
+  return api.put(`/student/exam/${sessionId}/autosave`, payload)
+}
+
+/** 取得最近一次暫存的作答，重新開啟頁面時還原 */
+export function getAutosavedAnswers(sessionId) {
+  return api.get(`/student/exam/${sessionId}/autosave`)
+}
+
+/** 提交作答；帶 idempotencyKey 時重送不會被視為重複提交，而是取得第一次的結果 */
+export function submitAnswers(sessionId, payload, idempotencyKey) {
+  const headers = idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}
+  return api.post(`/student/exam/${sessionId}/submit`, payload, { headers })
 }
 
 /** 取得測驗結果 */
@@ -23,12 +23,26 @@ export function getExamResults(params) {
   return api.get('/teacher/results', { params })
 }
 
-/** 取得個別學生報告 */
-export function getSessionReport(sessionId) {
-  return api.get(`/teacher/results/${sessionId}`)
+/** 取得個別學生報告；startedAt 為列表中的開始時間（分區鍵），後端只需查詢該月的分區 */
+export function getSessionReport(sessionId, startedAt) {
+  return api.get(`/teacher/results/${sessionId}`, { params: { started_at: startedAt } })
 }
 
-/** 教師手動提交評分 */
-export function submitTeacherScoring(payload) {
-  return api.post('/teacher/scoring', payload)
+/** 教師手動提交評分；帶 idempotencyKey 時重送回放第一次的結果，不會重新評分與 AI 分析 */
+export function submitTeacherScoring(payload, idempotencyKey) {
+  const headers = idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}
+  return api.post('/teacher/scoring', payload, { headers })
+}
+
+/** 匯出學生成績（CSV 或 Parquet），回傳 Blob */
+export function exportExamResults(params) {
+  return api.get('/teacher/results/export', { params, responseType: 'blob' })
+}
+
+/** 批次匯入紙本成績（CSV / XLSX），回傳新增、更新筆數與錯誤列 */
+export function importTeacherScoring(examId, file) {
+  const form = new FormData()
+  form.append('exam_id', examId)
+  form.append('file', file)
+  return api.post('/teacher/scoring/import', form)
 }